@@ -0,0 +1,115 @@
+"""Compare the validating and trusted paths for hydrating plays read from the database.
+
+Loads 100 pages of 100 plays through each path:
+
+- validating: dict rows run through ``recorded_play_schema.load`` (the original path)
+- trusted: tuple rows passed positionally to ``RecordedPlay``
+
+    python benchmarks/bench_hydration.py
+"""
+
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from mopidy_advanced_scrobbler.db import (
+    Connection,
+    execute_trusted,
+    play_columns,
+    recorded_play_row_factory,
+)
+from mopidy_advanced_scrobbler.serial import recorded_play_schema
+
+
+SQL_DIR = Path(__file__).parent.parent / "mopidy_advanced_scrobbler" / "sql"
+
+
+def populate(conn: sqlite3.Connection, plays: int):
+    rows = (
+        (
+            f"spotify:track:{idx:022d}",
+            f"Artist {idx % 500}",
+            f"Title {idx}",
+            f"Album {idx % 2000}",
+            f"Artist {idx % 500}",
+            f"Title {idx} - Remastered",
+            f"Album {idx % 2000}",
+            idx % 3,
+            None,
+            180 + idx % 120,
+            1500000000 + idx * 200,
+            1500000060 + idx * 200 if idx % 4 else None,
+        )
+        for idx in range(plays)
+    )
+    with conn:
+        conn.execute("BEGIN")
+        conn.executemany(
+            """
+            INSERT INTO plays (
+                track_uri, artist, title, album,
+                orig_artist, orig_title, orig_album,
+                corrected, musicbrainz_id, duration, played_at, submitted_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+
+def load_validating(conn: sqlite3.Connection, pages: int, page_size: int):
+    for page in range(pages):
+        query = (
+            f"SELECT {play_columns} FROM plays "
+            f"ORDER BY play_id DESC LIMIT {page_size} OFFSET {page * page_size}"
+        )
+        cursor = conn.execute(query)
+        tuple(recorded_play_schema.load(cursor, many=True))
+
+
+def load_trusted(conn: sqlite3.Connection, pages: int, page_size: int):
+    for page in range(pages):
+        query = (
+            f"SELECT {play_columns} FROM plays "
+            f"ORDER BY play_id DESC LIMIT {page_size} OFFSET {page * page_size}"
+        )
+        tuple(execute_trusted(conn, query, (), recorded_play_row_factory))
+
+
+def measure(func, conn, pages: int, page_size: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(conn, pages, page_size)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = sqlite3.connect(Path(tmpdir) / "bench.db", factory=Connection)
+        conn.executescript((SQL_DIR / "schema.sql").read_text())
+        populate(conn, args.pages * args.page_size)
+
+        validating = measure(load_validating, conn, args.pages, args.page_size, args.repeat)
+        trusted = measure(load_trusted, conn, args.pages, args.page_size, args.repeat)
+        conn.close()
+
+    total = args.pages * args.page_size
+    print(f"Loading {args.pages} pages of {args.page_size} plays ({total} plays)")
+    print(f"{'path':<12} {'total (ms)':>12} {'per play (us)':>14}")
+    for name, elapsed in (("validating", validating), ("trusted", trusted)):
+        print(f"{name:<12} {elapsed:>12.1f} {elapsed * 1000 / total:>14.2f}")
+    print(f"speedup: {validating / trusted:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
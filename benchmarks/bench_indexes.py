@@ -0,0 +1,120 @@
+"""Measure the hot AdvancedScrobblerDb queries before and after the v2 indexes.
+
+Builds a synthetic database at schema v1, times each query, applies
+``upgrade-v1.sql`` and times them again.
+
+    python benchmarks/bench_indexes.py --plays 1000000
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+SQL_DIR = Path(__file__).parent.parent / "mopidy_advanced_scrobbler" / "sql"
+
+QUERIES = {
+    "load_unsubmitted_plays_batch": (
+        "SELECT * FROM plays WHERE submitted_at IS NULL ORDER BY play_id ASC LIMIT 50",
+        (),
+    ),
+    "get_plays_count(only_unsubmitted)": (
+        "SELECT COUNT(*) as plays_count FROM plays WHERE submitted_at IS NULL",
+        (),
+    ),
+    "edit_play(update_all_unsubmitted)": (
+        "UPDATE plays SET artist = artist WHERE track_uri = ? AND submitted_at IS NULL",
+        ("local:track:00042.mp3",),
+    ),
+    "edit_correction(update_all_unsubmitted)": (
+        "UPDATE plays SET title = title WHERE track_uri = ? AND submitted_at IS NULL",
+        ("local:track:01337.mp3",),
+    ),
+}
+
+
+def populate(conn: sqlite3.Connection, plays: int, tracks: int, unsubmitted: int):
+    rng = random.Random(1234)
+    base_time = 1500000000
+
+    def rows():
+        for idx in range(plays):
+            track = rng.randrange(tracks)
+            played_at = base_time + idx * 200
+            submitted_at = None if idx >= plays - unsubmitted else played_at + 60
+            yield (
+                f"local:track:{track:05d}.mp3",
+                f"Artist {track % 997}",
+                f"Title {track}",
+                f"Album {track % 4093}",
+                f"Artist {track % 997}",
+                f"Title {track}",
+                f"Album {track % 4093}",
+                0,
+                None,
+                180,
+                played_at,
+                submitted_at,
+            )
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO plays (
+                track_uri, artist, title, album,
+                orig_artist, orig_title, orig_album,
+                corrected, musicbrainz_id, duration, played_at, submitted_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows(),
+        )
+
+
+def time_query(conn: sqlite3.Connection, query: str, args, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        conn.execute(query, args).fetchall()
+        conn.execute("ROLLBACK")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def run_queries(conn: sqlite3.Connection, repeat: int):
+    return {name: time_query(conn, query, args, repeat) for name, (query, args) in QUERIES.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plays", type=int, default=1_000_000)
+    parser.add_argument("--tracks", type=int, default=20_000)
+    parser.add_argument("--unsubmitted", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = sqlite3.connect(Path(tmpdir) / "bench.db", isolation_level=None)
+        conn.execute("PRAGMA journal_mode = wal")
+        conn.executescript((SQL_DIR / "schema.sql").read_text())
+
+        print(f"Populating {args.plays} plays ({args.unsubmitted} unsubmitted)...")
+        populate(conn, args.plays, args.tracks, args.unsubmitted)
+
+        before = run_queries(conn, args.repeat)
+        conn.executescript((SQL_DIR / "upgrade-v1.sql").read_text())
+        after = run_queries(conn, args.repeat)
+        conn.close()
+
+    print(f"{'query':<42} {'v1 (ms)':>10} {'v2 (ms)':>10} {'speedup':>9}")
+    for name in QUERIES:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<42} {before[name]:>10.3f} {after[name]:>10.3f} {speedup:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
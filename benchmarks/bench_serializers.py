@@ -0,0 +1,106 @@
+"""Compare marshmallow and precompiled serializers for listing responses.
+
+Dumps 100 pages of 100 plays and 100 pages of 100 corrections through each path:
+
+- schema: ``schema.dump`` followed by ``tornado.escape.json_encode`` (the original path)
+- compiled: a dumper from ``compile_dumper`` followed by ``tornado.escape.json_encode``
+- compiled+orjson: a dumper from ``compile_dumper`` followed by ``orjson.dumps``, when
+  orjson is installed
+
+    python benchmarks/bench_serializers.py
+"""
+
+import argparse
+import statistics
+import time
+
+import tornado.escape
+
+from mopidy_advanced_scrobbler._serializers import compile_dumper, orjson
+from mopidy_advanced_scrobbler.models import Corrected, Correction, RecordedPlay
+from mopidy_advanced_scrobbler.serial import correction_schema, recorded_play_schema
+
+
+def make_plays(count: int):
+    return [
+        RecordedPlay(
+            play_id=idx + 1,
+            track_uri=f"spotify:track:{idx:022d}",
+            artist=f"Artist {idx % 500}",
+            title=f"Title {idx}",
+            album=f"Album {idx % 2000}",
+            orig_artist=f"Artist {idx % 500}",
+            orig_title=f"Title {idx} - Remastered",
+            orig_album=f"Album {idx % 2000}",
+            corrected=Corrected(idx % 3),
+            musicbrainz_id=None,
+            duration=180 + idx % 120,
+            played_at=1500000000 + idx * 200,
+            submitted_at=1500000060 + idx * 200 if idx % 4 else None,
+        )
+        for idx in range(count)
+    ]
+
+
+def make_corrections(count: int):
+    return [
+        Correction(
+            track_uri=f"spotify:track:{idx:022d}",
+            artist=f"Artist {idx % 500}",
+            title=f"Title {idx}",
+            album=f"Album {idx % 2000}",
+        )
+        for idx in range(count)
+    ]
+
+
+def measure(dump, encode, items, page_size: int, repeat: int) -> float:
+    pages = [items[idx : idx + page_size] for idx in range(0, len(items), page_size)]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            encode({"items": [dump(item) for item in page]})
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    total = args.pages * args.page_size
+    datasets = (
+        ("plays", recorded_play_schema, make_plays(total)),
+        ("corrections", correction_schema, make_corrections(total)),
+    )
+
+    for label, schema, items in datasets:
+        compiled = compile_dumper(schema)
+        paths = [
+            ("schema", schema.dump, tornado.escape.json_encode),
+            ("compiled", compiled, tornado.escape.json_encode),
+        ]
+        if orjson is not None:
+            paths.append(("compiled+orjson", compiled, orjson.dumps))
+
+        timings = [
+            (name, measure(dump, encode, items, args.page_size, args.repeat))
+            for name, dump, encode in paths
+        ]
+
+        print(f"Dumping {args.pages} pages of {args.page_size} {label} ({total} {label})")
+        print(f"{'path':<16} {'total (ms)':>12} {'per item (us)':>14}")
+        for name, elapsed in timings:
+            print(f"{name:<16} {elapsed:>12.1f} {elapsed * 1000 / total:>14.2f}")
+        baseline = timings[0][1]
+        for name, elapsed in timings[1:]:
+            print(f"{name} speedup: {baseline / elapsed:.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,26 @@ interface Notifier {
   error(message: string): void;
 }
 
+export interface SubmissionFailure {
+  readonly attempts: number;
+  readonly lastError: string | null;
+  readonly nextAttemptAt: number | null; // UNIX timestamp, or null if it won't be retried
+  readonly inFlight: boolean;
+}
+
 export interface LoadPlaysResponse {
   readonly plays: ReadonlyArray<Play>;
   readonly playIdMapping: Record<Play["playId"], number>;
+  readonly nextCursor: string | null;
+  readonly prevCursor: string | null;
   readonly counts: {
     readonly overall: number;
     readonly unsubmitted: number;
+    readonly matched?: number;
   };
+  readonly failures: Record<Play["playId"], SubmissionFailure>;
+  // Plays whose submission was interrupted, which Last.fm may already have.
+  readonly inFlight: ReadonlyArray<Play["playId"]>;
 }
 
 export interface PlaybackDataResponse {
@@ -33,19 +46,42 @@ export interface PlaybackDataResponse {
 
 export interface LoadCorrectionsResponse {
   readonly corrections: ReadonlyArray<Correction>;
+  readonly nextCursor: string | null;
+  readonly prevCursor: string | null;
   readonly counts: {
     readonly overall: number;
+    readonly matched?: number;
   };
 }
 
-export interface ScrobbleResponse {
-  readonly success: boolean;
-  readonly foundPlays: ReadonlyArray<number>;
-  readonly scrobbledPlays: ReadonlyArray<number>;
-  readonly markedPlays: ReadonlyArray<number>;
+export type ScrobbleJobStatus = "queued" | "running" | "finished" | "failed" | "cancelled";
+
+export interface ScrobbleJob {
+  readonly jobId: string;
+  readonly status: ScrobbleJobStatus;
+  readonly foundPlays: number;
+  readonly scrobbledPlays: number;
+  readonly ignoredPlays: number;
+  readonly markedPlays: number;
   readonly message: string | null;
 }
 
+interface ScrobbleJobQueuedResponse {
+  readonly success: boolean;
+  readonly jobId: string;
+}
+
+interface ScrobbleJobResponse {
+  readonly success: boolean;
+  readonly job: ScrobbleJob;
+}
+
+const JOB_POLL_INTERVAL_MSEC = 1000;
+
+function sleep(msec: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, msec));
+}
+
 export class MasApi {
   private readonly http: AxiosInstance;
   private readonly notifier: Notifier;
@@ -68,11 +104,20 @@ export class MasApi {
     this.notifier.error(errMsg);
   }
 
-  public async loadPlays(pageNumber: number, pageSize: number): Promise<LoadPlaysResponse> {
+  public async loadPlays(
+    pageNumber: number,
+    pageSize: number,
+    search = "",
+    cursor: string | null = null,
+  ): Promise<LoadPlaysResponse> {
+    // The server pages by cursor when one is given, and only falls back to the page number
+    // (an OFFSET) without one.
     const response = await this.http.get<LoadPlaysResponse>("/plays/load", {
       params: {
-        page: pageNumber,
+        page: cursor ? undefined : pageNumber,
         page_size: pageSize,
+        q: search || undefined,
+        cursor: cursor || undefined,
       },
     });
     return response.data;
@@ -86,11 +131,17 @@ export class MasApi {
   public async loadCorrections(
     pageNumber: number,
     pageSize: number,
+    search = "",
+    cursor: string | null = null,
   ): Promise<LoadCorrectionsResponse> {
+    // The server pages by cursor when one is given, and only falls back to the page number
+    // (an OFFSET) without one.
     const response = await this.http.get<LoadCorrectionsResponse>("/corrections/load", {
       params: {
-        page: pageNumber,
+        page: cursor ? undefined : pageNumber,
         page_size: pageSize,
+        q: search || undefined,
+        cursor: cursor || undefined,
       },
     });
     return response.data;
@@ -109,6 +160,19 @@ export class MasApi {
     return success;
   }
 
+  public async editPlays(plays: ReadonlyArray<Readonly<EditablePlay>>): Promise<boolean> {
+    let success = false;
+    try {
+      await this.http.post("/plays/edit-many", { plays });
+      success = true;
+      this.notifier.success("Successfully saved plays.");
+    } catch (err) {
+      this.handleError("Error while saving plays", err);
+    }
+
+    return success;
+  }
+
   public async approveAutoCorrection(playId: number): Promise<boolean> {
     let success = false;
     try {
@@ -122,6 +186,19 @@ export class MasApi {
     return success;
   }
 
+  public async approveAutoCorrections(playIds: ReadonlyArray<number>): Promise<boolean> {
+    let success = false;
+    try {
+      await this.http.post("/approve-auto-many", { playIds });
+      success = true;
+      this.notifier.success("Successfully approved auto-corrections.");
+    } catch (err) {
+      this.handleError("Error while approving auto-corrections", err);
+    }
+
+    return success;
+  }
+
   public async deletePlay(playId: number): Promise<boolean> {
     let success = false;
     try {
@@ -148,23 +225,61 @@ export class MasApi {
     return success;
   }
 
-  public async scrobbleUnsubmitted(checkpointId?: number): Promise<ScrobbleResponse | null> {
+  public async scrobbleUnsubmitted(
+    checkpointId?: number,
+    onProgress?: (job: ScrobbleJob) => void,
+  ): Promise<ScrobbleJob | null> {
     const params: Record<string, unknown> = {};
     if (checkpointId) {
       params["checkpoint"] = checkpointId;
     }
 
-    let response: ScrobbleResponse;
     try {
-      response = (await this.http.post<ScrobbleResponse>("/scrobble", params)).data;
-      this.notifier.success("Successfully scrobbled plays.");
-      return response;
+      const response = await this.http.post<ScrobbleJobQueuedResponse>("/scrobble", params);
+      return await this.waitForScrobbleJob(response.data.jobId, onProgress);
     } catch (err) {
       this.handleError("Error while scrobbling", err);
       return null;
     }
   }
 
+  public async getScrobbleJob(jobId: string): Promise<ScrobbleJob> {
+    const response = await this.http.get<ScrobbleJobResponse>(`/jobs/${jobId}`);
+    return response.data.job;
+  }
+
+  public async cancelScrobbleJob(jobId: string): Promise<boolean> {
+    let success = false;
+    try {
+      success = (await this.http.post<{ success: boolean }>("/jobs/cancel", { jobId })).data.success;
+    } catch (err) {
+      this.handleError("Error while cancelling scrobbling", err);
+    }
+
+    return success;
+  }
+
+  private async waitForScrobbleJob(
+    jobId: string,
+    onProgress?: (job: ScrobbleJob) => void,
+  ): Promise<ScrobbleJob> {
+    for (;;) {
+      const job = await this.getScrobbleJob(jobId);
+      if (onProgress) {
+        onProgress(job);
+      }
+
+      if (job.status === "finished") {
+        this.notifier.success("Successfully scrobbled plays.");
+        return job;
+      } else if (job.status === "failed" || job.status === "cancelled") {
+        return job;
+      }
+
+      await sleep(JOB_POLL_INTERVAL_MSEC);
+    }
+  }
+
   public async submitMultiDelete(playIds: ReadonlyArray<number>): Promise<boolean> {
     let success = false;
     try {
@@ -178,14 +293,41 @@ export class MasApi {
     return success;
   }
 
+  public async resetFailures(playIds: ReadonlyArray<number>): Promise<boolean> {
+    let success = false;
+    try {
+      await this.http.post("/plays/reset-failures", { playIds });
+      success = true;
+      this.notifier.success("Plays will be retried by the next scrobble.");
+    } catch (err) {
+      this.handleError("Error while resetting failed submissions", err);
+    }
+
+    return success;
+  }
+
+  public async abandonSubmission(playIds: ReadonlyArray<number>): Promise<boolean> {
+    let success = false;
+    try {
+      await this.http.post("/plays/abandon-submission", { playIds });
+      success = true;
+      this.notifier.success("Plays will be scrobbled automatically again.");
+    } catch (err) {
+      this.handleError("Error while releasing plays", err);
+    }
+
+    return success;
+  }
+
   public async submitMultiScrobble(
     playIds: ReadonlyArray<number>,
-  ): Promise<ScrobbleResponse | null> {
-    let response: ScrobbleResponse;
+    onProgress?: (job: ScrobbleJob) => void,
+  ): Promise<ScrobbleJob | null> {
     try {
-      response = (await this.http.post<ScrobbleResponse>("/plays/scrobble-many", { playIds })).data;
-      this.notifier.success("Successfully scrobbled plays.");
-      return response;
+      const response = await this.http.post<ScrobbleJobQueuedResponse>("/plays/scrobble-many", {
+        playIds,
+      });
+      return await this.waitForScrobbleJob(response.data.jobId, onProgress);
     } catch (err) {
       this.handleError("Error while scrobbling", err);
       return null;
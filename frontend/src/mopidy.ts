@@ -68,4 +68,74 @@ const getMopidyState = async (): Promise<void> => {
     setTimeout(getMopidyState, 500);
   }
 };
-setTimeout(getMopidyState, 2000);
+
+interface PlaybackPushMessage {
+  readonly type: "playback";
+  readonly playback: PlaybackDataResponse["playback"];
+  readonly playing: PlaybackDataResponse["playing"];
+}
+
+interface PositionTickMessage {
+  readonly type: "tick";
+  readonly position: number;
+}
+
+type PushMessage = PlaybackPushMessage | PositionTickMessage;
+
+const pushUrl = (): string => {
+  const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+  return `${protocol}//${window.location.host}${masHttp.defaults.baseURL}playback-socket`;
+};
+
+let pushConnected = false;
+let pushFailureCount = 0;
+const connectPlaybackPush = (): void => {
+  let socket: WebSocket;
+  try {
+    socket = new WebSocket(pushUrl());
+  } catch (err) {
+    console.error(err);
+    getMopidyState();
+    return;
+  }
+
+  socket.onopen = () => {
+    pushConnected = true;
+    pushFailureCount = 0;
+    mopidyState.online = MopidyConnectionState.ONLINE;
+  };
+
+  socket.onmessage = (event: MessageEvent<string>) => {
+    const message = JSON.parse(event.data) as PushMessage;
+    if (message.type === "tick") {
+      mopidyState.playback.position = message.position;
+      return;
+    }
+
+    mopidyState.playback.state = message.playback.state;
+    mopidyState.playback.position = message.playback.position;
+    mopidyState.playing.trackUri = message.playing.trackUri;
+    mopidyState.playing.title = message.playing.title;
+    mopidyState.playing.artist = message.playing.artist;
+    mopidyState.playing.album = message.playing.album;
+    mopidyState.playing.duration = message.playing.duration;
+  };
+
+  socket.onclose = () => {
+    const wasConnected = pushConnected;
+    pushConnected = false;
+
+    if (!wasConnected && (pushFailureCount === 0 || pushFailureCount >= 5)) {
+      // Either the push endpoint isn't available at all, or it has stopped accepting
+      // connections, so fall back to polling, which handles going offline itself.
+      getMopidyState();
+      return;
+    }
+
+    mopidyState.online = MopidyConnectionState.RECONNECTING;
+    pushFailureCount += 1;
+    const backoffFactor = Math.pow(2, pushFailureCount);
+    setTimeout(connectPlaybackPush, 500 * backoffFactor);
+  };
+};
+setTimeout(connectPlaybackPush, 2000);
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 import pathlib
 from typing import TYPE_CHECKING
 
@@ -13,6 +14,8 @@ if TYPE_CHECKING:
     from mopidy.commands import Command
 
 
+logger = logging.getLogger(__name__)
+
 __version__ = pkg_resources.get_distribution("Mopidy-Advanced-Scrobbler").version
 
 
@@ -31,10 +34,24 @@ class Extension(ext.Extension):
         schema["api_secret"] = config.Secret()
         schema["username"] = config.String()
         schema["password"] = config.Secret()
+        schema["api_rate_limit"] = ConfigFloat(minimum=0.1)
+        schema["api_rate_burst"] = config.Integer(minimum=1)
+        schema["api_connect_timeout"] = ConfigFloat(minimum=0.1)
+        schema["api_read_timeout"] = ConfigFloat(minimum=0.1)
 
         schema["db_timeout"] = config.Integer(optional=True, minimum=1)
+        schema["db_reader_pool_size"] = config.Integer(minimum=1)
+        schema["correction_cache_size"] = config.Integer(optional=True, minimum=0)
+        schema["write_behind_size"] = config.Integer(optional=True, minimum=0)
+        schema["write_behind_delay"] = ConfigFloat(optional=True, minimum=0.1)
+        schema["slow_query_threshold"] = config.Integer(optional=True, minimum=0)
+        schema["archive_after"] = config.Integer(optional=True, minimum=1)
+        schema["fast_json"] = config.Boolean()
 
         schema["scrobble_time_threshold"] = ConfigFloat(optional=True, minimum=50, maximum=100)
+        schema["auto_scrobble"] = config.Boolean()
+        schema["auto_scrobble_interval"] = config.Integer(minimum=10)
+        schema["auto_scrobble_hold_auto_corrected"] = config.Boolean()
 
         schema["ignored_uri_schemes"] = config.List(optional=True)
 
@@ -53,23 +70,38 @@ class Extension(ext.Extension):
         return AdvancedScrobblerCommand()
 
     def factory_webapp(self, config, core):
+        from ._serializers import enable_orjson
         from .web import (
             ApiApproveAutoCorrection,
+            ApiApproveAutoCorrectionMany,
             ApiCorrectionDelete,
             ApiCorrectionEdit,
             ApiCorrectionLoad,
+            ApiDebugDbStats,
+            ApiJobCancel,
+            ApiJobLoad,
+            ApiMetrics,
+            ApiPlayAbandonSubmission,
             ApiPlaybackData,
+            ApiPlaybackSocket,
             ApiPlayDelete,
             ApiPlayDeleteMany,
             ApiPlayEdit,
+            ApiPlayEditMany,
+            ApiPlayExport,
             ApiPlayLoad,
+            ApiPlayResetFailures,
             ApiPlayScrobbleMany,
             ApiPlaySubmit,
             ApiScrobble,
             OverrideStaticFileHandler,
-            StaticFileHandler,
+            PrecompressedStaticFileHandler,
         )
 
+        fast_json = config[self.ext_name]["fast_json"]
+        if enable_orjson(fast_json) != fast_json:
+            logger.warning("fast_json is enabled, but orjson is not installed")
+
         allowed_origins = {origin.lower() for origin in config["http"]["allowed_origins"] if origin}
 
         path_static = pathlib.Path(__file__).parent / "static"
@@ -82,21 +114,31 @@ class Extension(ext.Extension):
         vue_router_args = {"static_file_path": path_page_file}
 
         return [
-            (r"/css/(.*)", StaticFileHandler, {"path": str(path_static / "css")}),
-            (r"/fonts/(.*)", StaticFileHandler, {"path": str(path_static / "fonts")}),
-            (r"/js/(.*)", StaticFileHandler, {"path": str(path_static / "js")}),
+            (r"/css/(.*)", PrecompressedStaticFileHandler, {"path": str(path_static / "css")}),
+            (r"/fonts/(.*)", PrecompressedStaticFileHandler, {"path": str(path_static / "fonts")}),
+            (r"/js/(.*)", PrecompressedStaticFileHandler, {"path": str(path_static / "js")}),
             (r"/api/plays/load", ApiPlayLoad, api_args),
+            (r"/api/plays/export", ApiPlayExport, api_args),
             (r"/api/plays/edit", ApiPlayEdit, api_args),
+            (r"/api/plays/edit-many", ApiPlayEditMany, api_args),
             (r"/api/plays/delete", ApiPlayDelete, api_args),
             (r"/api/plays/delete-many", ApiPlayDeleteMany, api_args),
             (r"/api/plays/submit", ApiPlaySubmit, api_args),
             (r"/api/plays/scrobble-many", ApiPlayScrobbleMany, api_args),
+            (r"/api/plays/reset-failures", ApiPlayResetFailures, api_args),
+            (r"/api/plays/abandon-submission", ApiPlayAbandonSubmission, api_args),
             (r"/api/corrections/load", ApiCorrectionLoad, api_args),
             (r"/api/corrections/edit", ApiCorrectionEdit, api_args),
             (r"/api/corrections/delete", ApiCorrectionDelete, api_args),
             (r"/api/approve-auto", ApiApproveAutoCorrection, api_args),
+            (r"/api/approve-auto-many", ApiApproveAutoCorrectionMany, api_args),
             (r"/api/scrobble", ApiScrobble, api_args),
+            (r"/api/jobs/cancel", ApiJobCancel, api_args),
+            (r"/api/jobs/([0-9a-f]+)", ApiJobLoad, api_args),
             (r"/api/playback-data", ApiPlaybackData, {**api_args, "core": core}),
+            (r"/api/playback-socket", ApiPlaybackSocket, api_args),
+            (r"/api/debug/db-stats", ApiDebugDbStats, api_args),
+            (r"/api/metrics", ApiMetrics, api_args),
             (
                 r"/favicon\.png$",
                 OverrideStaticFileHandler,
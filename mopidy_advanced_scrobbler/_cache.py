@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Optional, TypeVar, Union
+
+
+CacheKey = TypeVar("CacheKey", bound=Hashable)
+CacheValue = TypeVar("CacheValue")
+Default = TypeVar("Default")
+
+
+class LruCache(Generic[CacheKey, CacheValue]):
+    """A bounded least-recently-used mapping that counts its hits and misses.
+
+    Not thread-safe: it is meant to be owned by a single actor.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(int(maxsize), 0)
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[CacheKey, CacheValue] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(
+        self, key: CacheKey, default: Optional[Default] = None
+    ) -> Union[CacheValue, Optional[Default]]:
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: CacheKey, value: CacheValue):
+        if self.maxsize == 0:
+            return
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: CacheKey):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
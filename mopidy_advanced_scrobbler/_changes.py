@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Tuple
+
+
+class ChangeSequence(object):
+    """A cheap token that changes whenever the database contents may have changed.
+
+    Writes made by this process bump a counter. Writes made by other processes, such as the
+    archive and sync-corrections commands, are picked up by checking the size and modification
+    time of the database and its write-ahead log. The token never requires a SQLite query, so
+    it can be checked before deciding whether a query needs to run at all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Distinguishes tokens handed out before a restart from ones handed out after it.
+        self._epoch = uuid.uuid4().hex[:8]
+        self._value = 0
+        self._paths: Tuple[str, ...] = ()
+
+    def watch(self, dbpath: Path):
+        with self._lock:
+            self._paths = (str(dbpath), f"{dbpath}-wal")
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            return self._value
+
+    def token(self) -> str:
+        with self._lock:
+            parts = [self._epoch, str(self._value)]
+            paths = self._paths
+
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                parts.append("0")
+            else:
+                parts.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+
+        return "-".join(parts)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from time import time
+from typing import TYPE_CHECKING
+
+from mopidy_advanced_scrobbler._commands import AbortCommand
+from mopidy_advanced_scrobbler._commands.db import connect_internal_db
+from mopidy_advanced_scrobbler._commands.output import stderr, stdout
+from mopidy_advanced_scrobbler.db import archive_plays_batch
+
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from mopidy_advanced_scrobbler.db import Connection
+
+
+def run(args: Namespace, config):
+    older_than = args.older_than or config["advanced_scrobbler"]["archive_after"]
+    if not older_than:
+        stderr.print(
+            "No age given. Use --older-than or set advanced_scrobbler/archive_after.",
+            style="error",
+        )
+        raise AbortCommand
+
+    db = connect_internal_db(config)
+
+    cutoff = int(time()) - older_than * 86400
+    stdout.print(f"Archiving submitted plays older than {older_than} days.", style="notice")
+    archived = archive_plays(db, cutoff, args.batch_size)
+
+    if archived > 0:
+        stdout.print(f"Archived {archived} plays!", style="success")
+    else:
+        stdout.print("No plays needed archiving.", style="success")
+
+    return 0
+
+
+def archive_plays(db: Connection, cutoff: int, batch_size: int) -> int:
+    """Move submitted plays made before ``cutoff`` into the archive, one batch at a time."""
+    archived = 0
+    while True:
+        moved = archive_plays_batch(db, cutoff, batch_size)
+        if not moved:
+            break
+
+        archived += moved
+        stdout.print(f"Archived {archived} plays so far.", style="info")
+
+    return archived
+
+
+__all__ = ("run",)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict
+
+from rich.table import Table, box
+
+from mopidy_advanced_scrobbler._commands.db import connect_internal_db
+from mopidy_advanced_scrobbler._commands.output import stdout
+
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from mopidy_advanced_scrobbler.db import Connection
+
+
+counter_queries = {
+    "plays": "SELECT (SELECT COUNT(*) FROM plays) + (SELECT COUNT(*) FROM plays_archive) AS actual",
+    "plays_unsubmitted": "SELECT COUNT(*) AS actual FROM plays WHERE submitted_at IS NULL",
+    "corrections": "SELECT COUNT(*) AS actual FROM corrections",
+}
+
+load_counters_query = "SELECT name, value FROM counters"
+
+repair_counter_query = """
+INSERT INTO counters (name, value) VALUES (?, ?)
+ON CONFLICT (name) DO UPDATE SET value = excluded.value
+"""
+
+
+def run(args: Namespace, config):
+    db = connect_internal_db(config)
+
+    with db:
+        # Block writers so the recomputed counts can't be outdated before they're stored.
+        db.execute("BEGIN IMMEDIATE")
+        repaired = check_counters(db)
+
+    if repaired > 0:
+        stdout.print(f"Repaired {repaired} counters!", style="success")
+    else:
+        stdout.print("All counters are consistent.", style="success")
+
+    return 0
+
+
+def check_counters(db: Connection) -> int:
+    stdout.print("Recomputing counters.", style="notice")
+
+    stored: Dict[str, int] = {row["name"]: row["value"] for row in db.execute(load_counters_query)}
+
+    table = Table(title="Counters", show_footer=False, box=box.HEAVY_HEAD)
+    table.add_column(header="Counter", style="bold")
+    table.add_column(header="Stored", justify="right")
+    table.add_column(header="Actual", justify="right")
+    table.add_column(header="Status")
+
+    repaired = 0
+    for name, query in counter_queries.items():
+        actual = db.execute(query).fetchone()["actual"]
+        stored_value = stored.get(name)
+        if stored_value == actual:
+            table.add_row(name, str(stored_value), str(actual), "[success]OK[/success]")
+            continue
+
+        db.execute(repair_counter_query, (name, actual))
+        repaired += 1
+        table.add_row(name, str(stored_value), str(actual), "[warning]Repaired[/warning]")
+
+    stdout.print(table)
+
+    return repaired
+
+
+__all__ = ("run",)
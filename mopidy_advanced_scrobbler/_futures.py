@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, TypeVar
+
+import pykka
+
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+T = TypeVar("T")
+
+# Threads here only ever wait on actor replies, so a handful is plenty.
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="AdvancedScrobblerFuture")
+
+# How many seconds to wait for an actor reply by default. Every wait ties up one of the
+# executor's threads, so an actor that is stuck or still starting must not hold on to it.
+DEFAULT_TIMEOUT = 10.0
+
+
+async def resolve(future: pykka.Future[T], timeout: Optional[float] = DEFAULT_TIMEOUT) -> T:
+    """Wait for a pykka future without blocking the event loop.
+
+    Awaiting a pykka future directly calls its blocking ``get()`` on the event loop thread,
+    which would stall every other HTTP client served by Mopidy. Instead, the wait happens on
+    a worker thread. Futures that are already resolved are returned straight away. Raises
+    ``pykka.Timeout`` if there is no reply within ``timeout`` seconds.
+    """
+    try:
+        return future.get(timeout=0)
+    except pykka.Timeout:
+        pass
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(future.get, timeout=timeout))
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+    Metric = Union["Counter", "Gauge", "Histogram"]
+
+
+METRIC_PREFIX = "mopidy_advanced_scrobbler_"
+
+# Upper bounds of the HTTP request duration buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild(object):
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild(object):
+    __slots__ = ("_lock", "_bounds", "buckets", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        # One slot per bound plus a final one for +Inf. Made cumulative when rendered.
+        self.buckets = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        idx = bisect_left(self._bounds, value)
+        with self._lock:
+            self.buckets[idx] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric(object):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = METRIC_PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError()
+
+    def labels(self, *values: str):
+        """Return the child for these label values. Callers on hot paths may keep the result."""
+        try:
+            return self._children[values]
+        except KeyError:
+            pass
+
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        with self._lock:
+            return self._children.setdefault(values, self._new_child())
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for values, child in self._samples():
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}{labels} {child.value}"  # type: ignore
+
+
+class Gauge(_Metric):
+    """A value read by calling a function when scraped, so keeping it current costs nothing."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        self._function = function
+
+    def render(self) -> Iterator[str]:
+        function = self._function
+        if function is None:
+            return
+        yield from super().render()
+        yield f"{self.name} {_format_value(function())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self) -> Iterator[str]:
+        yield from super().render()
+        for values, child in self._samples():
+            with child._lock:  # type: ignore
+                buckets = list(child.buckets)  # type: ignore
+                total, count = child.sum, child.count  # type: ignore
+
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), buckets):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                labels = _format_labels(self.labelnames, values, le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry(object):
+    """A set of metrics that can be rendered in the Prometheus text exposition format.
+
+    Updating a metric takes a dictionary lookup and an uncontended lock, so it is cheap enough
+    to do on every play and every request. All of the formatting work happens when scraped.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        metric = Gauge(name, documentation)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+plays_recorded = metrics.counter(
+    "plays_recorded_total",
+    "Plays written to the database.",
+)
+plays_skipped = metrics.counter(
+    "plays_skipped_total",
+    "Finished tracks that were not recorded, by reason.",
+    ("reason",),
+)
+now_playing_notifications = metrics.counter(
+    "now_playing_notifications_total",
+    "Now playing notifications sent to Last.fm, by result.",
+    ("result",),
+)
+scrobbles = metrics.counter(
+    "scrobbles_total",
+    "Plays submitted to Last.fm as scrobbles, by result (submitted, ignored or failed).",
+    ("result",),
+)
+service_restarts = metrics.counter(
+    "service_restarts_total",
+    "Service restarts requested after an actor was found to be unavailable.",
+    ("service",),
+)
+ratelimit_tokens = metrics.gauge(
+    "ratelimit_tokens",
+    "Last.fm API calls that can be made without waiting, or negative if calls are waiting.",
+)
+ratelimit_waits = metrics.counter(
+    "ratelimit_waits_total",
+    "Last.fm API calls that had to wait for the rate limiter.",
+)
+ratelimit_wait_seconds = metrics.counter(
+    "ratelimit_wait_seconds_total",
+    "Total time spent waiting for the rate limiter.",
+)
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds",
+    "Time taken to handle web interface and API requests.",
+    ("handler", "method", "status"),
+)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import logging
+import threading
+from bisect import bisect_left
+from collections import deque
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Any, Deque, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, 1000.0, float("inf"))
+
+
+class QueryTiming(object):
+    __slots__ = ("name", "started_at", "rows_returned", "rows_affected")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = perf_counter()
+        self.rows_returned = 0
+        self.rows_affected = 0
+
+
+class _QueryRecord(object):
+    __slots__ = ("count", "slow_count", "total", "max", "rows_returned", "rows_affected", "recent")
+
+    def __init__(self, window: int):
+        self.count = 0
+        self.slow_count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows_returned = 0
+        self.rows_affected = 0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+
+def _percentile(ordered, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    idx = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+class QueryStats(object):
+    """Thread-safe latency and row statistics, kept per named query.
+
+    Lifetime totals are kept alongside a rolling window of the most recent latencies, which
+    the percentiles and histogram in a snapshot are computed from.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._window = window
+        self._records: Dict[str, _QueryRecord] = {}
+        self._lock = threading.Lock()
+
+    def start(self, name: str) -> QueryTiming:
+        return QueryTiming(name)
+
+    def finish(self, timing: QueryTiming, slow_threshold_ms: Optional[int] = None):
+        elapsed_ms = (perf_counter() - timing.started_at) * 1000
+        slow = bool(slow_threshold_ms) and elapsed_ms >= slow_threshold_ms  # type: ignore
+
+        with self._lock:
+            record = self._records.get(timing.name)
+            if record is None:
+                record = self._records[timing.name] = _QueryRecord(self._window)
+            record.count += 1
+            record.total += elapsed_ms
+            record.max = max(record.max, elapsed_ms)
+            record.rows_returned += timing.rows_returned
+            record.rows_affected += timing.rows_affected
+            record.recent.append(elapsed_ms)
+            if slow:
+                record.slow_count += 1
+
+        if slow:
+            logger.warning(
+                "Slow Advanced-Scrobbler DB query %s took %.1f ms (%d rows returned, %d affected)",
+                timing.name,
+                elapsed_ms,
+                timing.rows_returned,
+                timing.rows_affected,
+            )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            records = {
+                name: (
+                    record.count,
+                    record.slow_count,
+                    record.total,
+                    record.max,
+                    record.rows_returned,
+                    record.rows_affected,
+                    sorted(record.recent),
+                )
+                for name, record in self._records.items()
+            }
+
+        snapshot = {}
+        for name, (count, slow_count, total, max_, returned, affected, recent) in records.items():
+            histogram = []
+            for bound in HISTOGRAM_BOUNDS_MS:
+                le = "+Inf" if bound == float("inf") else bound
+                histogram.append((le, bisect_left(recent, bound, hi=len(recent))))
+            # bisect_left counts samples strictly below each bound; the last bucket holds all.
+            histogram[-1] = ("+Inf", len(recent))
+
+            snapshot[name] = {
+                "count": count,
+                "slow_count": slow_count,
+                "total_ms": total,
+                "mean_ms": total / count if count else 0.0,
+                "max_ms": max_,
+                "p50_ms": _percentile(recent, 0.50),
+                "p95_ms": _percentile(recent, 0.95),
+                "p99_ms": _percentile(recent, 0.99),
+                "rows_returned": returned,
+                "rows_affected": affected,
+                "recent_histogram": histogram,
+            }
+
+        return snapshot
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from typing import Callable
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket, refilled continuously at ``rate`` tokens per second.
+
+    Up to ``capacity`` tokens can build up while idle, allowing short bursts above the
+    sustained rate.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(capacity)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = max(now - self._updated_at, 0.0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated_at = now
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available right now, without waiting."""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self) -> float:
+        """Take a token, waiting for one if necessary. Returns how long was spent waiting.
+
+        The token is reserved before waiting, so callers on other threads queue up behind
+        this one rather than racing it for the next token.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            self._sleep(wait)
+        return wait
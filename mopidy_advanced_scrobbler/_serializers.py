@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import tornado.escape
+from marshmallow import fields
+from marshmallow_enum import EnumField
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Union
+
+    from marshmallow import Schema
+
+
+# Fields whose dumped value is the attribute itself, for the values our models hold.
+_PASSTHROUGH_FIELDS = (fields.String, fields.Integer, fields.Boolean)
+
+
+def compile_dumper(schema: Schema) -> Callable[[Any], Dict[str, Any]]:
+    """Compile a schema into a function producing the same dict as ``schema.dump(obj)``.
+
+    Marshmallow dispatches through every field on every dump. The compiled function is a
+    single dict display built once, reading each attribute directly. It is only meant for
+    model instances, which always hold correctly typed values. Any field it does not know
+    how to inline is still serialised by the field itself.
+    """
+    namespace: Dict[str, Any] = {}
+    items = []
+    for idx, (name, field) in enumerate(schema.dump_fields.items()):
+        key = field.data_key or name
+        value = f"obj.{field.attribute or name}"
+
+        if isinstance(field, _PASSTHROUGH_FIELDS):
+            expr = value
+        elif isinstance(field, EnumField) and field.by_value:
+            expr = f"{value}.value"
+            if field.allow_none:
+                expr = f"(None if {value} is None else {expr})"
+        else:
+            namespace[f"field_{idx}"] = field
+            expr = f"field_{idx}.serialize({name!r}, obj)"
+
+        items.append(f"{key!r}: {expr}")
+
+    source = "def dump(obj):\n    return {" + ", ".join(items) + "}\n"
+    exec(compile(source, f"<dumper for {type(schema).__name__}>", "exec"), namespace)
+    return namespace["dump"]
+
+
+# orjson output is not byte-identical to the standard library's, so it is only used when the
+# ``fast_json`` setting asks for it.
+_use_orjson = False
+
+
+def enable_orjson(enabled: bool) -> bool:
+    """Choose whether ``json_encode`` uses orjson, returning whether it now does.
+
+    orjson is only used when it is installed, even if it was asked for.
+    """
+    global _use_orjson
+    _use_orjson = enabled and orjson is not None
+    return _use_orjson
+
+
+def json_encode(value: Any) -> Union[bytes, str]:
+    """Encode a response body, using orjson if it has been enabled with ``enable_orjson``.
+
+    By default the output is identical to ``tornado.escape.json_encode``. orjson output is
+    equivalent JSON without the optional whitespace and escaping of non-ASCII characters.
+    """
+    if not _use_orjson:
+        return tornado.escape.json_encode(value)
+    return orjson.dumps(value).replace(b"</", b"<\\/")
@@ -6,9 +6,11 @@ from typing import TYPE_CHECKING, Generic, TypeVar
 
 import pykka
 
+from ._metrics import service_restarts
+
 
 if TYPE_CHECKING:
-    from typing import Optional, Type
+    from typing import Any, Optional, Sequence, Type
 
 
 ActorRetrievalFailure = (pykka.ActorDeadError, pykka.Timeout)
@@ -24,17 +26,31 @@ class Service(Generic[ActorTypeVar]):
         self._instance_dead = False
         self._instance_urn = None
 
+    def _start_instance(self, *args, **kwargs):
+        return self.actor_class.start(*args, **kwargs).proxy()
+
+    def _instance_alive(self, instance) -> bool:
+        return instance.actor_ref.is_alive()
+
+    def _stop_instance(self, instance, *, block: bool = True):
+        instance.actor_ref.stop(block=block)
+
+    def _get_instance_urn(self, instance) -> str:
+        return instance.actor_ref.actor_urn
+
     def start_service(self, *args, **kwargs):
         self._instance_dead = False
-        self._instance = self.actor_class.start(*args, **kwargs).proxy()
-        self._instance_urn = self._instance.actor_ref.actor_urn
+        self._instance = self._start_instance(*args, **kwargs)
+        self._instance_urn = self._get_instance_urn(self._instance)
 
     def request_service_restart(self, *args, **kwargs):
+        service_restarts.labels(self.actor_class.__name__).inc()
+
         def run_restart():
             instance = self._instance
             self._instance = None
             if instance:
-                instance.actor_ref.stop(block=False)
+                self._stop_instance(instance, block=False)
 
             self.start_service(*args, **kwargs)
 
@@ -56,7 +72,7 @@ class Service(Generic[ActorTypeVar]):
         future = self.actor_class._create_future()
 
         if self._instance:
-            if self._instance.actor_ref.is_alive():
+            if self._instance_alive(self._instance):
                 future.set(self._instance)
                 return future
             else:
@@ -84,7 +100,7 @@ class Service(Generic[ActorTypeVar]):
                     )
 
                 elapsed = time.monotonic() - time_start
-                if elapsed >= timeout:
+                if timeout is not None and elapsed >= timeout:
                     raise pykka.Timeout(f"{elapsed} seconds")
 
                 time.sleep(1)
@@ -98,9 +114,48 @@ class Service(Generic[ActorTypeVar]):
         if not self._instance:
             return
 
-        self._instance.actor_ref.stop()
+        self._stop_instance(self._instance)
         self._actor_stopped()
 
     def _actor_stopped(self):
         self._instance_dead = True
         self._instance = None
+
+
+class ActorPool(Generic[ActorTypeVar]):
+    """A group of identical actors that is used as though it were a single actor proxy.
+
+    Each method call is dispatched to the actor with the fewest queued messages.
+    """
+
+    def __init__(self, actor_refs: Sequence[pykka.ActorRef]):
+        self.actor_refs = tuple(actor_refs)
+        self._proxies = tuple(actor_ref.proxy() for actor_ref in self.actor_refs)
+
+    def __getattr__(self, name: str) -> Any:
+        proxy = min(self._proxies, key=lambda p: p.actor_ref.actor_inbox.qsize())
+        return getattr(proxy, name)
+
+    def is_alive(self) -> bool:
+        return all(actor_ref.is_alive() for actor_ref in self.actor_refs)
+
+    def stop(self, *, block: bool = True):
+        futures = [actor_ref.stop(block=False) for actor_ref in self.actor_refs]
+        if block:
+            for future in futures:
+                future.get()
+
+
+class PoolService(Service[ActorTypeVar]):
+    def _start_instance(self, size: int, *args, **kwargs):
+        actor_refs = [self.actor_class.start(*args, **kwargs) for _ in range(size)]
+        return ActorPool(actor_refs)
+
+    def _instance_alive(self, instance) -> bool:
+        return instance.is_alive()
+
+    def _stop_instance(self, instance, *, block: bool = True):
+        instance.stop(block=block)
+
+    def _get_instance_urn(self, instance) -> str:
+        return ", ".join(actor_ref.actor_urn for actor_ref in instance.actor_refs)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import http.client
+import logging
+import select
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlencode
+
+
+if TYPE_CHECKING:
+    from typing import Callable, Mapping, Optional, Tuple, Type
+
+
+logger = logging.getLogger(__name__)
+
+# Connections left idle for longer than this are closed rather than reused, since the server
+# has most likely given up on them already.
+IDLE_TIMEOUT = 30.0
+
+USER_AGENT = "Mopidy-Advanced-Scrobbler"
+
+# Raised when writing a request to a connection that the server has already closed.
+_STALE_CONNECTION_ERRORS = (BrokenPipeError, ConnectionResetError)
+
+
+class ConnectError(OSError):
+    """A connection to the API host could not be made, so nothing was sent."""
+
+
+class Transport(object):
+    """Sends requests to the Last.fm API on behalf of the network actor."""
+
+    def post(self, path: str, params: Mapping[str, str]) -> Tuple[int, bytes]:
+        """Send a form-encoded POST request, returning the status code and response body."""
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    # An idle connection has nothing to read, so a readable socket means the server has
+    # closed its end (or sent something unexpected, which is just as bad).
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
+
+
+class KeepAliveTransport(Transport):
+    """Sends every request over one persistent connection to the API host.
+
+    The connection is opened on first use and reopened whenever the server closes it, so a
+    TCP and TLS handshake is only needed after a quiet spell rather than for every request.
+    It is not thread-safe, and is only used from the network actor.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        *,
+        connect_timeout: float,
+        read_timeout: float,
+        port: Optional[int] = None,
+        connection_class: Type[http.client.HTTPConnection] = http.client.HTTPSConnection,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._connection_class = connection_class
+        self._clock = clock
+        self._headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Accept-Charset": "utf-8",
+            "User-Agent": USER_AGENT,
+        }
+
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        conn = self._connection_class(self.host, self.port, timeout=self.connect_timeout)
+        try:
+            conn.connect()
+        except OSError as exc:
+            conn.close()
+            raise ConnectError(f"Could not connect to {self.host}: {exc}") from exc
+
+        # Waiting for a response can legitimately take much longer than connecting.
+        conn.sock.settimeout(self.read_timeout)
+        logger.debug("Opened connection to %s", self.host)
+        return conn
+
+    def _reusable_connection(self) -> Optional[http.client.HTTPConnection]:
+        conn = self._conn
+        if conn is None:
+            return None
+        if conn.sock is None or self._clock() - self._last_used > IDLE_TIMEOUT or _is_dropped(conn):
+            self.close()
+            return None
+        return conn
+
+    def _send(self, conn: http.client.HTTPConnection, path: str, body: bytes):
+        conn.request("POST", path, body=body, headers=self._headers)
+
+    def post(self, path: str, params: Mapping[str, str]) -> Tuple[int, bytes]:
+        body = urlencode(params).encode("ascii")
+
+        conn = self._reusable_connection()
+        reused = conn is not None
+        try:
+            if conn is None:
+                conn = self._conn = self._connect()
+            try:
+                self._send(conn, path, body)
+            except _STALE_CONNECTION_ERRORS:
+                # The server can close an idle connection just as a request is sent on it. If
+                # that happens while the request is still being written, the server can't have
+                # acted on it, so it is safe to send it again.
+                if not reused:
+                    raise
+                logger.debug("Connection to %s was closed by the server, reconnecting", self.host)
+                conn.close()
+                conn = self._conn = self._connect()
+                self._send(conn, path, body)
+
+            # Once the whole request has been written, the server may have acted on it even if
+            # no response arrives, so errors from here on are never retried.
+            response = conn.getresponse()
+            status, data = response.status, response.read()
+        except BaseException:
+            self.close()
+            raise
+
+        self._last_used = self._clock()
+        if conn.sock is None:
+            # The server asked for the connection to be closed after this response.
+            self._conn = None
+        return status, data
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -32,6 +32,8 @@ class DbCommand(commands.Command):
     def __init__(self):
         super().__init__()
         self.add_child("sync-corrections", DbSyncCorrectionsCommand())
+        self.add_child("check-counters", DbCheckCountersCommand())
+        self.add_child("archive", DbArchiveCommand())
 
 
 class DbSyncCorrectionsCommand(commands.Command):
@@ -68,3 +70,62 @@ class DbSyncCorrectionsCommand(commands.Command):
             exit_code = 0
 
         return exit_code
+
+
+class DbCheckCountersCommand(commands.Command):
+    help = "Recompute the cached play and correction counts, repairing any drift."
+
+    def run(self, args: Namespace, config):
+        from ._commands import AbortCommand
+
+        _pre_import_deps()
+
+        from ._commands.db.check_counters import run
+
+        try:
+            exit_code = run(args, config)
+        except AbortCommand:
+            exit_code = 1
+
+        if exit_code is None:
+            exit_code = 0
+
+        return exit_code
+
+
+class DbArchiveCommand(commands.Command):
+    help = "Move old submitted plays out of the working plays table into the archive."
+
+    def __init__(self):
+        super().__init__()
+        self.add_argument(
+            "--older-than",
+            type=int,
+            dest="older_than",
+            default=None,
+            help="Archive plays made more than this many days ago. Defaults to archive_after.",
+        )
+        self.add_argument(
+            "--batch-size",
+            type=int,
+            dest="batch_size",
+            default=1000,
+            help="How many plays to move in each transaction.",
+        )
+
+    def run(self, args: Namespace, config):
+        from ._commands import AbortCommand
+
+        _pre_import_deps()
+
+        from ._commands.db.archive import run
+
+        try:
+            exit_code = run(args, config)
+        except AbortCommand:
+            exit_code = 1
+
+        if exit_code is None:
+            exit_code = 0
+
+        return exit_code
@@ -1,21 +1,33 @@
 from __future__ import annotations
 
+import dataclasses
+import functools
+import json
 import logging
 import sqlite3
+import threading
 from enum import Enum
 from pathlib import Path
+from time import monotonic
 from time import time as _time
 from typing import TYPE_CHECKING, Tuple, Union
 
 import pykka
 
-from ._service import Service
+from ._cache import LruCache
+from ._changes import ChangeSequence
+from ._metrics import plays_recorded
+from ._querystats import QueryStats
+from ._service import PoolService, Service
 
 
 if TYPE_CHECKING:
-    from typing import Collection, List, Optional, Sequence
+    from typing import Any, Collection, Dict, List, Optional, Sequence
+
+    from ._querystats import QueryTiming
 
 from mopidy_advanced_scrobbler import Extension
+from mopidy_advanced_scrobbler.models import CorrectionsPage, PlaysPage, SubmissionFailure
 from mopidy_advanced_scrobbler.serial import (
     Corrected,
     Correction,
@@ -23,14 +35,55 @@ from mopidy_advanced_scrobbler.serial import (
     Play,
     PlayEdit,
     RecordedPlay,
-    correction_schema,
-    recorded_play_schema,
 )
 
 
 logger = logging.getLogger(__name__)
 
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 7
+
+# How many plays are loaded per query while exporting the play history.
+EXPORT_CHUNK_SIZE = 500
+
+# While Mopidy is running, plays older than archive_after are archived this many seconds after
+# startup and then once a day, this many plays per transaction.
+ARCHIVE_DELAY = 5 * 60
+ARCHIVE_INTERVAL = 24 * 60 * 60
+ARCHIVE_BATCH_SIZE = 1000
+
+# After a play fails to be submitted, it is retried after this many seconds, doubling with
+# each further failure up to the maximum. Only plays rejected by Last.fm are given up on, so
+# plays recorded while offline are still scrobbled once the connection comes back.
+RETRY_BASE_DELAY = 60
+RETRY_MAX_DELAY = 6 * 60 * 60
+# Caps the doubling itself, so the shift can't overflow however many attempts have failed.
+_RETRY_MAX_DOUBLINGS = 16
+
+# Commits from other processes are noticed at most this many seconds late, so that a burst of
+# correction lookups doesn't query the database's data version for every one.
+DATA_VERSION_CHECK_INTERVAL = 1.0
+
+
+_cache_miss = object()
+
+# Shared by the writer and every reader, so it covers all queries made by this process.
+query_stats = QueryStats()
+
+# Bumped by every write the writer makes, so listings can tell when nothing has changed.
+db_changes = ChangeSequence()
+
+# Set while the writer is holding buffered plays that have not been written yet.
+pending_plays = threading.Event()
+
+insert_play_query = """
+INSERT INTO plays (
+    track_uri, artist, title, album,
+    orig_artist, orig_title, orig_album,
+    corrected, musicbrainz_id, duration, played_at
+) VALUES (
+    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+)
+"""
 
 
 def time() -> int:
@@ -46,6 +99,73 @@ class SortDirectionEnum(Enum):
     SORT_DESC = "desc"
 
 
+def keyset_clause(
+    column: str,
+    sort_direction: SortDirectionEnum,
+    *,
+    after: Optional[Union[int, str]] = None,
+    before: Optional[Union[int, str]] = None,
+) -> Tuple[str, tuple, str, bool]:
+    """Build the condition and ordering for one page of keyset pagination.
+
+    ``after`` and ``before`` are relative to the requested sort direction. Pages before
+    the key are read in the opposite direction, so the caller must reverse the results
+    when the returned flag is set.
+    """
+    ascending = sort_direction == SortDirectionEnum.SORT_ASC
+    if before is not None:
+        comparison = "<" if ascending else ">"
+        order = "DESC" if ascending else "ASC"
+        return f"{column} {comparison} ?", (before,), order, True
+
+    order = "ASC" if ascending else "DESC"
+    if after is not None:
+        comparison = ">" if ascending else "<"
+        return f"{column} {comparison} ?", (after,), order, False
+
+    return "", (), order, False
+
+
+def ranked_keyset_clause(
+    column: str,
+    sort_direction: SortDirectionEnum,
+    *,
+    after: Optional[Tuple[float, Union[int, str]]] = None,
+    before: Optional[Tuple[float, Union[int, str]]] = None,
+) -> Tuple[str, tuple, str, bool]:
+    """Like ``keyset_clause``, but for search results ordered by ``search_rank`` first.
+
+    Keys are (rank, key) pairs. Lower ranks are better matches, and ties between equally
+    good matches are broken by ``column`` in the requested direction. Unlike
+    ``keyset_clause``, the returned ordering is a complete ORDER BY expression.
+    """
+    ascending = sort_direction == SortDirectionEnum.SORT_ASC
+    if before is not None:
+        rank, key = before
+        comparison = "<" if ascending else ">"
+        order = f"search_rank DESC, {column} {'DESC' if ascending else 'ASC'}"
+        condition = f"(search_rank < ? OR (search_rank = ? AND {column} {comparison} ?))"
+        return condition, (rank, rank, key), order, True
+
+    order = f"search_rank ASC, {column} {'ASC' if ascending else 'DESC'}"
+    if after is not None:
+        rank, key = after
+        comparison = ">" if ascending else "<"
+        condition = f"(search_rank > ? OR (search_rank = ? AND {column} {comparison} ?))"
+        return condition, (rank, rank, key), order, False
+
+    return "", (), order, False
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching rows that contain every word, as a prefix.
+
+    Each word is quoted, so any FTS5 operators or punctuation typed by the user are matched
+    literally rather than causing syntax errors.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
 def dict_row_factory(cursor: sqlite3.Cursor, row: tuple):
     d = {}
     for idx, col in enumerate(cursor.description):
@@ -53,11 +173,168 @@ def dict_row_factory(cursor: sqlite3.Cursor, row: tuple):
     return d
 
 
+play_columns = ", ".join(field.name for field in dataclasses.fields(RecordedPlay))
+correction_columns = ", ".join(field.name for field in dataclasses.fields(Correction))
+# Every play, including archived plays. SQLite flattens this into a merge of two primary key
+# scans, so ordered and limited reads stay cheap however large the archive grows.
+all_plays = f"(SELECT {play_columns} FROM plays UNION ALL SELECT {play_columns} FROM plays_archive)"
+
+_load_archivable_batch_query = """
+SELECT play_id FROM plays
+WHERE submitted_at IS NOT NULL AND played_at < ?
+ORDER BY play_id ASC LIMIT ?
+"""
+_archive_plays_query = f"""
+INSERT INTO plays_archive ({play_columns})
+SELECT {play_columns} FROM plays WHERE play_id IN (SELECT value FROM json_each(?))
+"""
+_delete_archived_plays_query = """
+DELETE FROM plays WHERE play_id IN (SELECT value FROM json_each(?))
+"""
+
+
+def archive_plays_batch(conn: sqlite3.Connection, cutoff: int, batch_size: int) -> int:
+    """Move one batch of submitted plays made before ``cutoff`` into the archive.
+
+    The batch is its own short transaction, so plays can still be recorded in between
+    batches while a large backlog is archived. Returns how many plays were moved.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        play_ids = [
+            row["play_id"]
+            for row in conn.execute(_load_archivable_batch_query, (cutoff, batch_size))
+        ]
+        if play_ids:
+            args = (json_ids(play_ids),)
+            conn.execute(_archive_plays_query, args)
+            conn.execute(_delete_archived_plays_query, args)
+
+    return len(play_ids)
+
+
+_search_correction_columns = ", ".join(
+    f"c.{field.name}" for field in dataclasses.fields(Correction)
+)
+# Corrections matching an FTS5 query, with how well each one matched.
+corrections_search = f"""(
+SELECT {_search_correction_columns}, corrections_fts.rank AS search_rank FROM corrections_fts
+JOIN corrections AS c ON c.track_uri = corrections_fts.track_uri
+WHERE corrections_fts MATCH ?
+)"""
+
+# A page key is a play ID or track URI, paired with a rank when searching.
+PageKey = Union[int, str, Tuple[float, Union[int, str]]]
+
+_corrected_idx = [field.name for field in dataclasses.fields(RecordedPlay)].index("corrected")
+
+
+def recorded_play_row_factory(cursor: sqlite3.Cursor, row: tuple) -> RecordedPlay:
+    """Build a RecordedPlay directly from a row selected with ``play_columns``.
+
+    Everything in the internal database was validated before it was written, so rows read
+    back from it skip the marshmallow schemas. Those remain in use for external input.
+    """
+    return RecordedPlay(
+        *row[:_corrected_idx], Corrected(row[_corrected_idx]), *row[_corrected_idx + 1 :]
+    )
+
+
+def correction_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Correction:
+    """Build a Correction directly from a row selected with ``correction_columns``."""
+    return Correction(*row)
+
+
+def ranked_row_factory(row_factory):
+    """Wrap a row factory for rows with an extra trailing ``search_rank`` column."""
+
+    def factory(cursor: sqlite3.Cursor, row: tuple):
+        return row_factory(cursor, row[:-1]), row[-1]
+
+    return factory
+
+
+def execute_trusted(conn: sqlite3.Connection, query: str, args, row_factory) -> sqlite3.Cursor:
+    cursor = conn.cursor()
+    cursor.row_factory = row_factory
+    log_query(query)
+    return cursor.execute(query, args)
+
+
 def log_query(query: str):
-    query = query.replace("\n", "")
-    query = query.replace(" " * 4, " ")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Executing DB query: %s", " ".join(query.split()))
+
+
+def json_ids(ids: Collection[int]) -> str:
+    """Encode IDs as one JSON array parameter, to be expanded with ``json_each`` in SQL.
+
+    This keeps bulk statements to a single bound variable no matter how many IDs there
+    are, so they can never exceed SQLite's limit on the number of variables.
+    """
+    return json.dumps([int(play_id) for play_id in ids])
+
+
+def count_rows(result) -> int:
+    if result is None or isinstance(result, bool):
+        return 0
+    elif isinstance(result, (tuple, list)):
+        return len(result)
+    elif isinstance(result, PlaysPage):
+        return len(result.plays)
+    elif isinstance(result, CorrectionsPage):
+        return len(result.corrections)
+    return 1
+
 
-    logger.debug("Executing DB query: %s", query)
+def instrumented(name: str):
+    """Record the latency and row counts of a database method in ``query_stats``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            timing = query_stats.start(name)
+            self._active_queries.append(timing)
+            try:
+                result = func(self, *args, **kwargs)
+                timing.rows_returned = count_rows(result)
+                return result
+            finally:
+                self._active_queries.pop()
+                query_stats.finish(timing, self._slow_query_threshold)
+
+        return wrapper
+
+    return decorator
+
+
+def changes_data(func):
+    """Bump ``db_changes`` once a write method has finished, whether or not it succeeded."""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            db_changes.bump()
+
+    return wrapper
+
+
+def play_insert_args(play: Play) -> tuple:
+    return (
+        play.track_uri,
+        play.artist,
+        play.title,
+        play.album,
+        play.orig_artist,
+        play.orig_title,
+        play.orig_album,
+        play.corrected.value,
+        play.musicbrainz_id,
+        play.duration,
+        play.played_at,
+    )
 
 
 def get_db_path(config) -> Path:
@@ -73,19 +350,514 @@ class Connection(sqlite3.Connection):
         self.execute("PRAGMA foreign_keys = ON")
 
 
-class AdvancedScrobblerDb(pykka.ThreadingActor):
-    schema_version = SCHEMA_VERSION
+class ReadOnlyConnection(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        kwargs["isolation_level"] = None
+        super().__init__(*args, **kwargs)
+        self.row_factory = dict_row_factory
+        self.execute("PRAGMA query_only = ON")
+
+
+class DbReadMixin(object):
+    """Read-only queries, shared by the writer actor and the read-only reader actors."""
 
     def __init__(self, config):
         super().__init__()
 
+        self._slow_query_threshold: Optional[int] = config["advanced_scrobbler"][
+            "slow_query_threshold"
+        ]
+        self._active_queries: List[QueryTiming] = []
+
+    def _connect(self) -> Connection:
+        raise NotImplementedError()
+
+    def _sync_pending_plays(self):
+        """Make sure plays buffered by the writer are visible before plays are read."""
+        raise NotImplementedError()
+
+    def _execute(
+        self, conn: sqlite3.Connection, query: str, args=(), row_factory=None
+    ) -> sqlite3.Cursor:
+        if row_factory is None:
+            log_query(query)
+            cursor = conn.execute(query, args)
+        else:
+            cursor = execute_trusted(conn, query, args, row_factory)
+
+        if self._active_queries and cursor.rowcount > 0:
+            self._active_queries[-1].rows_affected += cursor.rowcount
+        return cursor
+
+    @instrumented("find_play")
+    def find_play(self, play_id: int) -> Optional[RecordedPlay]:
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        query = f"SELECT {play_columns} FROM {all_plays} WHERE play_id = ?"
+        cursor = self._execute(conn, query, (play_id,), recorded_play_row_factory)
+
+        return cursor.fetchone()
+
+    @instrumented("find_plays")
+    def find_plays(
+        self,
+        play_ids: Sequence[int],
+        *,
+        only_unsubmitted: bool = False,
+    ) -> Collection[RecordedPlay]:
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        # Archived plays are always submitted, so they can be skipped when they won't match.
+        source = "plays" if only_unsubmitted else all_plays
+        query = (
+            f"SELECT {play_columns} FROM {source} WHERE play_id IN (SELECT value FROM json_each(?))"
+        )
+        if only_unsubmitted:
+            query += " AND submitted_at IS NULL"
+        query += " ORDER BY play_id ASC"
+        args = (json_ids(play_ids),)
+
+        cursor = self._execute(conn, query, args, recorded_play_row_factory)
+
+        return tuple(cursor)
+
+    @instrumented("load_plays")
+    def load_plays(
+        self,
+        *,
+        sort_direction: SortDirectionEnum = SortDirectionEnum.SORT_DESC,
+        page_num: int = 1,
+        page_size: int = 50,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+    ) -> Collection[RecordedPlay]:
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        plays, _ = self._select_plays(
+            conn,
+            sort_direction=sort_direction,
+            page_num=page_num,
+            page_size=page_size,
+            after=after,
+            before=before,
+        )
+        return plays
+
+    @instrumented("load_plays_page")
+    def load_plays_page(
+        self,
+        *,
+        sort_direction: SortDirectionEnum = SortDirectionEnum.SORT_DESC,
+        page_num: int = 1,
+        page_size: int = 50,
+        after: Optional[PageKey] = None,
+        before: Optional[PageKey] = None,
+        search: Optional[str] = None,
+        corrected: Optional[Corrected] = None,
+        submitted: Optional[bool] = None,
+    ) -> PlaysPage:
+        """Load a page of plays along with the play counts, all from one read transaction.
+
+        When searching, plays are ordered by how well they match, and the page keys are
+        (rank, play ID) pairs. The matched count is only included when filtering.
+        """
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        search = fts_query(search) if search else None
+        filters = {"search": search, "corrected": corrected, "submitted": submitted}
+        filtering = any(value is not None for value in filters.values())
+
+        with conn:
+            conn.execute("BEGIN")
+            plays, ranks = self._select_plays(
+                conn,
+                sort_direction=sort_direction,
+                page_num=page_num,
+                page_size=page_size,
+                after=after,
+                before=before,
+                **filters,
+            )
+            unsubmitted_ids = [play.play_id for play in plays if play.submitted_at is None]
+            return PlaysPage(
+                plays=plays,
+                overall_count=self._select_counter(conn, "plays"),
+                unsubmitted_count=self._select_counter(conn, "plays_unsubmitted"),
+                matched_count=self._count_plays(conn, **filters) if filtering else None,
+                ranks=ranks,
+                failures=self._select_submission_failures(conn, unsubmitted_ids),
+                in_flight=self._select_in_flight_play_ids(conn, unsubmitted_ids),
+            )
+
+    def _filter_plays(
+        self,
+        *,
+        search: Optional[str] = None,
+        corrected: Optional[Corrected] = None,
+        submitted: Optional[bool] = None,
+    ) -> Tuple[str, List[str], List[Any]]:
+        """Work out the source and conditions of a filtered listing of plays.
+
+        ``search`` must already be an FTS5 query. Searches select an extra ``search_rank``.
+        """
+        # Archived plays are always submitted, so they can be skipped when they won't match.
+        tables = ("plays",) if submitted is False else ("plays", "plays_archive")
+        conditions: List[str] = []
+        args: List[Any] = []
+
+        if search:
+            columns = ", ".join(f"p.{field.name}" for field in dataclasses.fields(RecordedPlay))
+            source = " UNION ALL ".join(
+                f"SELECT {columns}, plays_fts.rank AS search_rank FROM plays_fts"
+                f" JOIN {table} AS p ON p.play_id = plays_fts.rowid WHERE plays_fts MATCH ?"
+                for table in tables
+            )
+            source = f"({source})"
+            args.extend(search for _ in tables)
+        else:
+            source = all_plays if len(tables) > 1 else "plays"
+
+        if corrected is not None:
+            conditions.append("corrected = ?")
+            args.append(int(corrected))
+        if submitted is True:
+            conditions.append("submitted_at IS NOT NULL")
+        elif submitted is False:
+            conditions.append("submitted_at IS NULL")
+
+        return source, conditions, args
+
+    def _select_plays(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        sort_direction: SortDirectionEnum,
+        page_num: int,
+        page_size: int,
+        after: Optional[PageKey],
+        before: Optional[PageKey],
+        search: Optional[str] = None,
+        corrected: Optional[Corrected] = None,
+        submitted: Optional[bool] = None,
+    ) -> Tuple[Tuple[RecordedPlay, ...], Optional[Tuple[float, ...]]]:
+        source, conditions, args = self._filter_plays(
+            search=search, corrected=corrected, submitted=submitted
+        )
+
+        if search:
+            condition, keyset_args, order_by, reverse = ranked_keyset_clause(
+                "play_id", sort_direction, after=after, before=before
+            )
+            query = f"SELECT {play_columns}, search_rank FROM {source}"
+            row_factory = ranked_row_factory(recorded_play_row_factory)
+        else:
+            condition, keyset_args, order, reverse = keyset_clause(
+                "play_id", sort_direction, after=after, before=before
+            )
+            order_by = f"play_id {order}"
+            query = f"SELECT {play_columns} FROM {source}"
+            row_factory = recorded_play_row_factory
+
+        if condition:
+            conditions.append(condition)
+            args.extend(keyset_args)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        limit = int(page_size)
+        query += f" ORDER BY {order_by} LIMIT {limit}"
+        if not condition:
+            query += f" OFFSET {(int(page_num) - 1) * limit}"
+
+        cursor = self._execute(conn, query, args, row_factory)
+
+        rows = cursor.fetchall()
+        if reverse:
+            rows.reverse()
+
+        if search:
+            plays, ranks = zip(*rows) if rows else ((), ())
+            return tuple(plays), tuple(ranks)
+        return tuple(rows), None
+
+    def _count_plays(self, conn: sqlite3.Connection, **filters) -> int:
+        source, conditions, args = self._filter_plays(**filters)
+
+        query = f"SELECT COUNT(*) AS count FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        cursor = self._execute(conn, query, args)
+        return int(cursor.fetchone()["count"])
+
+    def _select_submission_failures(
+        self, conn: sqlite3.Connection, play_ids: Collection[int]
+    ) -> Tuple[SubmissionFailure, ...]:
+        if not play_ids:
+            return ()
+
+        # Plays in flight are reported even before any attempt has failed, since they are held
+        # back from automatic scrobbling just the same.
+        query = """
+        SELECT
+            p.play_id,
+            p.attempts,
+            p.last_error,
+            CASE WHEN f.play_id IS NULL THEN p.next_attempt_at END AS next_attempt_at,
+            f.play_id IS NOT NULL AS in_flight
+        FROM plays AS p LEFT JOIN plays_in_flight AS f ON f.play_id = p.play_id
+        WHERE (p.attempts > 0 OR f.play_id IS NOT NULL)
+        AND p.play_id IN (SELECT value FROM json_each(?))
+        ORDER BY p.play_id
+        """
+        cursor = self._execute(conn, query, (json_ids(play_ids),))
+        return tuple(
+            SubmissionFailure(**{**row, "in_flight": bool(row["in_flight"])}) for row in cursor
+        )
+
+    def _select_in_flight_play_ids(
+        self, conn: sqlite3.Connection, play_ids: Collection[int]
+    ) -> Tuple[int, ...]:
+        if not play_ids:
+            return ()
+
+        query = """
+        SELECT play_id FROM plays_in_flight
+        WHERE play_id IN (SELECT value FROM json_each(?))
+        ORDER BY play_id
+        """
+        cursor = self._execute(conn, query, (json_ids(play_ids),))
+        return tuple(row["play_id"] for row in cursor)
+
+    def _select_counter(self, conn: sqlite3.Connection, name: str) -> int:
+        cursor = self._execute(conn, "SELECT value FROM counters WHERE name = ?", (name,))
+        result = cursor.fetchone()
+
+        return int(result["value"])
+
+    @instrumented("load_unsubmitted_plays_batch")
+    def load_unsubmitted_plays_batch(
+        self, *, checkpoint: Optional[int] = None, hold_auto_corrected: bool = False
+    ) -> Collection[RecordedPlay]:
+        """Load the next batch of plays to scrobble.
+
+        Plays left in flight by an interrupted submission may already have been scrobbled, so
+        they are never included. Neither are plays waiting to retry a failed submission, or
+        plays that have been given up on.
+        """
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        query = (
+            f"SELECT {play_columns} FROM plays WHERE submitted_at IS NULL"
+            " AND play_id NOT IN (SELECT play_id FROM plays_in_flight)"
+            f" AND (attempts = 0 OR next_attempt_at <= {time()})"
+        )
+        if checkpoint:
+            query += f" AND play_id <= {checkpoint}"
+        if hold_auto_corrected:
+            query += f" AND corrected != {Corrected.AUTO_CORRECTED.value}"
+        query += " ORDER BY play_id ASC LIMIT 50"
+        cursor = self._execute(conn, query, (), recorded_play_row_factory)
+
+        return tuple(cursor)
+
+    @instrumented("export_plays_chunk")
+    def export_plays_chunk(
+        self,
+        *,
+        after: Optional[int] = None,
+        limit: int = EXPORT_CHUNK_SIZE,
+        submitted: Optional[bool] = None,
+        played_from: Optional[int] = None,
+        played_to: Optional[int] = None,
+    ) -> Collection[RecordedPlay]:
+        """Load the next chunk of an export, in ascending play ID order.
+
+        Each chunk is a separate short query keyed on the last play ID already exported, so
+        an export never holds a transaction open or ties up a reader between chunks.
+        """
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        conditions = []
+        args: List[Any] = []
+        if after is not None:
+            conditions.append("play_id > ?")
+            args.append(after)
+        if submitted is True:
+            conditions.append("submitted_at IS NOT NULL")
+        elif submitted is False:
+            conditions.append("submitted_at IS NULL")
+        if played_from is not None:
+            conditions.append("played_at >= ?")
+            args.append(played_from)
+        if played_to is not None:
+            conditions.append("played_at < ?")
+            args.append(played_to)
+
+        # Archived plays are always submitted, so they can be skipped when they won't match.
+        source = "plays" if submitted is False else all_plays
+        query = f"SELECT {play_columns} FROM {source}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY play_id ASC LIMIT {int(limit)}"
+
+        cursor = self._execute(conn, query, args, recorded_play_row_factory)
+
+        return tuple(cursor)
+
+    @instrumented("get_plays_count")
+    def get_plays_count(self, *, only_unsubmitted: bool = False) -> int:
+        self._sync_pending_plays()
+        conn = self._connect()
+
+        return self._select_counter(conn, "plays_unsubmitted" if only_unsubmitted else "plays")
+
+    @instrumented("load_corrections")
+    def load_corrections(
+        self,
+        *,
+        page_num: int = 1,
+        page_size: int = 50,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+    ) -> Collection[Correction]:
+        conn = self._connect()
+
+        corrections, _ = self._select_corrections(
+            conn, page_num=page_num, page_size=page_size, after=after, before=before
+        )
+        return corrections
+
+    @instrumented("load_corrections_page")
+    def load_corrections_page(
+        self,
+        *,
+        page_num: int = 1,
+        page_size: int = 50,
+        after: Optional[PageKey] = None,
+        before: Optional[PageKey] = None,
+        search: Optional[str] = None,
+    ) -> CorrectionsPage:
+        """Load a page of corrections along with their count, all from one read transaction.
+
+        Searches work the same way as they do for ``load_plays_page``.
+        """
+        conn = self._connect()
+
+        search = fts_query(search) if search else None
+
+        with conn:
+            conn.execute("BEGIN")
+            corrections, ranks = self._select_corrections(
+                conn,
+                page_num=page_num,
+                page_size=page_size,
+                after=after,
+                before=before,
+                search=search,
+            )
+            return CorrectionsPage(
+                corrections=corrections,
+                overall_count=self._select_counter(conn, "corrections"),
+                matched_count=self._count_corrections(conn, search) if search else None,
+                ranks=ranks,
+            )
+
+    def _select_corrections(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        page_num: int,
+        page_size: int,
+        after: Optional[PageKey],
+        before: Optional[PageKey],
+        search: Optional[str] = None,
+    ) -> Tuple[Tuple[Correction, ...], Optional[Tuple[float, ...]]]:
+        args: List[Any] = []
+        if search:
+            condition, keyset_args, order_by, reverse = ranked_keyset_clause(
+                "track_uri", SortDirectionEnum.SORT_ASC, after=after, before=before
+            )
+            query = f"SELECT {correction_columns}, search_rank FROM {corrections_search}"
+            args.append(search)
+            row_factory = ranked_row_factory(correction_row_factory)
+        else:
+            condition, keyset_args, order, reverse = keyset_clause(
+                "track_uri", SortDirectionEnum.SORT_ASC, after=after, before=before
+            )
+            order_by = f"track_uri {order}"
+            query = f"SELECT {correction_columns} FROM corrections"
+            row_factory = correction_row_factory
+
+        if condition:
+            query += f" WHERE {condition}"
+            args.extend(keyset_args)
+
+        limit = int(page_size)
+        query += f" ORDER BY {order_by} LIMIT {limit}"
+        if not condition:
+            query += f" OFFSET {(int(page_num) - 1) * limit}"
+
+        cursor = self._execute(conn, query, args, row_factory)
+
+        rows = cursor.fetchall()
+        if reverse:
+            rows.reverse()
+
+        if search:
+            corrections, ranks = zip(*rows) if rows else ((), ())
+            return tuple(corrections), tuple(ranks)
+        return tuple(rows), None
+
+    def _count_corrections(self, conn: sqlite3.Connection, search: str) -> int:
+        query = f"SELECT COUNT(*) AS count FROM {corrections_search}"
+        cursor = self._execute(conn, query, (search,))
+        return int(cursor.fetchone()["count"])
+
+    @instrumented("get_corrections_count")
+    def get_corrections_count(self) -> int:
+        conn = self._connect()
+
+        return self._select_counter(conn, "corrections")
+
+
+class AdvancedScrobblerDb(DbReadMixin, pykka.ThreadingActor):
+    schema_version = SCHEMA_VERSION
+
+    def __init__(self, config):
+        super().__init__(config)
+
         self._dbpath = get_db_path(config)
+        db_changes.watch(self._dbpath)
         self._timeout = config["advanced_scrobbler"]["db_timeout"]
 
         self._sqlpath = Path(__file__).parent / "sql"
 
         self._connection: Optional[Connection] = None
 
+        # Negative lookups are cached as None, so tracks without a correction are cheap too.
+        self._correction_cache: LruCache[str, Optional[Correction]] = LruCache(
+            config["advanced_scrobbler"]["correction_cache_size"] or 0
+        )
+        self._data_version: Optional[int] = None
+        self._data_version_checked_at: Optional[float] = None
+
+        self._write_behind_size = config["advanced_scrobbler"]["write_behind_size"] or 0
+        self._write_behind_delay = config["advanced_scrobbler"]["write_behind_delay"] or 0
+        self._pending_plays: List[Play] = []
+        self._flush_timer: Optional[threading.Timer] = None
+
+        self._archive_after = config["advanced_scrobbler"]["archive_after"]
+        self._archive_timer: Optional[threading.Timer] = None
+
+        self._proxy = self.actor_ref.proxy()
+
     def _connect(self):
         if not self._connection:
             logger.info("Connecting to Advanced-Scrobbler sqlite database at %s", self._dbpath)
@@ -104,10 +876,25 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
             logger.exception(f"Error during Advanced-Scrobbler database preparation: {exc}")
             raise
 
+        if self._archive_after:
+            self._schedule_archive(ARCHIVE_DELAY)
+
     def on_stop(self):
+        if self._archive_timer:
+            self._archive_timer.cancel()
+            self._archive_timer = None
+
+        try:
+            self.flush_plays()
+        except Exception as exc:
+            logger.exception(f"Error while writing buffered plays during shutdown: {exc}")
+
         if self._connection:
             self._connection.close()
 
+    def _sync_pending_plays(self):
+        self.flush_plays()
+
     def prepare_db(self):
         conn = self._connect()
         schema_version = AdvancedScrobblerDb.schema_version
@@ -134,123 +921,125 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
                 user_version,
             )
 
-    def find_play(self, play_id: int) -> Optional[RecordedPlay]:
-        conn = self._connect()
-
-        query = "SELECT * FROM plays WHERE play_id = ?"
-        log_query(query)
-        cursor = conn.execute(query, (play_id,))
-        result = cursor.fetchone()
-
-        if result:
-            return recorded_play_schema.load(result)
-        else:
-            return None
-
-    def find_plays(
-        self,
-        play_ids: Sequence[int],
-        *,
-        only_unsubmitted: bool = False,
-    ) -> Collection[RecordedPlay]:
-        play_ids = play_ids[:50]
-
-        conn = self._connect()
-
-        query_template = "SELECT * FROM plays WHERE play_id IN ({0})"
-        if only_unsubmitted:
-            query_template += " AND submitted_at IS NULL"
-        placeholders = ("?, " * len(play_ids))[:-2]  # remove the last ", "
-        query = query_template.format(placeholders)
-        args = play_ids
+    def record_play(self, play: Play):
+        if self._write_behind_size:
+            self._buffer_play(play)
+            return
 
-        log_query(query)
-        cursor = conn.execute(query, args)
+        self._insert_play(play)
 
-        plays: List[RecordedPlay] = recorded_play_schema.load(cursor, many=True)
+    @changes_data
+    @instrumented("record_play")
+    def _insert_play(self, play: Play):
+        with self._connect() as conn:
+            self._execute(conn, insert_play_query, play_insert_args(play))
+        plays_recorded.inc()
+
+    @changes_data
+    def _buffer_play(self, play: Play):
+        self._pending_plays.append(play)
+        pending_plays.set()
+
+        if len(self._pending_plays) >= self._write_behind_size:
+            self.flush_plays()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self._write_behind_delay, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self):
+        # Runs on the timer thread, so hand the work back to the actor.
+        try:
+            self._proxy.flush_plays()
+        except pykka.ActorDeadError:
+            pass
 
-        return tuple(plays)
+    def _schedule_archive(self, delay: float):
+        self._archive_timer = threading.Timer(delay, self._timed_archive)
+        self._archive_timer.daemon = True
+        self._archive_timer.start()
 
-    def load_plays(
-        self,
-        *,
-        sort_direction: SortDirectionEnum = SortDirectionEnum.SORT_DESC,
-        page_num: int = 1,
-        page_size: int = 50,
-    ) -> Collection[RecordedPlay]:
-        conn = self._connect()
+    def _timed_archive(self):
+        # Runs on the timer thread, so hand the work back to the actor.
+        try:
+            self._proxy.archive_old_plays()
+        except pykka.ActorDeadError:
+            pass
 
-        order = sort_direction.value
-        limit = int(page_size)
-        offset = (int(page_num) - 1) * limit
+    @changes_data
+    @instrumented("archive_old_plays")
+    def archive_old_plays(self) -> int:
+        """Archive one batch of plays older than ``archive_after``.
 
-        query = f"SELECT * FROM plays ORDER BY play_id {order} LIMIT {limit} OFFSET {offset}"
-        log_query(query)
-        cursor = conn.execute(query)
+        Only one batch is moved per message, so plays recorded during a large backlog are
+        written in between batches rather than after all of them.
+        """
+        self._archive_timer = None
+        cutoff = time() - self._archive_after * 86400
 
-        plays: List[RecordedPlay] = recorded_play_schema.load(cursor, many=True)
+        try:
+            archived = archive_plays_batch(self._connect(), cutoff, ARCHIVE_BATCH_SIZE)
+        except sqlite3.Error as exc:
+            logger.exception(f"Error while archiving old plays: {exc}")
+            archived = 0
 
-        return tuple(plays)
+        if archived == ARCHIVE_BATCH_SIZE:
+            self._proxy.archive_old_plays()
+        else:
+            if archived:
+                logger.info("Archived plays older than %d days", self._archive_after)
+            self._schedule_archive(ARCHIVE_INTERVAL)
+        return archived
 
-    def load_unsubmitted_plays_batch(
-        self, *, checkpoint: Optional[int] = None
-    ) -> Collection[RecordedPlay]:
-        conn = self._connect()
+    def flush_plays(self):
+        """Write all buffered plays in a single transaction."""
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
 
-        query = "SELECT * FROM plays WHERE submitted_at IS NULL"
-        if checkpoint:
-            query += f" AND play_id <= {checkpoint}"
-        query += " ORDER BY play_id ASC LIMIT 50"
-        log_query(query)
-        cursor = conn.execute(query)
+        if not self._pending_plays:
+            return
 
-        plays: List[RecordedPlay] = recorded_play_schema.load(cursor, many=True)
+        self._write_pending_plays()
 
-        return tuple(plays)
+        logger.debug("Wrote %d buffered plays", len(self._pending_plays))
+        self._pending_plays = []
+        pending_plays.clear()
 
-    def get_plays_count(self, *, only_unsubmitted: bool = False) -> int:
-        conn = self._connect()
+    @changes_data
+    @instrumented("flush_plays")
+    def _write_pending_plays(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            log_query(insert_play_query)
+            cursor = conn.executemany(insert_play_query, map(play_insert_args, self._pending_plays))
+            self._active_queries[-1].rows_affected += cursor.rowcount
+        plays_recorded.inc(len(self._pending_plays))
 
-        query = "SELECT COUNT(*) as plays_count FROM plays"
-        if only_unsubmitted:
-            query += " WHERE submitted_at IS NULL"
+    @changes_data
+    @instrumented("edit_play")
+    def edit_play(self, play_edit: PlayEdit):
+        play = self.find_play(play_edit.play_id)
+        self._check_play_edit(play, play_edit)
 
-        log_query(query)
-        cursor = conn.execute(query)
-        result = cursor.fetchone()
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            self._apply_play_edit(conn, play, play_edit)
 
-        return int(result["plays_count"])
-
-    def record_play(self, play: Play):
-        query = """
-            INSERT INTO plays (
-                track_uri, artist, title, album,
-                orig_artist, orig_title, orig_album,
-                corrected, musicbrainz_id, duration, played_at
-            ) VALUES (
-                ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-            )
-        """
-        args = (
-            play.track_uri,
-            play.artist,
-            play.title,
-            play.album,
-            play.orig_artist,
-            play.orig_title,
-            play.orig_album,
-            play.corrected.value,
-            play.musicbrainz_id,
-            play.duration,
-            play.played_at,
-        )
+    @changes_data
+    @instrumented("edit_plays")
+    def edit_plays(self, play_edits: Collection[PlayEdit]):
+        """Apply several play edits in one transaction. Nothing is changed if any are invalid."""
+        plays = {play.play_id: play for play in self.find_plays([e.play_id for e in play_edits])}
+        for play_edit in play_edits:
+            self._check_play_edit(plays.get(play_edit.play_id), play_edit)
 
         with self._connect() as conn:
-            log_query(query)
-            conn.execute(query, args)
+            conn.execute("BEGIN")
+            for play_edit in play_edits:
+                self._apply_play_edit(conn, plays[play_edit.play_id], play_edit)
 
-    def edit_play(self, play_edit: PlayEdit):
-        play = self.find_play(play_edit.play_id)
+    def _check_play_edit(self, play: Optional[RecordedPlay], play_edit: PlayEdit):
         if not isinstance(play, RecordedPlay):
             raise DbClientError(f"No play found with ID '{play_edit.play_id}'.")
         elif play_edit.track_uri != play.track_uri:
@@ -260,40 +1049,42 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
                 "The relevant play was already submitted and can no longer be updated."
             )
 
-        with self._connect() as conn:
-            conn.execute("BEGIN")
-
-            play_update_args: Tuple[Union[str, int], ...] = (
-                play_edit.artist.strip(),
-                play_edit.title.strip(),
-                play_edit.album.strip(),
-                Corrected.MANUALLY_CORRECTED,
+    def _apply_play_edit(self, conn: Connection, play: RecordedPlay, play_edit: PlayEdit):
+        play_update_args: Tuple[Union[str, int], ...] = (
+            play_edit.artist.strip(),
+            play_edit.title.strip(),
+            play_edit.album.strip(),
+            Corrected.MANUALLY_CORRECTED,
+        )
+        if play_edit.update_all_unsubmitted:
+            play_update_query = """
+            UPDATE plays SET artist = ?, title = ?, album = ?, corrected = ?
+            WHERE track_uri = ? AND submitted_at IS NULL
+            """
+            play_update_args += (play.track_uri,)
+        else:
+            play_update_query = (
+                "UPDATE plays SET artist = ?, title = ?, album = ?, corrected = ? WHERE play_id = ?"
             )
-            if play_edit.update_all_unsubmitted:
-                play_update_query = """
-                UPDATE plays SET artist = ?, title = ?, album = ?, corrected = ?
-                WHERE track_uri = ? AND submitted_at IS NULL
-                """
-                play_update_args += (play.track_uri,)
-            else:
-                play_update_query = "UPDATE plays SET artist = ?, title = ?, album = ?, corrected = ? WHERE play_id = ?"
-                play_update_args += (play.play_id,)
+            play_update_args += (play.play_id,)
 
-            log_query(play_update_query)
-            conn.execute(play_update_query, play_update_args)
+        self._execute(conn, play_update_query, play_update_args)
 
-            if play_edit.save_correction:
-                correction_upsert_query = """
-                INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)
-                ON CONFLICT (track_uri) DO
-                UPDATE SET artist = excluded.artist, title = excluded.title, album = excluded.album
-                """
-                log_query(correction_upsert_query)
-                conn.execute(
-                    correction_upsert_query,
-                    (play.track_uri, play_edit.artist, play_edit.title, play_edit.album),
-                )
+        if play_edit.save_correction:
+            correction_upsert_query = """
+            INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)
+            ON CONFLICT (track_uri) DO
+            UPDATE SET artist = excluded.artist, title = excluded.title, album = excluded.album
+            """
+            self._execute(
+                conn,
+                correction_upsert_query,
+                (play.track_uri, play_edit.artist, play_edit.title, play_edit.album),
+            )
+            self._correction_cache.invalidate(play.track_uri)
 
+    @changes_data
+    @instrumented("delete_play")
     def delete_play(self, play_id: int) -> bool:
         play = self.find_play(play_id)
         if not isinstance(play, RecordedPlay):
@@ -307,20 +1098,25 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
         delete_args = (play_id,)
 
         with self._connect() as conn:
-            log_query(delete_query)
-            cursor = conn.execute(delete_query, delete_args)
+            cursor = self._execute(conn, delete_query, delete_args)
             return cursor.rowcount == 1
 
+    @changes_data
+    @instrumented("delete_plays")
     def delete_plays(self, play_ids: Collection[int]):
-        delete_query_template = "DELETE FROM plays WHERE submitted_at IS NULL AND play_id IN ({0})"
-        placeholders = ("?, " * len(play_ids))[:-2]  # remove the last ", "
-        delete_query = delete_query_template.format(placeholders)
-        delete_args = play_ids
+        self.flush_plays()
+
+        delete_query = """
+        DELETE FROM plays
+        WHERE submitted_at IS NULL AND play_id IN (SELECT value FROM json_each(?))
+        """
+        delete_args = (json_ids(play_ids),)
 
         with self._connect() as conn:
-            log_query(delete_query)
-            conn.execute(delete_query, delete_args)
+            self._execute(conn, delete_query, delete_args)
 
+    @changes_data
+    @instrumented("mark_play_submitted")
     def mark_play_submitted(self, play_id: int) -> bool:
         play = self.find_play(play_id)
         if not isinstance(play, RecordedPlay):
@@ -334,61 +1130,178 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
         update_args = (time(), play_id)
 
         with self._connect() as conn:
-            log_query(update_query)
-            cursor = conn.execute(update_query, update_args)
+            cursor = self._execute(conn, update_query, update_args)
             return cursor.rowcount == 1
 
-    def mark_plays_submitted(self, play_ids: Collection[int]):
-        update_query_template = (
-            "UPDATE plays SET submitted_at = ? WHERE submitted_at IS NULL AND play_id IN ({0})"
+    @changes_data
+    @instrumented("begin_submission")
+    def begin_submission(self, play_ids: Collection[int]):
+        """Record that plays are about to be sent to Last.fm, before they are sent.
+
+        The record is removed when the plays are marked as submitted, or by
+        ``abandon_submission`` when sending them definitely failed.
+        """
+        insert_query = """
+        INSERT OR REPLACE INTO plays_in_flight (play_id, started_at)
+        SELECT value, ? FROM json_each(?)
+        """
+        insert_args = (time(), json_ids(play_ids))
+
+        with self._connect() as conn:
+            self._execute(conn, insert_query, insert_args)
+
+    @changes_data
+    @instrumented("abandon_submission")
+    def abandon_submission(self, play_ids: Collection[int]):
+        """Release plays left in flight, so that they are submitted automatically again.
+
+        Only meant for plays that are known not to have reached Last.fm, for example after
+        checking the user's profile there.
+        """
+        delete_query = (
+            "DELETE FROM plays_in_flight WHERE play_id IN (SELECT value FROM json_each(?))"
         )
-        placeholders = ("?, " * len(play_ids))[:-2]  # remove the last ", "
-        update_query = update_query_template.format(placeholders)
-        update_args = (time(), *play_ids)
+        delete_args = (json_ids(play_ids),)
 
         with self._connect() as conn:
-            log_query(update_query)
-            conn.execute(update_query, update_args)
+            self._execute(conn, delete_query, delete_args)
 
-    def find_correction(self, track_uri: str) -> Optional[Correction]:
-        conn = self._connect()
+    @changes_data
+    @instrumented("record_submission_failure")
+    def record_submission_failure(
+        self, play_ids: Collection[int], error: str, *, rejected: bool = False
+    ):
+        """Record a failed attempt to submit plays, and when they can next be tried.
 
-        query = "SELECT * FROM corrections WHERE track_uri = ?"
-        log_query(query)
-        cursor = conn.execute(query, (track_uri,))
-        result = cursor.fetchone()
+        Plays that Last.fm rejected are not retried until they are edited or reset. Any other
+        failure is retried indefinitely, backing off up to ``RETRY_MAX_DELAY``.
+        """
+        update_query = """
+        UPDATE plays SET
+            attempts = attempts + 1,
+            last_error = ?,
+            next_attempt_at = CASE
+                WHEN ? THEN NULL
+                ELSE ? + min(?, ? << min(attempts, ?))
+            END
+        WHERE submitted_at IS NULL AND play_id IN (SELECT value FROM json_each(?))
+        """
+        update_args = (
+            error,
+            rejected,
+            time(),
+            RETRY_MAX_DELAY,
+            RETRY_BASE_DELAY,
+            _RETRY_MAX_DOUBLINGS,
+            json_ids(play_ids),
+        )
+        delete_query = (
+            "DELETE FROM plays_in_flight WHERE play_id IN (SELECT value FROM json_each(?))"
+        )
 
-        if result:
-            return correction_schema.load(result)
-        else:
-            return None
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            self._execute(conn, update_query, update_args)
+            self._execute(conn, delete_query, (json_ids(play_ids),))
 
-    def load_corrections(self, *, page_num: int = 1, page_size: int = 50) -> Collection[Correction]:
+    @changes_data
+    @instrumented("reset_submission_failures")
+    def reset_submission_failures(self, play_ids: Collection[int]):
+        """Forget earlier failures, so that the plays are submitted by the next sweep.
+
+        Plays left in flight are released as well, as by ``abandon_submission``.
+        """
+        update_query = """
+        UPDATE plays SET attempts = 0, last_error = NULL, next_attempt_at = NULL
+        WHERE submitted_at IS NULL AND attempts > 0
+        AND play_id IN (SELECT value FROM json_each(?))
+        """
+        delete_query = (
+            "DELETE FROM plays_in_flight WHERE play_id IN (SELECT value FROM json_each(?))"
+        )
+
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            self._execute(conn, update_query, (json_ids(play_ids),))
+            self._execute(conn, delete_query, (json_ids(play_ids),))
+
+    @instrumented("find_in_flight_play_ids")
+    def find_in_flight_play_ids(self) -> Collection[int]:
         conn = self._connect()
+        cursor = self._execute(conn, "SELECT play_id FROM plays_in_flight ORDER BY play_id")
+        return tuple(row["play_id"] for row in cursor)
 
-        limit = int(page_size)
-        offset = (int(page_num) - 1) * limit
+    @changes_data
+    @instrumented("mark_plays_submitted")
+    def mark_plays_submitted(self, play_ids: Collection[int]):
+        self.flush_plays()
 
-        query = f"SELECT * FROM corrections LIMIT {limit} OFFSET {offset}"
-        log_query(query)
-        cursor = conn.execute(query)
+        update_query = """
+        UPDATE plays SET submitted_at = ?
+        WHERE submitted_at IS NULL AND play_id IN (SELECT value FROM json_each(?))
+        """
+        update_args = (time(), json_ids(play_ids))
 
-        corrections: List[Correction] = correction_schema.load(cursor, many=True)
+        with self._connect() as conn:
+            self._execute(conn, update_query, update_args)
 
-        return tuple(corrections)
+    def _check_external_changes(self):
+        """Drop cached data if another process has committed to the database.
+
+        The data version only changes for commits made through other connections, such as
+        the sync-corrections command, so writes made by this actor don't clear the cache. It is
+        checked at most once every ``DATA_VERSION_CHECK_INTERVAL`` seconds, so most cache hits
+        don't touch SQLite at all.
+        """
+        now = monotonic()
+        checked_at = self._data_version_checked_at
+        if checked_at is not None and now - checked_at < DATA_VERSION_CHECK_INTERVAL:
+            return
+        self._data_version_checked_at = now
 
-    def get_corrections_count(self) -> int:
         conn = self._connect()
+        data_version = conn.execute("PRAGMA data_version").fetchone()["data_version"]
+        if data_version != self._data_version:
+            if self._data_version is not None:
+                logger.debug("Advanced-Scrobbler database changed externally, clearing caches")
+            self._correction_cache.clear()
+            self._data_version = data_version
 
-        query = "SELECT COUNT(*) as corrections_count FROM corrections"
+    def find_correction(self, track_uri: str) -> Optional[Correction]:
+        self._check_external_changes()
 
-        log_query(query)
-        cursor = conn.execute(query)
-        result = cursor.fetchone()
+        cached = self._correction_cache.get(track_uri, _cache_miss)
+        if cached is not _cache_miss:
+            return cached
+
+        correction = self._load_correction(track_uri)
+        self._correction_cache.put(track_uri, correction)
+        return correction
+
+    @instrumented("find_correction")
+    def _load_correction(self, track_uri: str) -> Optional[Correction]:
+        conn = self._connect()
 
-        return int(result["corrections_count"])
+        query = f"SELECT {correction_columns} FROM corrections WHERE track_uri = ?"
+        cursor = self._execute(conn, query, (track_uri,), correction_row_factory)
+        return cursor.fetchone()
 
+    def get_correction_cache_stats(self) -> Dict[str, int]:
+        return self._correction_cache.stats()
+
+    def get_query_stats(self) -> Dict[str, Any]:
+        """Snapshot the timings of every instrumented query, from the writer and readers."""
+        return {
+            "queries": query_stats.snapshot(),
+            "correction_cache": self.get_correction_cache_stats(),
+        }
+
+    @changes_data
+    @instrumented("edit_correction")
     def edit_correction(self, correction_edit: CorrectionEdit):
+        if correction_edit.update_all_unsubmitted:
+            self.flush_plays()
+
         conn = self._connect()
 
         correction = self.find_correction(correction_edit.track_uri)
@@ -408,8 +1321,8 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
                 correction.track_uri,
             )
 
-            log_query(correction_update_query)
-            conn.execute(correction_update_query, correction_update_args)
+            self._execute(conn, correction_update_query, correction_update_args)
+            self._correction_cache.invalidate(correction.track_uri)
 
             if correction_edit.update_all_unsubmitted:
                 play_update_query = """
@@ -424,20 +1337,47 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
                     correction.track_uri,
                 )
 
-                log_query(play_update_query)
-                conn.execute(play_update_query, play_update_args)
+                self._execute(conn, play_update_query, play_update_args)
 
+    @changes_data
+    @instrumented("delete_correction")
     def delete_correction(self, track_uri: str) -> bool:
         delete_query = "DELETE FROM corrections WHERE track_uri = ?"
         delete_args = (track_uri,)
 
         with self._connect() as conn:
-            log_query(delete_query)
-            cursor = conn.execute(delete_query, delete_args)
+            cursor = self._execute(conn, delete_query, delete_args)
+            self._correction_cache.invalidate(track_uri)
             return cursor.rowcount == 1
 
+    @changes_data
+    @instrumented("approve_auto_correction")
     def approve_auto_correction(self, play_id: int):
         play = self.find_play(play_id)
+        self._check_auto_correction(play, play_id)
+
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            self._apply_auto_correction(conn, play)
+
+    @changes_data
+    @instrumented("approve_auto_corrections")
+    def approve_auto_corrections(self, play_ids: Collection[int]):
+        """Approve several auto-corrections in one transaction.
+
+        Nothing is changed if any of the plays can't be approved. When several plays share a
+        track, the first of them provides the new correction.
+        """
+        plays = {play.play_id: play for play in self.find_plays(play_ids)}
+        for play_id in play_ids:
+            self._check_auto_correction(plays.get(play_id), play_id)
+
+        with self._connect() as conn:
+            conn.execute("BEGIN")
+            for play_id in play_ids:
+                self._apply_auto_correction(conn, plays[play_id])
+
+    def _check_auto_correction(self, play: Optional[RecordedPlay], play_id: int):
         if not isinstance(play, RecordedPlay):
             raise DbClientError(f"No play found with ID '{play_id}'.")
         elif play.corrected != Corrected.AUTO_CORRECTED:
@@ -447,23 +1387,66 @@ class AdvancedScrobblerDb(pykka.ThreadingActor):
         if correction:
             raise DbClientError("A manual correction already exists for this play's track.")
 
-        with self._connect() as conn:
-            conn.execute("BEGIN")
+    def _apply_auto_correction(self, conn: Connection, play: RecordedPlay):
+        correction_insert_query = """
+        INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)
+        ON CONFLICT (track_uri) DO NOTHING
+        """
+        correction_insert_args = (play.track_uri, play.artist, play.title, play.album)
 
-            correction_insert_query = """
-            INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)
-            ON CONFLICT (track_uri) DO NOTHING
-            """
-            correction_insert_args = (play.track_uri, play.artist, play.title, play.album)
+        self._execute(conn, correction_insert_query, correction_insert_args)
+        self._correction_cache.invalidate(play.track_uri)
+
+        play_update_args = (Corrected.MANUALLY_CORRECTED, play.play_id)
+        # The play may have been archived already; only one of these will match.
+        for table in ("plays", "plays_archive"):
+            play_update_query = f"UPDATE {table} SET corrected = ? WHERE play_id = ?"
+            self._execute(conn, play_update_query, play_update_args)
+
+
+class AdvancedScrobblerDbReader(DbReadMixin, pykka.ThreadingActor):
+    """Serves read-only queries from its own connection, concurrently with the writer.
+
+    The database runs in WAL mode, so readers never block the writer and always see the
+    most recently committed data.
+    """
+
+    def __init__(self, config):
+        super().__init__(config)
 
-            log_query(correction_insert_query)
-            conn.execute(correction_insert_query, correction_insert_args)
+        self._dbpath = get_db_path(config)
+        self._timeout = config["advanced_scrobbler"]["db_timeout"]
 
-            play_update_query = "UPDATE plays SET corrected = ? WHERE play_id = ?"
-            play_update_args = (Corrected.MANUALLY_CORRECTED, play.play_id)
+        self._connection: Optional[ReadOnlyConnection] = None
 
-            log_query(play_update_query)
-            conn.execute(play_update_query, play_update_args)
+    def _connect(self):
+        if not self._connection:
+            logger.debug(
+                "Connecting to Advanced-Scrobbler sqlite database at %s (read-only)", self._dbpath
+            )
+            self._connection = sqlite3.connect(
+                f"{self._dbpath.as_uri()}?mode=ro",
+                uri=True,
+                timeout=self._timeout,
+                factory=ReadOnlyConnection,
+            )
+        return self._connection
+
+    def _sync_pending_plays(self):
+        if pending_plays.is_set():
+            db = db_service.retrieve_service().get(timeout=self._timeout)
+            db.flush_plays().get(timeout=self._timeout)
+
+    def on_start(self):
+        # The writer creates and upgrades the schema when it starts. Its mailbox is processed
+        # in order, so once it answers anything, the database is ready to be opened read-only.
+        db = db_service.retrieve_service().get(timeout=self._timeout)
+        db.schema_version.get(timeout=self._timeout)
+
+    def on_stop(self):
+        if self._connection:
+            self._connection.close()
 
 
 db_service = Service(AdvancedScrobblerDb)
+db_reader_service = PoolService(AdvancedScrobblerDbReader)
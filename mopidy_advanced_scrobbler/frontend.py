@@ -9,10 +9,14 @@ import pykka
 from mopidy.core import CoreListener
 
 from mopidy_advanced_scrobbler import Extension
-from mopidy_advanced_scrobbler.db import db_service
+from mopidy_advanced_scrobbler.db import db_reader_service, db_service
+from mopidy_advanced_scrobbler.jobs import jobs_service
 from mopidy_advanced_scrobbler.models import Correction, prepare_play
 from mopidy_advanced_scrobbler.network import NetworkException, network_service
+from mopidy_advanced_scrobbler.push import empty_playing, format_playing, playback_broadcaster
+from mopidy_advanced_scrobbler.submitter import submitter_service
 
+from ._metrics import plays_skipped
 from ._service import ActorRetrievalFailure
 
 
@@ -80,8 +84,15 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
 
     def on_start(self):
         db_service.start_service(self._global_config)
+        db_reader_service.start_service(
+            self.config["db_reader_pool_size"],
+            self._global_config,
+        )
 
         network_service.start_service(self.config)
+        jobs_service.start_service(self.config)
+        if self.config["auto_scrobble"]:
+            submitter_service.start_service(self.config)
 
     def on_stop(self):
         if self._now_playing_notify_debouncer:
@@ -89,13 +100,22 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
         else:
             debouncer_stop_future = None
 
+        submitter_service.stop_service()
+        jobs_service.stop_service()
         network_service.stop_service()
+        db_reader_service.stop_service()
         db_service.stop_service()
         if debouncer_stop_future:
             debouncer_stop_future.get()
 
     def track_playback_started(self, tl_track: TlTrack):
         track = tl_track.track
+
+        # Published straight away without waiting on the database. Any correction is applied
+        # once it has been looked up for the now playing notification.
+        play = prepare_play(track, -1, None)
+        playback_broadcaster.update(state="playing", position=0, playing=format_playing(play))
+
         if not self.is_uri_allowed(track.uri):
             return
 
@@ -132,6 +152,8 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
             correction = None
 
         play = prepare_play(track, -1, correction)
+        if correction:
+            playback_broadcaster.update(playing=format_playing(play), if_playing_uri=track.uri)
 
         try:
             network = network_service.retrieve_service().get(timeout=10)
@@ -145,6 +167,7 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
     def track_playback_ended(self, tl_track: TlTrack, time_position):
         track = tl_track.track
         if not self.is_uri_allowed(track.uri):
+            plays_skipped.labels("ignored_uri").inc()
             return
 
         time_position_sec = time_position / 1000
@@ -176,6 +199,7 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
                 time_position_sec,
                 track.uri,
             )
+            plays_skipped.labels("too_short").inc()
             return
 
         threshold = self.config["scrobble_time_threshold"] / 100
@@ -187,6 +211,7 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
                 play.duration,
                 track.uri,
             )
+            plays_skipped.labels("below_threshold").inc()
             return
 
         try:
@@ -202,3 +227,28 @@ class AdvancedScrobblerFrontend(pykka.ThreadingActor, CoreListener):
         except Exception as exc:
             logger.exception(f"Error while recording play for track with URI '{track.uri}: {exc}")
             raise
+
+        if self.config["auto_scrobble"]:
+            self._wake_submitter()
+
+    def _wake_submitter(self):
+        try:
+            submitter = submitter_service.retrieve_service().get(timeout=10)
+            submitter.wake()
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Automatic scrobbling service found to be unavailable: {exc}")
+            submitter_service.request_service_restart(self.config)
+
+    def track_playback_paused(self, tl_track: TlTrack, time_position: int):
+        playback_broadcaster.update(state="paused", position=time_position / 1000)
+
+    def track_playback_resumed(self, tl_track: TlTrack, time_position: int):
+        playback_broadcaster.update(state="playing", position=time_position / 1000)
+
+    def seeked(self, time_position: int):
+        playback_broadcaster.update(position=time_position / 1000)
+
+    def playback_state_changed(self, old_state: str, new_state: str):
+        if new_state == "stopped":
+            # Nothing is playing any more, matching what /api/playback-data reports.
+            playback_broadcaster.update(state="stopped", position=0, playing=empty_playing())
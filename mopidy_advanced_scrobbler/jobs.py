@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+import uuid
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import TYPE_CHECKING
+
+import pykka
+
+from mopidy_advanced_scrobbler.db import DbClientError, db_reader_service, db_service
+from mopidy_advanced_scrobbler.network import (
+    NetworkException,
+    ScrobbleOutcomeUnknown,
+    ScrobbleRejected,
+    network_service,
+)
+
+from ._service import ActorRetrievalFailure, Service
+
+
+if TYPE_CHECKING:
+    from typing import Collection, Deque, Dict, Optional, Tuple
+
+    from mopidy_advanced_scrobbler.models import RecordedPlay
+    from mopidy_advanced_scrobbler.network import IgnoredScrobble
+
+
+logger = logging.getLogger(__name__)
+
+# Last.fm accepts at most 50 scrobbles per request.
+BATCH_SIZE = 50
+# Pause between batches. Last.fm's rate limit itself is enforced by the network actor.
+BATCH_DELAY = 1
+# How many finished jobs are remembered so their results can still be collected.
+FINISHED_JOBS_KEPT = 20
+
+
+class JobStatusEnum(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+@dataclasses.dataclass
+class ScrobbleJob(object):
+    job_id: str
+    # The plays to scrobble. When None, every unsubmitted play up to the checkpoint is.
+    play_ids: Optional[Tuple[int, ...]] = None
+    checkpoint: Optional[int] = None
+    # Leave automatically corrected plays for the user to review before they are scrobbled.
+    hold_auto_corrected: bool = False
+    status: JobStatusEnum = JobStatusEnum.QUEUED
+    found_plays: int = 0
+    scrobbled_plays: int = 0
+    ignored_plays: int = 0
+    marked_plays: int = 0
+    message: Optional[str] = None
+    # The reason Last.fm gave for the most recently ignored play.
+    ignored_message: Optional[str] = None
+    offset: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatusEnum.QUEUED, JobStatusEnum.RUNNING)
+
+
+class ScrobbleJobRunner(pykka.ThreadingActor):
+    """Scrobbles queued jobs one batch at a time, in the order they were enqueued.
+
+    Only one batch is processed per message, so status requests and cancellations are
+    answered between batches rather than after a whole job.
+    """
+
+    def __init__(self, config):
+        super().__init__()
+
+        self._jobs: Dict[str, ScrobbleJob] = OrderedDict()
+        self._queue: Deque[str] = deque()
+        self._scheduled = False
+        self._timer: Optional[threading.Timer] = None
+
+        self._proxy = self.actor_ref.proxy()
+
+    def on_stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def enqueue_unsubmitted(
+        self, *, checkpoint: Optional[int] = None, hold_auto_corrected: bool = False
+    ) -> str:
+        job = ScrobbleJob(
+            job_id=uuid.uuid4().hex,
+            checkpoint=checkpoint,
+            hold_auto_corrected=hold_auto_corrected,
+        )
+        return self._enqueue(job)
+
+    def enqueue_plays(self, play_ids: Collection[int]) -> str:
+        return self._enqueue(ScrobbleJob(job_id=uuid.uuid4().hex, play_ids=tuple(play_ids)))
+
+    def scrobble_play(self, play_id: int) -> ScrobbleJob:
+        """Scrobble a single play straight away, ahead of any queued jobs.
+
+        Job batches each run in their own actor message, so this can never overlap one, and
+        the play is checkpointed and its failures recorded exactly as they would be in a job.
+        """
+        job = ScrobbleJob(job_id=uuid.uuid4().hex, play_ids=(play_id,))
+        self._prune_finished_jobs()
+        self._jobs[job.job_id] = job
+
+        job.status = JobStatusEnum.RUNNING
+        self._run_job_batch(job)
+        return dataclasses.replace(job)
+
+    def _enqueue(self, job: ScrobbleJob) -> str:
+        self._prune_finished_jobs()
+        self._jobs[job.job_id] = job
+        self._queue.append(job.job_id)
+        logger.debug("Queued scrobble job %s", job.job_id)
+
+        if not self._scheduled:
+            self._schedule(0)
+        return job.job_id
+
+    def _prune_finished_jobs(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:-FINISHED_JOBS_KEPT]:
+            del self._jobs[job_id]
+
+    def get_job(self, job_id: str) -> Optional[ScrobbleJob]:
+        job = self._jobs.get(job_id)
+        return dataclasses.replace(job) if job else None
+
+    def cancel_job(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if not job or not job.active:
+            return False
+
+        # Batches run inside actor messages, so no batch can be part-way through here.
+        job.status = JobStatusEnum.CANCELLED
+        logger.info("Cancelled scrobble job %s", job_id)
+        return True
+
+    def _schedule(self, delay: float):
+        self._scheduled = True
+        if delay:
+            self._timer = threading.Timer(delay, self._timed_run)
+            self._timer.daemon = True
+            self._timer.start()
+        else:
+            self._proxy.run_batch()
+
+    def _timed_run(self):
+        # Runs on the timer thread, so hand the work back to the actor.
+        try:
+            self._proxy.run_batch()
+        except pykka.ActorDeadError:
+            pass
+
+    def run_batch(self):
+        self._timer = None
+
+        while self._queue and not self._jobs[self._queue[0]].active:
+            self._queue.popleft()
+        if not self._queue:
+            self._scheduled = False
+            return
+
+        job = self._jobs[self._queue[0]]
+        job.status = JobStatusEnum.RUNNING
+
+        submitted = self._run_job_batch(job)
+        if job.status != JobStatusEnum.RUNNING:
+            self._queue.popleft()
+            logger.info(
+                "Scrobble job %s %s after scrobbling %d plays",
+                job.job_id,
+                job.status.value,
+                job.scrobbled_plays,
+            )
+
+        self._schedule(BATCH_DELAY if submitted else 0)
+
+    def _run_job_batch(self, job: ScrobbleJob) -> bool:
+        """Scrobble the next batch of a job, returning whether Last.fm was contacted."""
+        try:
+            db_reader = db_reader_service.retrieve_service().get(timeout=10)
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database reader service: {exc}")
+            return self._fail(job, "Database connection issue.")
+
+        try:
+            if job.play_ids is None:
+                plays = db_reader.load_unsubmitted_plays_batch(
+                    checkpoint=job.checkpoint,
+                    hold_auto_corrected=job.hold_auto_corrected,
+                ).get()
+                if not plays:
+                    job.status = JobStatusEnum.FINISHED
+                    return False
+            else:
+                play_ids_batch = job.play_ids[job.offset : job.offset + BATCH_SIZE]
+                job.offset += len(play_ids_batch)
+                if job.offset >= len(job.play_ids):
+                    job.status = JobStatusEnum.FINISHED
+                if not play_ids_batch:
+                    return False
+
+                plays = db_reader.find_plays(play_ids_batch, only_unsubmitted=True).get()
+                if not plays:
+                    return False
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving unsubmitted plays: {exc}")
+            return self._fail(job, "Error while retrieving unsubmitted plays.")
+
+        self._scrobble_plays(job, plays)
+        return True
+
+    def _scrobble_plays(self, job: ScrobbleJob, plays: Collection[RecordedPlay]):
+        play_ids = tuple(play.play_id for play in plays)
+        job.found_plays += len(play_ids)
+
+        # Checkpoint the batch before sending it, so a crash part-way through can never lead
+        # to it being sent again.
+        try:
+            db = db_service.retrieve_service().get(timeout=10)
+            db.begin_submission(play_ids).get()
+        except Exception as exc:
+            logger.exception(f"Error while recording submission of plays: {exc}")
+            self._fail(job, "Database connection issue.")
+            return
+
+        try:
+            network = network_service.retrieve_service().get(timeout=10)
+            results = network.submit_scrobbles(plays).get()
+        except ScrobbleOutcomeUnknown as exc:
+            logger.exception(f"Network error while scrobbling plays: {exc}")
+            logger.warning(
+                "Plays %s may have been scrobbled and will not be submitted automatically "
+                "until they are released from the web interface",
+                ", ".join(map(str, play_ids)),
+            )
+            self._fail(job, "Last.fm may have received these plays. Check before resubmitting.")
+            return
+        except ScrobbleRejected as exc:
+            logger.exception(f"Last.fm rejected plays: {exc}")
+            self._record_failure(db, play_ids, exc, rejected=True)
+            self._fail(job, "Last.fm rejected these plays. They will not be retried.")
+            return
+        except NetworkException as exc:
+            logger.exception(f"Network error while scrobbling plays: {exc}")
+            self._record_failure(db, play_ids, exc)
+            self._fail(job, "Network error while scrobbling plays.")
+            return
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while scrobbling plays: {exc}")
+            self._abandon_submission(db, play_ids)
+            self._fail(job, "Error while scrobbling plays.")
+            return
+
+        job.scrobbled_plays += len(results.accepted)
+        job.ignored_plays += len(results.ignored)
+        if results.ignored:
+            job.ignored_message = results.ignored[-1].message
+
+        # Only accepted plays are marked as submitted. Ignored plays are recorded as failures,
+        # so they are either retried later or left for the user, depending on the reason.
+        try:
+            db.mark_plays_submitted(results.accepted).get()
+            self._record_ignored(db, results.ignored)
+        except DbClientError as exc:
+            logger.exception(f"Error after successful scrobble: {exc}")
+            self._fail(job, "Error after successful scrobble.")
+            return
+        except Exception as exc:
+            logger.exception(f"Error while marking plays as submitted: {exc}")
+            self._fail(job, "Error while marking plays as submitted.")
+            return
+
+        job.marked_plays += len(results.accepted)
+
+    def _record_ignored(self, db, ignored: Collection[IgnoredScrobble]):
+        futures = [
+            db.record_submission_failure(
+                (scrobble.play_id,),
+                scrobble.error,
+                rejected=not scrobble.retryable,
+            )
+            for scrobble in ignored
+        ]
+        for future in futures:
+            future.get()
+
+    def _record_failure(
+        self, db, play_ids: Collection[int], exc: Exception, *, rejected: bool = False
+    ):
+        error = str(exc.__cause__ or exc)
+        try:
+            db.record_submission_failure(play_ids, error, rejected=rejected).get()
+        except Exception as db_exc:
+            logger.exception(f"Error while recording failed submission of plays: {db_exc}")
+
+    def _abandon_submission(self, db, play_ids: Collection[int]):
+        try:
+            db.abandon_submission(play_ids).get()
+        except Exception as exc:
+            logger.exception(f"Error while clearing submission of plays: {exc}")
+
+    def _fail(self, job: ScrobbleJob, message: str) -> bool:
+        job.status = JobStatusEnum.FAILED
+        job.message = message
+        return False
+
+
+jobs_service = Service(ScrobbleJobRunner)
@@ -46,6 +46,17 @@ class RecordedPlay(Play):
     play_id: int
 
 
+@dataclasses.dataclass(frozen=True)
+class SubmissionFailure(object):
+    play_id: int
+    attempts: int
+    last_error: Optional[str]
+    # When the play will next be submitted automatically, or None if it won't be.
+    next_attempt_at: Optional[int]
+    # Whether a submission of the play was interrupted, so Last.fm may already have it.
+    in_flight: bool = False
+
+
 @dataclasses.dataclass(frozen=True)
 class PlayEdit(object):
     play_id: int
@@ -74,6 +85,31 @@ class CorrectionEdit(object):
     update_all_unsubmitted: bool
 
 
+@dataclasses.dataclass(frozen=True)
+class PlaysPage(object):
+    plays: Tuple[RecordedPlay, ...]
+    overall_count: int
+    unsubmitted_count: int
+    # Only set when the page was filtered.
+    matched_count: Optional[int] = None
+    # Only set when searching. How well each play matched, lower being better.
+    ranks: Optional[Tuple[float, ...]] = None
+    # Failed submissions of the unsubmitted plays on the page.
+    failures: Tuple[SubmissionFailure, ...] = ()
+    # Unsubmitted plays on the page whose submission was interrupted, so that Last.fm may
+    # already have them. They are left out of automatic scrobbling until they are released.
+    in_flight: Tuple[int, ...] = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class CorrectionsPage(object):
+    corrections: Tuple[Correction, ...]
+    overall_count: int
+    # Only set when searching.
+    matched_count: Optional[int] = None
+    ranks: Optional[Tuple[float, ...]] = None
+
+
 def prepare_play(track: Track, played_at: int, correction: Optional[Correction]) -> Play:
     track_uri = track.uri
     orig_title, orig_artist, orig_album = format_track_data(track)
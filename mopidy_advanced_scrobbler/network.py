@@ -1,23 +1,148 @@
 from __future__ import annotations
 
+import dataclasses
 import logging
-from typing import Iterable, Optional, TypedDict, cast
+import random
+import socket
+import time
+from enum import Enum
+from typing import TYPE_CHECKING, Iterable, Optional, TypedDict, cast
 
 import pykka
 import pylast
 
 from mopidy_advanced_scrobbler.models import Play, RecordedPlay
 
+from ._metrics import (
+    now_playing_notifications,
+    ratelimit_tokens,
+    ratelimit_wait_seconds,
+    ratelimit_waits,
+    scrobbles,
+)
+from ._ratelimit import TokenBucket
 from ._service import Service
+from ._transport import ConnectError, KeepAliveTransport, Transport
+
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Sequence, Tuple
+    from xml.dom.minidom import Document
 
 
 logger = logging.getLogger(__name__)
 
+# How many times a request is made before a transient failure is given up on, and the
+# bounds of the randomised delay before each retry, in seconds.
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
 
 class NetworkException(Exception):
     pass
 
 
+class ScrobbleOutcomeUnknown(NetworkException):
+    """Submitting scrobbles failed in a way that Last.fm may still have accepted them."""
+
+
+class ScrobbleRejected(NetworkException):
+    """Last.fm rejected the scrobbles themselves, so submitting them again won't help."""
+
+
+class ErrorKind(Enum):
+    # Not accepted, and likely to succeed if tried again shortly.
+    TRANSIENT = "transient"
+    # Not accepted, due to a problem with the account or API credentials.
+    FAILED = "failed"
+    # Not accepted, due to a problem with the request itself.
+    REJECTED = "rejected"
+    # May or may not have been accepted.
+    UNKNOWN = "unknown"
+
+
+# Errors raised while connecting, before any part of a request could have been sent.
+_CONNECT_ERRORS = (ConnectError, ConnectionRefusedError, socket.gaierror)
+_CONNECT_ERROR_NAMES = ("ConnectError", "ConnectTimeout")
+
+# https://www.last.fm/api/errorcodes
+# pylast's status constants are integers, but API errors carry the code from the response.
+_TRANSIENT_API_ERRORS = {
+    str(pylast.STATUS_OPERATION_FAILED),
+    str(pylast.STATUS_OFFLINE),
+    str(pylast.STATUS_TEMPORARILY_UNAVAILABLE),
+    str(pylast.STATUS_RATE_LIMIT_EXCEEDED),
+}
+_REJECTED_API_ERRORS = {str(pylast.STATUS_INVALID_PARAMS), str(pylast.STATUS_INVALID_RESOURCE)}
+
+
+def classify_error(exc: pylast.PyLastError) -> ErrorKind:
+    """Work out what a failed request means for whatever it was sending.
+
+    Errors reported by the API itself and failures to connect mean the request was not
+    accepted. Anything else, such as a timeout waiting for the response, leaves it unknown.
+    """
+    if isinstance(exc, pylast.WSError):
+        # pylast reports HTTP server errors with an integer status, API errors with a string.
+        if isinstance(exc.status, int):
+            return ErrorKind.UNKNOWN
+        elif exc.status in _TRANSIENT_API_ERRORS:
+            return ErrorKind.TRANSIENT
+        elif exc.status in _REJECTED_API_ERRORS:
+            return ErrorKind.REJECTED
+        return ErrorKind.FAILED
+    elif isinstance(exc, pylast.NetworkError):
+        underlying = exc.underlying_error
+        if isinstance(underlying, _CONNECT_ERRORS):
+            return ErrorKind.TRANSIENT
+        elif type(underlying).__name__ in _CONNECT_ERROR_NAMES:
+            return ErrorKind.TRANSIENT
+    return ErrorKind.UNKNOWN
+
+
+def may_have_been_accepted(exc: pylast.PyLastError) -> bool:
+    return classify_error(exc) == ErrorKind.UNKNOWN
+
+
+def retry_delay(attempt: int) -> float:
+    """A randomised delay before retrying, growing exponentially with each attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt))
+
+
+# Last.fm ignores scrobbles over the daily limit, so those can be submitted again later. Every
+# other reason for ignoring a scrobble (such as a filtered artist, or a timestamp too far in
+# the past) will apply again if it is resubmitted.
+IGNORED_DAILY_LIMIT = 5
+
+
+@dataclasses.dataclass(frozen=True)
+class IgnoredScrobble(object):
+    play_id: int
+    code: int
+    message: str
+
+    @property
+    def retryable(self) -> bool:
+        return self.code == IGNORED_DAILY_LIMIT
+
+    @property
+    def error(self) -> str:
+        return f"Ignored by Last.fm (code {self.code}): {self.message}"
+
+
+@dataclasses.dataclass(frozen=True)
+class ScrobbleResults(object):
+    accepted: Tuple[int, ...]
+    ignored: Tuple[IgnoredScrobble, ...] = ()
+
+
+_scrobble_exceptions = {
+    ErrorKind.UNKNOWN: ScrobbleOutcomeUnknown,
+    ErrorKind.REJECTED: ScrobbleRejected,
+}
+
+
 class NowPlayingData(TypedDict):
     artist: str
     title: str
@@ -71,13 +196,124 @@ def format_play_data(play: Play) -> PlayData:
     return data
 
 
+def format_now_playing_params(data: NowPlayingData) -> Dict[str, object]:
+    """Build the parameters of a track.updateNowPlaying request, the same way pylast does."""
+    params: Dict[str, object] = {"artist": data["artist"], "track": data["title"]}
+    for key in ("album", "duration", "mbid"):
+        if data[key] is not None:  # type: ignore
+            params[key] = data[key]  # type: ignore
+    return params
+
+
+def format_scrobble_params(plays_data: Sequence[PlayData]) -> Dict[str, object]:
+    """Build the parameters of a track.scrobble request, the same way pylast does."""
+    params: Dict[str, object] = {}
+    for idx, data in enumerate(plays_data):
+        params[f"artist[{idx}]"] = data["artist"]
+        params[f"track[{idx}]"] = data["title"]
+        params[f"timestamp[{idx}]"] = data["timestamp"]
+        for key in ("album", "duration", "mbid"):
+            if data[key] is not None:  # type: ignore
+                params[f"{key}[{idx}]"] = data[key]  # type: ignore
+    return params
+
+
+def _element_text(element) -> str:
+    return "".join(node.data for node in element.childNodes if node.nodeType == node.TEXT_NODE)
+
+
+def parse_scrobble_response(doc: Document, play_ids: Sequence[int]) -> ScrobbleResults:
+    """Work out which plays Last.fm accepted from a track.scrobble response.
+
+    Results are listed in the same order as the scrobbles in the request. If they can't be
+    matched up, every play is treated as accepted, since the request as a whole succeeded.
+    """
+    items = doc.getElementsByTagName("scrobble")
+    if len(items) != len(play_ids):
+        logger.warning(
+            "Last.fm returned %d scrobble results for %d plays, treating all as accepted",
+            len(items),
+            len(play_ids),
+        )
+        return ScrobbleResults(accepted=tuple(play_ids))
+
+    accepted: List[int] = []
+    ignored: List[IgnoredScrobble] = []
+    for play_id, item in zip(play_ids, items):
+        messages = item.getElementsByTagName("ignoredMessage")
+        code = int(messages[0].getAttribute("code") or 0) if messages else 0
+        if code:
+            message = _element_text(messages[0]).strip()
+            ignored.append(IgnoredScrobble(play_id=play_id, code=code, message=message))
+        else:
+            accepted.append(play_id)
+
+    return ScrobbleResults(accepted=tuple(accepted), ignored=tuple(ignored))
+
+
+class _TransportRequest(pylast._Request):
+    """A pylast request sent using the network actor's transport.
+
+    pylast opens a new connection for every request, which is replaced here so that
+    connections are reused. Errors are raised the same way pylast raises them.
+    """
+
+    def __init__(self, transport: Transport, network, method_name: str, params):
+        self._transport = transport
+        super().__init__(network, method_name, params)
+
+    def _download_response(self) -> str:
+        host_subdir = self.network.ws_server[1]
+        try:
+            status, body = self._transport.post(host_subdir, self.params)
+        except Exception as exc:
+            raise pylast.NetworkError(self.network, exc) from exc
+
+        if status in (500, 502, 503, 504):
+            raise pylast.WSError(
+                self.network, status, f"Connection to the API failed with HTTP code {status}"
+            )
+        response_text = body.decode("utf-8")
+
+        self._check_response_for_errors(response_text)
+        return response_text
+
+
 class AdvancedScrobblerNetwork(pykka.ThreadingActor):
-    def __init__(self, config):
+    def __init__(self, config, transport: Optional[Transport] = None):
         super().__init__()
         self._config = config
         self._network = None
+        self._transport = transport
+        # Every call to Last.fm takes a token, whichever actor or request it was made for.
+        self._limiter = TokenBucket(config["api_rate_limit"], config["api_rate_burst"])
+
+    def _wait_for_token(self):
+        waited = self._limiter.acquire()
+        if waited:
+            ratelimit_waits.inc()
+            ratelimit_wait_seconds.inc(waited)
+            logger.debug("Waited %.2f seconds for the Last.fm rate limit", waited)
+
+    def _call_with_retry(self, description: str, func, *args, **kwargs):
+        """Call the Last.fm API, retrying failures that were certainly not accepted."""
+        attempt = 0
+        while True:
+            self._wait_for_token()
+            try:
+                return func(*args, **kwargs)
+            except pylast.PyLastError as exc:
+                attempt += 1
+                if attempt >= RETRY_ATTEMPTS or classify_error(exc) != ErrorKind.TRANSIENT:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning(
+                    "Error while %s, retrying in %.1f seconds: %s", description, delay, exc
+                )
+                time.sleep(delay)
 
     def on_start(self):
+        ratelimit_tokens.set_function(self._limiter.available)
         try:
             logger.info("Connecting to Last.fm with username %s", self._config["username"])
             self._network = pylast.LastFMNetwork(
@@ -91,41 +327,77 @@ class AdvancedScrobblerNetwork(pykka.ThreadingActor):
             logger.exception(f"Error during Advanced-Scrobbler Last.fm setup: {exc}")
             raise
 
+        if self._transport is None:
+            self._transport = KeepAliveTransport(
+                self._network.ws_server[0],
+                connect_timeout=self._config["api_connect_timeout"],
+                read_timeout=self._config["api_read_timeout"],
+            )
+
+    def on_stop(self):
+        if self._transport is not None:
+            self._transport.close()
+
+    def _request(self, method_name: str, params: Dict[str, object]) -> Document:
+        return _TransportRequest(self._transport, self._network, method_name, params).execute()
+
     def send_now_playing_notification(self, play: Play):
-        now_playing_data = format_now_playing_data(play)
+        params = format_now_playing_params(format_now_playing_data(play))
+
+        # A late notification is no use, so it is dropped rather than held up by the limit.
+        if not self._limiter.try_acquire():
+            now_playing_notifications.labels("dropped").inc()
+            logger.info("Dropped 'now playing' notification due to rate limit: %s", play.track_uri)
+            return
 
         logger.info("Sending 'now playing' notification: %s", play.track_uri)
         try:
-            self._network.update_now_playing(**now_playing_data)
+            self._request("track.updateNowPlaying", params)
         except pylast.PyLastError as exc:
+            now_playing_notifications.labels("failed").inc()
             logger.exception(f"Error while sending now playing data to {self._network}: {exc}")
             raise NetworkException(
                 f"Error while sending now playing data to {self._network}"
             ) from exc
+        now_playing_notifications.labels("sent").inc()
 
-    def submit_scrobble(self, play: RecordedPlay):
-        play_data = format_play_data(play)
+    def _execute_scrobble(self, params: Dict[str, object]) -> Document:
+        # pylast's scrobble_many() discards the response, which says which scrobbles were
+        # accepted, so the request is made directly instead.
+        return self._request("track.scrobble", params)
 
+    def submit_scrobble(self, play: RecordedPlay) -> ScrobbleResults:
         logger.info("Submitting scrobble for play %d: %s", play.play_id, play.track_uri)
-        try:
-            self._network.scrobble(**play_data)
-        except pylast.PyLastError as exc:
-            logger.exception(f"Error while submitting scrobble to {self._network}: {exc}")
-            raise NetworkException(f"Error while submitting scrobble to {self._network}") from exc
+        return self._submit_scrobbles([play], "scrobble")
 
-    def submit_scrobbles(self, plays: Iterable[RecordedPlay]):
-        plays_data = []
-        play_ids = []
-        for play in plays:
-            plays_data.append(format_play_data(play))
-            play_ids.append(play.play_id)
+    def submit_scrobbles(self, plays: Iterable[RecordedPlay]) -> ScrobbleResults:
+        plays = tuple(plays)
+        play_ids = ", ".join(str(play.play_id) for play in plays)
+        logger.info("Submitting scrobbles for plays: %s", play_ids)
+        return self._submit_scrobbles(plays, "scrobbles")
 
-        logger.info("Submitting scrobbles for plays: %s", ", ".join(map(str, play_ids)))
+    def _submit_scrobbles(self, plays: Sequence[RecordedPlay], noun: str) -> ScrobbleResults:
+        params = format_scrobble_params([format_play_data(play) for play in plays])
         try:
-            self._network.scrobble_many(plays_data)
+            doc = self._call_with_retry(f"submitting {noun}", self._execute_scrobble, params)
         except pylast.PyLastError as exc:
-            logger.exception(f"Error while submitting scrobbles to {self._network}: {exc}")
-            raise NetworkException(f"Error while submitting scrobbles to {self._network}") from exc
+            scrobbles.labels("failed").inc(len(plays))
+            logger.exception(f"Error while submitting {noun} to {self._network}: {exc}")
+            exc_class = _scrobble_exceptions.get(classify_error(exc), NetworkException)
+            raise exc_class(f"Error while submitting {noun} to {self._network}") from exc
+
+        results = parse_scrobble_response(doc, [play.play_id for play in plays])
+        scrobbles.labels("submitted").inc(len(results.accepted))
+        if results.ignored:
+            scrobbles.labels("ignored").inc(len(results.ignored))
+            for ignored in results.ignored:
+                logger.warning(
+                    "Last.fm ignored scrobble for play %d (code %d): %s",
+                    ignored.play_id,
+                    ignored.code,
+                    ignored.message,
+                )
+        return results
 
 
 network_service = Service(AdvancedScrobblerNetwork)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import tornado.ioloop
+import tornado.websocket
+
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Optional, Set
+
+    from mopidy_advanced_scrobbler.models import Play
+
+
+logger = logging.getLogger(__name__)
+
+# How often connected clients are sent the current position while a track is playing.
+TICK_INTERVAL_MSEC = 1000
+
+
+def format_playing(play: Play) -> Dict[str, Any]:
+    return {
+        "trackUri": play.track_uri,
+        "title": play.title,
+        "artist": play.artist,
+        "album": play.album,
+        "duration": play.duration,
+    }
+
+
+def empty_playing() -> Dict[str, Any]:
+    return {
+        "trackUri": "",
+        "title": "",
+        "artist": "",
+        "album": "",
+        "duration": 0,
+    }
+
+
+class PlaybackBroadcaster(object):
+    """Pushes playback state to every connected websocket client.
+
+    Updates are published from the frontend actor's thread, but sockets may only be written
+    to from the IOLoop serving them, so delivery is always handed over to that loop. Between
+    updates, a cheap position tick is extrapolated from the last known position instead of
+    asking Mopidy core.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Set[tornado.websocket.WebSocketHandler] = set()
+        self._loop: Optional[tornado.ioloop.IOLoop] = None
+        self._ticker: Optional[tornado.ioloop.PeriodicCallback] = None
+
+        self._state = "stopped"
+        self._position = 0.0
+        self._position_updated_at = time.monotonic()
+        self._playing = empty_playing()
+
+    def update(
+        self,
+        *,
+        state: Optional[str] = None,
+        position: Optional[float] = None,
+        playing: Optional[Dict[str, Any]] = None,
+        if_playing_uri: Optional[str] = None,
+    ):
+        """Publish a change in playback state.
+
+        When ``if_playing_uri`` is given, the update is dropped unless that track is still the
+        one playing, so late updates can't overwrite a newer track.
+        """
+        with self._lock:
+            if if_playing_uri is not None and self._playing["trackUri"] != if_playing_uri:
+                return
+            if position is None:
+                position = self._current_position()
+            if state is not None:
+                self._state = state
+            if playing is not None:
+                self._playing = playing
+            self._position = position
+            self._position_updated_at = time.monotonic()
+
+            message = self._playback_message()
+            loop = self._loop
+
+        if loop:
+            loop.add_callback(self._send_all, message)
+
+    def _current_position(self) -> float:
+        if self._state != "playing":
+            return self._position
+        return self._position + time.monotonic() - self._position_updated_at
+
+    def _playback_message(self) -> str:
+        return json.dumps(
+            {
+                "type": "playback",
+                "playback": {"state": self._state, "position": int(self._current_position())},
+                "playing": self._playing,
+            }
+        )
+
+    def register(self, client: tornado.websocket.WebSocketHandler):
+        """Add a client and send it the current state. Must be called on the IOLoop."""
+        with self._lock:
+            self._loop = tornado.ioloop.IOLoop.current()
+            self._clients.add(client)
+            message = self._playback_message()
+
+        if self._ticker is None:
+            self._ticker = tornado.ioloop.PeriodicCallback(self._tick, TICK_INTERVAL_MSEC)
+            self._ticker.start()
+
+        logger.debug("Playback push client connected")
+        client.write_message(message)
+
+    def unregister(self, client: tornado.websocket.WebSocketHandler):
+        """Remove a client. Must be called on the IOLoop."""
+        with self._lock:
+            self._clients.discard(client)
+            idle = not self._clients
+
+        if idle and self._ticker is not None:
+            self._ticker.stop()
+            self._ticker = None
+
+    def _tick(self):
+        with self._lock:
+            if self._state != "playing":
+                return
+            message = json.dumps({"type": "tick", "position": int(self._current_position())})
+
+        self._send_all(message)
+
+    def _send_all(self, message: str):
+        for client in tuple(self._clients):
+            try:
+                client.write_message(message)
+            except tornado.websocket.WebSocketClosedError:
+                self.unregister(client)
+
+
+playback_broadcaster = PlaybackBroadcaster()
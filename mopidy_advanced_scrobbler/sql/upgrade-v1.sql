@@ -0,0 +1,12 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 2;
+
+-- Serves load_unsubmitted_plays_batch and get_plays_count(only_unsubmitted=True).
+-- Only unsubmitted plays are indexed, so the index stays small as history grows.
+CREATE INDEX plays_unsubmitted_idx ON plays (submitted_at) WHERE submitted_at IS NULL;
+
+-- Serves the "update all unsubmitted plays for this track" queries.
+CREATE INDEX plays_track_uri_submitted_at_idx ON plays (track_uri, submitted_at);
+
+END TRANSACTION;
@@ -0,0 +1,45 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 3;
+
+-- Row counts kept exact by triggers, so listing pages do not need COUNT(*).
+-- `mopidy advanced_scrobbler db check-counters` recomputes them if they ever drift.
+CREATE TABLE counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+INSERT INTO counters (name, value) SELECT 'plays', COUNT(*) FROM plays;
+INSERT INTO counters (name, value) SELECT 'plays_unsubmitted', COUNT(*) FROM plays WHERE submitted_at IS NULL;
+INSERT INTO counters (name, value) SELECT 'corrections', COUNT(*) FROM corrections;
+
+CREATE TRIGGER plays_counters_insert AFTER INSERT ON plays
+BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'plays';
+    UPDATE counters SET value = value + 1 WHERE name = 'plays_unsubmitted' AND NEW.submitted_at IS NULL;
+END;
+
+CREATE TRIGGER plays_counters_delete AFTER DELETE ON plays
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'plays';
+    UPDATE counters SET value = value - 1 WHERE name = 'plays_unsubmitted' AND OLD.submitted_at IS NULL;
+END;
+
+CREATE TRIGGER plays_counters_update AFTER UPDATE OF submitted_at ON plays
+WHEN (OLD.submitted_at IS NULL) != (NEW.submitted_at IS NULL)
+BEGIN
+    UPDATE counters SET value = value + (NEW.submitted_at IS NULL) - (OLD.submitted_at IS NULL)
+    WHERE name = 'plays_unsubmitted';
+END;
+
+CREATE TRIGGER corrections_counters_insert AFTER INSERT ON corrections
+BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'corrections';
+END;
+
+CREATE TRIGGER corrections_counters_delete AFTER DELETE ON corrections
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'corrections';
+END;
+
+END TRANSACTION;
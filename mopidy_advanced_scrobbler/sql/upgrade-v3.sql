@@ -0,0 +1,34 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 4;
+
+-- Submitted plays never change again. `mopidy advanced_scrobbler db archive` moves old ones
+-- here so the working plays table, and everything that scans it, stays small.
+CREATE TABLE plays_archive (
+    play_id INTEGER PRIMARY KEY,
+    track_uri TEXT NOT NULL,
+    artist TEXT NOT NULL,
+    title TEXT NOT NULL,
+    album TEXT NOT NULL,
+    orig_artist TEXT NOT NULL,
+    orig_title TEXT NOT NULL,
+    orig_album TEXT NOT NULL,
+    corrected INTEGER NOT NULL DEFAULT 0,
+    musicbrainz_id TEXT DEFAULT NULL,
+    duration INTEGER NOT NULL,
+    played_at INTEGER NOT NULL,
+    submitted_at INTEGER NOT NULL
+);
+
+-- The plays counter covers both tables, so moving a play into the archive leaves it unchanged.
+CREATE TRIGGER plays_archive_counters_insert AFTER INSERT ON plays_archive
+BEGIN
+    UPDATE counters SET value = value + 1 WHERE name = 'plays';
+END;
+
+CREATE TRIGGER plays_archive_counters_delete AFTER DELETE ON plays_archive
+BEGIN
+    UPDATE counters SET value = value - 1 WHERE name = 'plays';
+END;
+
+END TRANSACTION;
@@ -0,0 +1,83 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 5;
+
+-- Full text search over plays, including archived plays. The index is keyed by play ID and
+-- stores no content of its own; matching rows are read back from plays and plays_archive.
+CREATE VIRTUAL TABLE plays_fts USING fts5(
+    artist, title, album, track_uri,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+INSERT INTO plays_fts (rowid, artist, title, album, track_uri)
+SELECT play_id, artist, title, album, track_uri FROM plays
+UNION ALL
+SELECT play_id, artist, title, album, track_uri FROM plays_archive;
+
+CREATE TRIGGER plays_fts_insert AFTER INSERT ON plays
+BEGIN
+    INSERT INTO plays_fts (rowid, artist, title, album, track_uri)
+    VALUES (NEW.play_id, NEW.artist, NEW.title, NEW.album, NEW.track_uri);
+END;
+
+CREATE TRIGGER plays_fts_update AFTER UPDATE OF artist, title, album, track_uri ON plays
+BEGIN
+    INSERT INTO plays_fts (plays_fts, rowid, artist, title, album, track_uri)
+    VALUES ('delete', OLD.play_id, OLD.artist, OLD.title, OLD.album, OLD.track_uri);
+    INSERT INTO plays_fts (rowid, artist, title, album, track_uri)
+    VALUES (NEW.play_id, NEW.artist, NEW.title, NEW.album, NEW.track_uri);
+END;
+
+-- Archiving copies a play into plays_archive before deleting it from plays. The indexed play
+-- is the same either way, so the index is left alone while a play is being moved.
+CREATE TRIGGER plays_fts_delete AFTER DELETE ON plays
+WHEN NOT EXISTS (SELECT 1 FROM plays_archive WHERE play_id = OLD.play_id)
+BEGIN
+    INSERT INTO plays_fts (plays_fts, rowid, artist, title, album, track_uri)
+    VALUES ('delete', OLD.play_id, OLD.artist, OLD.title, OLD.album, OLD.track_uri);
+END;
+
+CREATE TRIGGER plays_archive_fts_update AFTER UPDATE OF artist, title, album, track_uri ON plays_archive
+BEGIN
+    INSERT INTO plays_fts (plays_fts, rowid, artist, title, album, track_uri)
+    VALUES ('delete', OLD.play_id, OLD.artist, OLD.title, OLD.album, OLD.track_uri);
+    INSERT INTO plays_fts (rowid, artist, title, album, track_uri)
+    VALUES (NEW.play_id, NEW.artist, NEW.title, NEW.album, NEW.track_uri);
+END;
+
+CREATE TRIGGER plays_archive_fts_delete AFTER DELETE ON plays_archive
+BEGIN
+    INSERT INTO plays_fts (plays_fts, rowid, artist, title, album, track_uri)
+    VALUES ('delete', OLD.play_id, OLD.artist, OLD.title, OLD.album, OLD.track_uri);
+END;
+
+-- Corrections have no stable integer key to use as a rowid, so this index keeps its own copy
+-- of each row and is matched back to corrections by track URI.
+CREATE VIRTUAL TABLE corrections_fts USING fts5(
+    artist, title, album, track_uri,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+INSERT INTO corrections_fts (artist, title, album, track_uri)
+SELECT artist, title, album, track_uri FROM corrections;
+
+CREATE TRIGGER corrections_fts_insert AFTER INSERT ON corrections
+BEGIN
+    INSERT INTO corrections_fts (artist, title, album, track_uri)
+    VALUES (NEW.artist, NEW.title, NEW.album, NEW.track_uri);
+END;
+
+CREATE TRIGGER corrections_fts_update AFTER UPDATE ON corrections
+BEGIN
+    DELETE FROM corrections_fts WHERE track_uri = OLD.track_uri;
+    INSERT INTO corrections_fts (artist, title, album, track_uri)
+    VALUES (NEW.artist, NEW.title, NEW.album, NEW.track_uri);
+END;
+
+CREATE TRIGGER corrections_fts_delete AFTER DELETE ON corrections
+BEGIN
+    DELETE FROM corrections_fts WHERE track_uri = OLD.track_uri;
+END;
+
+END TRANSACTION;
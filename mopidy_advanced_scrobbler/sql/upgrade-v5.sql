@@ -0,0 +1,25 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 6;
+
+-- Plays handed to Last.fm that have not been marked as submitted yet. A row is written before
+-- each batch is sent and removed when its play is marked as submitted. Any row still here
+-- after a crash is a play that may already have been scrobbled, so sweeps of unsubmitted
+-- plays leave it alone rather than risk submitting it twice.
+CREATE TABLE plays_in_flight (
+    play_id INTEGER PRIMARY KEY,
+    started_at INTEGER NOT NULL
+);
+
+CREATE TRIGGER plays_in_flight_submitted AFTER UPDATE OF submitted_at ON plays
+WHEN NEW.submitted_at IS NOT NULL
+BEGIN
+    DELETE FROM plays_in_flight WHERE play_id = NEW.play_id;
+END;
+
+CREATE TRIGGER plays_in_flight_delete AFTER DELETE ON plays
+BEGIN
+    DELETE FROM plays_in_flight WHERE play_id = OLD.play_id;
+END;
+
+END TRANSACTION;
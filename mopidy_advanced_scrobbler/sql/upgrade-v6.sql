@@ -0,0 +1,20 @@
+BEGIN EXCLUSIVE TRANSACTION;
+
+PRAGMA user_version = 7;
+
+-- Failed submissions. A play that failed is retried once next_attempt_at has passed. When
+-- next_attempt_at is NULL after a failure, the play was rejected and is no longer submitted
+-- automatically.
+ALTER TABLE plays ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE plays ADD COLUMN last_error TEXT DEFAULT NULL;
+ALTER TABLE plays ADD COLUMN next_attempt_at INTEGER DEFAULT NULL;
+
+-- Editing a play's metadata may well fix whatever made Last.fm reject it.
+CREATE TRIGGER plays_failures_reset AFTER UPDATE OF artist, title, album ON plays
+WHEN OLD.attempts > 0
+BEGIN
+    UPDATE plays SET attempts = 0, last_error = NULL, next_attempt_at = NULL
+    WHERE play_id = NEW.play_id;
+END;
+
+END TRANSACTION;
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+import pykka
+
+from mopidy_advanced_scrobbler.db import db_service
+from mopidy_advanced_scrobbler.jobs import jobs_service
+
+from ._service import ActorRetrievalFailure, Service
+
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# How long to wait after being woken before submitting. This gives the play that was just
+# recorded time to be written, and lets several wake-ups in quick succession share one run.
+WAKE_DELAY = 5
+
+
+class AutoScrobbler(pykka.ThreadingActor):
+    """Scrobbles unsubmitted plays without waiting for someone to use the web interface.
+
+    The actual submission is done by a scrobble job, so automatic and manual scrobbling are
+    never running at the same time. Each batch is checkpointed by the job runner, and plays
+    left in flight by a crash are not submitted again.
+    """
+
+    def __init__(self, config):
+        super().__init__()
+
+        self._interval = config["auto_scrobble_interval"]
+        self._hold_auto_corrected = config["auto_scrobble_hold_auto_corrected"]
+
+        self._job_id: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+
+        self._proxy = self.actor_ref.proxy()
+
+    def on_start(self):
+        self._report_held_plays()
+        self._schedule(WAKE_DELAY)
+
+    def on_stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _report_held_plays(self):
+        try:
+            db = db_service.retrieve_service().get(timeout=10)
+            play_ids = db.find_in_flight_play_ids().get(timeout=10)
+        except Exception as exc:
+            logger.exception(f"Error while checking for interrupted scrobbles: {exc}")
+            return
+
+        if play_ids:
+            logger.warning(
+                "Scrobbling of plays %s was interrupted, so Last.fm may already have them. "
+                "They will not be scrobbled automatically until they are released from the "
+                "web interface.",
+                ", ".join(map(str, play_ids)),
+            )
+
+    def wake(self):
+        """Submit new plays soon, rather than waiting for the next regular run."""
+        self._schedule(WAKE_DELAY)
+
+    def _schedule(self, delay: float):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._timed_run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_run(self):
+        # Runs on the timer thread, so hand the work back to the actor.
+        try:
+            self._proxy.run()
+        except pykka.ActorDeadError:
+            pass
+
+    def run(self):
+        self._timer = None
+
+        try:
+            jobs = jobs_service.retrieve_service().get(timeout=10)
+            job = jobs.get_job(self._job_id).get(timeout=10) if self._job_id else None
+            if job is None or not job.active:
+                self._job_id = jobs.enqueue_unsubmitted(
+                    hold_auto_corrected=self._hold_auto_corrected
+                ).get(timeout=10)
+                logger.debug("Queued automatic scrobble job %s", self._job_id)
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while queueing automatic scrobble job: {exc}")
+
+        if self._timer is None:
+            self._schedule(self._interval)
+
+
+submitter_service = Service(AutoScrobbler)
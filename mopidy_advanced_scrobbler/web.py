@@ -1,19 +1,39 @@
 from __future__ import annotations
 
+import base64
+import csv
+import hashlib
+import io
+import json
 import logging
-from time import sleep
-from typing import TYPE_CHECKING, List, Optional
+import math
+import mimetypes
+import os
+import re
+from typing import TYPE_CHECKING, Optional
 
+import pykka
 import tornado.escape
 import tornado.httputil
+import tornado.iostream
 import tornado.web
+import tornado.websocket
 from mopidy.http.handlers import StaticFileHandler, check_origin, set_mopidy_headers
 from mopidy.models import Track
 
-from mopidy_advanced_scrobbler.db import DbClientError, SortDirectionEnum, db_service
+from mopidy_advanced_scrobbler.db import (
+    EXPORT_CHUNK_SIZE,
+    DbClientError,
+    SortDirectionEnum,
+    db_changes,
+    db_reader_service,
+    db_service,
+)
+from mopidy_advanced_scrobbler.jobs import JobStatusEnum, jobs_service
 from mopidy_advanced_scrobbler.models import prepare_play
-from mopidy_advanced_scrobbler.network import NetworkException, network_service
+from mopidy_advanced_scrobbler.push import empty_playing, format_playing, playback_broadcaster
 from mopidy_advanced_scrobbler.serial import (
+    Corrected,
     CorrectionEditSchema,
     CorrectionSchema,
     PlayEditSchema,
@@ -21,19 +41,41 @@ from mopidy_advanced_scrobbler.serial import (
     RecordedPlaySchema,
 )
 
+from ._futures import resolve
+from ._metrics import METRICS_CONTENT_TYPE, http_request_duration, metrics
+from ._serializers import compile_dumper, json_encode
 from ._service import ActorRetrievalFailure
 
 
 if TYPE_CHECKING:
     from pathlib import Path
-    from typing import Type
+    from typing import Any, Collection, Dict, Sequence, Set, Tuple, Type
 
     from marshmallow import Schema, fields
     from mopidy.core.actor import Core
 
+    from mopidy_advanced_scrobbler.jobs import ScrobbleJob
+
 
 logger = logging.getLogger(__name__)
 
+# Precompressed siblings written by scripts/build-static.sh, in order of preference.
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# The frontend build puts a content hash in asset filenames, e.g. app.1a2b3c4d.js.
+HASHED_FILENAME = re.compile(r"\.[0-9a-f]{8,}\.[^/.]+$")
+IMMUTABLE_CACHE_TIME = 365 * 24 * 60 * 60
+
+# Scrobbling a single play waits for Last.fm, including any retries and rate limiting, so it
+# is given longer than other actor calls.
+SUBMIT_TIMEOUT = 30.0
+
+SUBMITTED_STATUS_FILTERS = {"all": None, "submitted": True, "unsubmitted": False}
+
+EXPORT_CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
 
 def camelcase(s: str) -> str:
     parts = iter(s.split("_"))
@@ -54,8 +96,173 @@ correction_edit_schema = make_camelcase_schema(CorrectionEditSchema)()
 play_edit_schema = make_camelcase_schema(PlayEditSchema)()
 recorded_play_schema = make_camelcase_schema(RecordedPlaySchema)()
 
+dump_correction = compile_dumper(correction_schema)
+dump_recorded_play = compile_dumper(recorded_play_schema)
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type, *, ranked: bool = False) -> Dict[str, Any]:
+    """Decode a page cursor. Cursors for search results hold (rank, key) pairs."""
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except Exception as exc:
+        raise ValueError("Malformed cursor") from exc
+
+    if not isinstance(data, dict) or len(data) != 1:
+        raise ValueError("Malformed cursor")
+    direction, key = next(iter(data.items()))
+    if direction not in ("after", "before"):
+        raise ValueError("Malformed cursor")
+
+    if ranked:
+        if not isinstance(key, list) or len(key) != 2:
+            raise ValueError("Malformed cursor")
+        rank, key = key
+        if isinstance(rank, bool) or not isinstance(rank, (int, float)):
+            raise ValueError("Malformed cursor")
+        try:
+            rank = float(rank)
+        except OverflowError as exc:
+            raise ValueError("Malformed cursor") from exc
+        if not math.isfinite(rank):
+            raise ValueError("Malformed cursor")
+        data[direction] = (rank, key)
+
+    # JSON booleans decode to bool, which is a subclass of int.
+    if isinstance(key, bool) or not isinstance(key, key_type):
+        raise ValueError("Malformed cursor")
+    # Play IDs must also fit in an SQLite integer, or the query itself would fail.
+    if isinstance(key, int) and not -(2**63) <= key < 2**63:
+        raise ValueError("Malformed cursor")
+
+    return data
+
+
+def make_page_cursors(
+    keys: Sequence[Any], page_size: int, load_args: Dict[str, Any]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Work out the cursors pointing at the pages either side of the one just loaded."""
+    if not keys:
+        if "after" in load_args:
+            return None, encode_cursor({"before": load_args["after"]})
+        elif "before" in load_args:
+            return encode_cursor({"after": load_args["before"]}), None
+        return None, None
+
+    full_page = len(keys) >= page_size
+    if "before" in load_args:
+        has_next, has_prev = True, full_page
+    else:
+        has_next = full_page
+        has_prev = "after" in load_args or load_args.get("page_num", 1) > 1
+
+    next_cursor = encode_cursor({"after": keys[-1]}) if has_next else None
+    prev_cursor = encode_cursor({"before": keys[0]}) if has_prev else None
+    return next_cursor, prev_cursor
+
+
+export_columns = tuple(
+    field.data_key or name for name, field in recorded_play_schema.dump_fields.items()
+)
+
+
+def format_export_ndjson(plays: Collection[RecordedPlay]) -> bytes:
+    lines = (tornado.escape.utf8(json_encode(dump_recorded_play(play))) for play in plays)
+    return b"".join(line + b"\n" for line in lines)
+
+
+def format_export_csv(plays: Collection[RecordedPlay], *, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=export_columns)
+    if header:
+        writer.writeheader()
+    writer.writerows(dump_recorded_play(play) for play in plays)
+    return buffer.getvalue()
+
+
+def make_listing_etag(load_args: Dict[str, Any]) -> str:
+    """Derive an ETag for a listing from the database change token and the query arguments."""
+    hasher = hashlib.sha1(db_changes.token().encode("utf-8"))
+    hasher.update(json.dumps(load_args, sort_keys=True, default=str).encode("utf-8"))
+    return f'"{hasher.hexdigest()}"'
 
-class OverrideStaticFileHandler(StaticFileHandler):
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    encodings = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding)
+
+    return encodings
+
+
+class PrecompressedStaticFileHandler(StaticFileHandler):
+    """Serve the brotli or gzip sibling of a static file, when the client accepts one.
+
+    Files with a content hash in their name never change, so they may be cached forever.
+    Everything else, such as index.html, keeps Mopidy's no-cache policy.
+    """
+
+    def initialize(self, path, default_filename=None):
+        super().initialize(path, default_filename)
+        self.original_path: Optional[str] = None
+        self.content_encoding: Optional[str] = None
+
+    def validate_absolute_path(self, root: str, absolute_path: str) -> Optional[str]:
+        absolute_path = super().validate_absolute_path(root, absolute_path)
+        if absolute_path is None:
+            return None
+
+        self.original_path = absolute_path
+        accepted = accepted_encodings(self.request.headers.get("Accept-Encoding", ""))
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if encoding not in accepted:
+                continue
+            try:
+                stat_result = os.stat(absolute_path + suffix)
+            except OSError:
+                continue
+
+            # Tornado keeps the stat of the validated file for Content-Length and Last-Modified.
+            self._stat_result = stat_result
+            self.content_encoding = encoding
+            return absolute_path + suffix
+
+        return absolute_path
+
+    def get_content_type(self) -> str:
+        if self.content_encoding is None:
+            return super().get_content_type()
+
+        mime_type, _ = mimetypes.guess_type(self.original_path)
+        return mime_type or "application/octet-stream"
+
+    def set_extra_headers(self, path):
+        super().set_extra_headers(path)
+        self.set_header("Vary", "Accept-Encoding")
+        if self.content_encoding:
+            self.set_header("Content-Encoding", self.content_encoding)
+        if HASHED_FILENAME.search(path):
+            self.set_header("Cache-Control", f"public, max-age={IMMUTABLE_CACHE_TIME}, immutable")
+
+
+class OverrideStaticFileHandler(PrecompressedStaticFileHandler):
     def initialize(self, static_file_path: Path):  # type: ignore
         self.static_file_path = str(static_file_path)
         super().initialize(str(static_file_path.parent))
@@ -88,6 +295,11 @@ class _BaseHandler(tornado.web.RequestHandler):
     def set_extra_headers(self):
         set_mopidy_headers(self)
 
+    def on_finish(self):
+        http_request_duration.labels(
+            type(self).__name__, self.request.method, str(self.get_status())
+        ).observe(self.request.request_time())
+
 
 class _BaseJsonHandler(_BaseHandler):
     def check_csrf_protection(self):
@@ -106,12 +318,35 @@ class _BaseJsonHandler(_BaseHandler):
         self.set_header("Accept", "application/json")
         self.set_header("Content-Type", "application/json; charset=utf-8")
 
+    def write(self, chunk):
+        if isinstance(chunk, dict):
+            chunk = json_encode(chunk)
+            self.set_header("Content-Type", "application/json; charset=UTF-8")
+        super().write(chunk)
+
+    _listing_etag: Optional[str] = None
+
     def compute_etag(self):
-        return None
+        return self._listing_etag
+
+    def check_listing_etag(self, load_args: Dict[str, Any]) -> bool:
+        """Answer with 304 if the client already has this listing, without touching the DB.
+
+        A 304 keeps the ETag, as RFC 7232 requires. Otherwise it is cleared again, so that
+        ``finish()`` only sends it on successful responses.
+        """
+        self._listing_etag = make_listing_etag(load_args)
+        self.set_etag_header()
+        if self.check_etag_header():
+            self.set_status(304)
+            return True
+
+        self.clear_header("Etag")
+        return False
 
 
 class _BaseJsonPostHandler(_BaseJsonHandler):
-    def post(self):
+    async def post(self):
         self.set_extra_headers()
         if not self.check_csrf_protection():
             return
@@ -123,9 +358,9 @@ class _BaseJsonPostHandler(_BaseJsonHandler):
             self.write({"success": False, "message": "Invalid request body"})
             return
 
-        self._post(data)
+        await self._post(data)
 
-    def _post(self, data):
+    async def _post(self, data):
         raise NotImplementedError()
 
 
@@ -134,18 +369,27 @@ class ApiPlaybackData(_BaseJsonHandler):
         super().initialize(**kwargs)
         self.core: Core = core
 
-    def get(self):
+    async def get(self):
         self.set_extra_headers()
 
         track_future = self.core.playback.get_current_track()
         playback_state_future = self.core.playback.get_state()
         playback_time_pos_future = self.core.playback.get_time_position()
 
-        track: Track = track_future.get()
+        try:
+            track: Track = await resolve(track_future)
+            playback_state: str = await resolve(playback_state_future)
+            playback_time_pos_msec: Optional[int] = await resolve(playback_time_pos_future)
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving playback state: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Mopidy core issue."})
+            return
+
         if track:
             try:
-                db = db_service.retrieve_service().get(timeout=10)
-                correction = db.find_correction(track.uri).get(timeout=10)
+                db = await resolve(db_service.retrieve_service())
+                correction = await resolve(db.find_correction(track.uri))
             except Exception as exc:
                 logger.exception(
                     f"Error while finding scrobbler correction for track with URI '{track.uri}': {exc}"
@@ -153,24 +397,10 @@ class ApiPlaybackData(_BaseJsonHandler):
                 correction = None
 
             play = prepare_play(track, -1, correction)
-            playing = {
-                "trackUri": play.track_uri,
-                "title": play.title,
-                "artist": play.artist,
-                "album": play.album,
-                "duration": play.duration,
-            }
+            playing = format_playing(play)
         else:
-            playing = {
-                "trackUri": "",
-                "title": "",
-                "artist": "",
-                "album": "",
-                "duration": 0,
-            }
+            playing = empty_playing()
 
-        playback_state: str = playback_state_future.get()
-        playback_time_pos_msec: Optional[int] = playback_time_pos_future.get()
         if playback_time_pos_msec:
             playback_time_pos = int(playback_time_pos_msec / 1000)
         else:
@@ -187,8 +417,28 @@ class ApiPlaybackData(_BaseJsonHandler):
         self.write(response)
 
 
+class ApiPlaybackSocket(tornado.websocket.WebSocketHandler):
+    def initialize(self, allowed_origins, csrf_protection):
+        self.allowed_origins = allowed_origins
+        self.csrf_protection = csrf_protection
+
+    def check_origin(self, origin):
+        if not self.csrf_protection:
+            return True
+        return check_origin(origin, self.request.headers, self.allowed_origins)
+
+    def open(self):
+        playback_broadcaster.register(self)
+
+    def on_close(self):
+        playback_broadcaster.unregister(self)
+
+    def on_message(self, message):
+        pass
+
+
 class ApiPlayLoad(_BaseJsonHandler):
-    def get(self):
+    async def get(self):
         self.set_extra_headers()
         load_args = {}
 
@@ -207,51 +457,165 @@ class ApiPlayLoad(_BaseJsonHandler):
         try:
             page_size = int(self.get_query_argument("page_size", ""))
             load_args["page_size"] = max(min(page_size, 100), 1)
+        except ValueError:
+            load_args["page_size"] = 50
+
+        search = self.get_query_argument("q", "").strip()
+        if search:
+            load_args["search"] = search
+
+        try:
+            load_args["corrected"] = Corrected(int(self.get_query_argument("corrected", "")))
         except ValueError:
             pass
 
+        submitted = SUBMITTED_STATUS_FILTERS.get(self.get_query_argument("status", "all"))
+        if submitted is not None:
+            load_args["submitted"] = submitted
+
+        cursor = self.get_query_argument("cursor", "")
+        if cursor:
+            try:
+                load_args.update(decode_cursor(cursor, int, ranked=bool(search)))
+            except ValueError:
+                self.set_status(400)
+                self.write({"success": False, "message": "Invalid cursor."})
+                return
+
+        if self.check_listing_etag(load_args):
+            return
+
         try:
-            db = db_service.retrieve_service().get()
+            db_reader = await resolve(db_reader_service.retrieve_service())
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving database service: {exc}")
+            logger.exception(f"Error while retrieving database reader service: {exc}")
             self.set_status(500)
             self.write({"success": False, "message": "Database connection issue."})
             return
 
         try:
-            plays = db.load_plays(**load_args).get()
+            page = await resolve(db_reader.load_plays_page(**load_args))
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving plays from database: {exc}")
             self.set_status(500)
             self.write({"success": False, "message": "Database connection issue."})
             return
 
-        overall_plays_count = -1
-        unsubmitted_plays_count = -1
-        try:
-            overall_plays_count = db.get_plays_count().get()
-            unsubmitted_plays_count = db.get_plays_count(only_unsubmitted=True).get()
-        except Exception as exc:
-            logger.exception(f"Error while retrieving play counts from database: {exc}")
-
+        plays = page.plays
         play_id_mapping = {}
         for idx, play in enumerate(plays):
             play_id_mapping[play.play_id] = idx
 
+        if page.ranks is None:
+            keys: Sequence[Any] = tuple(play_id_mapping.keys())
+        else:
+            keys = [[rank, play.play_id] for rank, play in zip(page.ranks, plays)]
+        next_cursor, prev_cursor = make_page_cursors(keys, load_args["page_size"], load_args)
+
         response = {
             "success": True,
-            "plays": recorded_play_schema.dump(plays, many=True),
+            "plays": [dump_recorded_play(play) for play in plays],
             "playIdMapping": play_id_mapping,
+            "nextCursor": next_cursor,
+            "prevCursor": prev_cursor,
             "counts": {
-                "overall": overall_plays_count,
-                "unsubmitted": unsubmitted_plays_count,
+                "overall": page.overall_count,
+                "unsubmitted": page.unsubmitted_count,
+            },
+            "failures": {
+                failure.play_id: {
+                    "attempts": failure.attempts,
+                    "lastError": failure.last_error,
+                    "nextAttemptAt": failure.next_attempt_at,
+                    "inFlight": failure.in_flight,
+                }
+                for failure in page.failures
             },
+            "inFlight": list(page.in_flight),
         }
+        if page.matched_count is not None:
+            response["counts"]["matched"] = page.matched_count
         self.write(response)
 
 
+class ApiPlayExport(_BaseJsonHandler):
+    async def get(self):
+        self.set_extra_headers()
+
+        export_format = self.get_query_argument("format", "ndjson")
+        if export_format not in EXPORT_CONTENT_TYPES:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid export format."})
+            return
+
+        export_args: Dict[str, Any] = {}
+        status = self.get_query_argument("status", "all")
+        if status not in SUBMITTED_STATUS_FILTERS:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid status filter."})
+            return
+        if SUBMITTED_STATUS_FILTERS[status] is not None:
+            export_args["submitted"] = SUBMITTED_STATUS_FILTERS[status]
+
+        try:
+            for arg_name, query_arg_name in (("played_from", "from"), ("played_to", "to")):
+                value = self.get_query_argument(query_arg_name, "")
+                if value:
+                    export_args[arg_name] = int(value)
+        except ValueError:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid played at range."})
+            return
+
+        try:
+            db_reader = await resolve(db_reader_service.retrieve_service())
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database reader service: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        after: Optional[int] = None
+        started = False
+        while True:
+            try:
+                plays = await resolve(db_reader.export_plays_chunk(after=after, **export_args))
+            except Exception as exc:
+                logger.exception(f"Error while exporting plays from database: {exc}")
+                if started:
+                    # Part of the export has already been sent, so make sure the client can
+                    # tell it is incomplete rather than letting the response end normally.
+                    self.request.connection.close()
+                    return
+                self.set_status(500)
+                self.write({"success": False, "message": "Database connection issue."})
+                return
+
+            if export_format == "csv":
+                self.write(format_export_csv(plays, header=not started))
+            else:
+                self.write(format_export_ndjson(plays))
+
+            if not started:
+                self.set_header("Content-Type", EXPORT_CONTENT_TYPES[export_format])
+                self.set_header(
+                    "Content-Disposition", f'attachment; filename="plays.{export_format}"'
+                )
+                started = True
+
+            try:
+                await self.flush()
+            except tornado.iostream.StreamClosedError:
+                logger.debug("Client disconnected during play export")
+                return
+
+            if len(plays) < EXPORT_CHUNK_SIZE:
+                return
+            after = plays[-1].play_id
+
+
 class ApiPlayEdit(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "play" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play data."})
@@ -265,7 +629,7 @@ class ApiPlayEdit(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -273,7 +637,7 @@ class ApiPlayEdit(_BaseJsonPostHandler):
             return
 
         try:
-            db.edit_play(play_edit).get()
+            await resolve(db.edit_play(play_edit))
         except DbClientError as exc:
             self.set_status(400)
             self.write({"success": False, "message": str(exc)})
@@ -287,8 +651,47 @@ class ApiPlayEdit(_BaseJsonPostHandler):
         self.write({"success": True})
 
 
+class ApiPlayEditMany(_BaseJsonPostHandler):
+    async def _post(self, data):
+        if "plays" not in data:
+            self.set_status(400)
+            self.write({"success": False, "message": "Missing play data."})
+            return
+
+        try:
+            if not isinstance(data["plays"], list):
+                raise ValueError()
+            play_edits = play_edit_schema.load(data["plays"], many=True)
+        except Exception:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid play data."})
+            return
+
+        try:
+            db = await resolve(db_service.retrieve_service())
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database service: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        try:
+            await resolve(db.edit_plays(play_edits))
+        except DbClientError as exc:
+            self.set_status(400)
+            self.write({"success": False, "message": str(exc)})
+            return
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while editing plays: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        self.write({"success": True})
+
+
 class ApiPlayDelete(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "playId" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play ID."})
@@ -302,7 +705,7 @@ class ApiPlayDelete(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -310,7 +713,7 @@ class ApiPlayDelete(_BaseJsonPostHandler):
             return
 
         try:
-            success = db.delete_play(play_id).get()
+            success = await resolve(db.delete_play(play_id))
         except DbClientError as exc:
             self.set_status(400)
             self.write({"success": False, "message": str(exc)})
@@ -325,7 +728,7 @@ class ApiPlayDelete(_BaseJsonPostHandler):
 
 
 class ApiPlayDeleteMany(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "playIds" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play IDs."})
@@ -341,7 +744,7 @@ class ApiPlayDeleteMany(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -349,7 +752,7 @@ class ApiPlayDeleteMany(_BaseJsonPostHandler):
             return
 
         try:
-            db.delete_plays(play_ids).get()
+            await resolve(db.delete_plays(play_ids))
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while deleting plays: {exc}")
             self.set_status(500)
@@ -359,8 +762,78 @@ class ApiPlayDeleteMany(_BaseJsonPostHandler):
         self.write({"success": True})
 
 
+class ApiPlayResetFailures(_BaseJsonPostHandler):
+    async def _post(self, data):
+        if "playIds" not in data:
+            self.set_status(400)
+            self.write({"success": False, "message": "Missing play IDs."})
+            return
+
+        try:
+            if not isinstance(data["playIds"], list):
+                raise ValueError()
+            play_ids = tuple(map(int, data["playIds"]))
+        except Exception:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid play IDs."})
+            return
+
+        try:
+            db = await resolve(db_service.retrieve_service())
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database service: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        try:
+            await resolve(db.reset_submission_failures(play_ids))
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while resetting failed submissions: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        self.write({"success": True})
+
+
+class ApiPlayAbandonSubmission(_BaseJsonPostHandler):
+    async def _post(self, data):
+        if "playIds" not in data:
+            self.set_status(400)
+            self.write({"success": False, "message": "Missing play IDs."})
+            return
+
+        try:
+            if not isinstance(data["playIds"], list):
+                raise ValueError()
+            play_ids = tuple(map(int, data["playIds"]))
+        except Exception:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid play IDs."})
+            return
+
+        try:
+            db = await resolve(db_service.retrieve_service())
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database service: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        try:
+            await resolve(db.abandon_submission(play_ids))
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while releasing plays in flight: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        self.write({"success": True})
+
+
 class ApiPlaySubmit(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "playId" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play ID."})
@@ -374,15 +847,15 @@ class ApiPlaySubmit(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db_reader = await resolve(db_reader_service.retrieve_service())
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving database service: {exc}")
+            logger.exception(f"Error while retrieving database reader service: {exc}")
             self.set_status(500)
             self.write({"success": False, "message": "Database connection issue."})
             return
 
         try:
-            play: RecordedPlay = db.find_play(play_id).get()
+            play: RecordedPlay = await resolve(db_reader.find_play(play_id))
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while finding play in database: {exc}")
             self.set_status(500)
@@ -398,39 +871,43 @@ class ApiPlaySubmit(_BaseJsonPostHandler):
             self.write({"success": False, "message": "Play was already submitted."})
             return
 
+        # Scrobbled by the job runner, so that it never overlaps a batch that might include it.
         try:
-            network = network_service.retrieve_service().get()
-        except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving network service: {exc}")
+            jobs = await resolve(jobs_service.retrieve_service())
+            job: ScrobbleJob = await resolve(
+                jobs.scrobble_play(play.play_id), timeout=SUBMIT_TIMEOUT
+            )
+        except pykka.Timeout as exc:
+            logger.exception(f"Timed out while scrobbling play: {exc}")
             self.set_status(500)
-            self.write({"success": False, "message": "Last.fm connection issue."})
+            self.write(
+                {
+                    "success": False,
+                    "message": "Timed out while scrobbling play. It may still be sent.",
+                }
+            )
             return
-
-        try:
-            network.submit_scrobble(play).get()
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while scrobbling play: {exc}")
             self.set_status(500)
-            self.write({"success": False, "message": "Last.fm connection issue."})
+            self.write({"success": False, "message": "Scrobble job service issue."})
             return
 
-        try:
-            success = db.mark_play_submitted(play.play_id).get()
-        except DbClientError as exc:
-            self.set_status(400)
-            self.write({"success": False, "message": f"Error after successful scrobble: {exc}"})
-            return
-        except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while marking play as submitted: {exc}")
+        if job.status == JobStatusEnum.FAILED:
             self.set_status(500)
-            self.write({"success": False, "message": "Database connection issue after ."})
-            return
-
-        self.write({"success": success})
+            self.write({"success": False, "message": job.message})
+        elif job.ignored_plays:
+            message = f"Last.fm ignored this play: {job.ignored_message}"
+            self.write({"success": False, "message": message})
+        elif not job.found_plays:
+            self.set_status(400)
+            self.write({"success": False, "message": "Play was already submitted."})
+        else:
+            self.write({"success": bool(job.marked_plays)})
 
 
 class ApiCorrectionLoad(_BaseJsonHandler):
-    def get(self):
+    async def get(self):
         self.set_extra_headers()
         load_args = {}
 
@@ -444,42 +921,66 @@ class ApiCorrectionLoad(_BaseJsonHandler):
             page_size = int(self.get_query_argument("page_size", ""))
             load_args["page_size"] = max(min(page_size, 100), 1)
         except ValueError:
-            pass
+            load_args["page_size"] = 50
+
+        search = self.get_query_argument("q", "").strip()
+        if search:
+            load_args["search"] = search
+
+        cursor = self.get_query_argument("cursor", "")
+        if cursor:
+            try:
+                load_args.update(decode_cursor(cursor, str, ranked=bool(search)))
+            except ValueError:
+                self.set_status(400)
+                self.write({"success": False, "message": "Invalid cursor."})
+                return
+
+        if self.check_listing_etag(load_args):
+            return
 
         try:
-            db = db_service.retrieve_service().get()
+            db_reader = await resolve(db_reader_service.retrieve_service())
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving database service: {exc}")
+            logger.exception(f"Error while retrieving database reader service: {exc}")
             self.set_status(500)
             self.write({"success": False, "message": "Database connection issue."})
             return
 
         try:
-            corrections = db.load_corrections(**load_args).get()
+            page = await resolve(db_reader.load_corrections_page(**load_args))
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving corrections from database: {exc}")
             self.set_status(500)
             self.write({"success": False, "message": "Database connection issue."})
             return
 
-        overall_corrections_count = -1
-        try:
-            overall_corrections_count = db.get_corrections_count().get()
-        except Exception as exc:
-            logger.exception(f"Error while retrieving play counts from database: {exc}")
+        corrections = page.corrections
+
+        if page.ranks is None:
+            keys: Sequence[Any] = tuple(correction.track_uri for correction in corrections)
+        else:
+            keys = [
+                [rank, correction.track_uri] for rank, correction in zip(page.ranks, corrections)
+            ]
+        next_cursor, prev_cursor = make_page_cursors(keys, load_args["page_size"], load_args)
 
         response = {
             "success": True,
-            "corrections": correction_schema.dump(corrections, many=True),
+            "corrections": [dump_correction(correction) for correction in corrections],
+            "nextCursor": next_cursor,
+            "prevCursor": prev_cursor,
             "counts": {
-                "overall": overall_corrections_count,
+                "overall": page.overall_count,
             },
         }
+        if page.matched_count is not None:
+            response["counts"]["matched"] = page.matched_count
         self.write(response)
 
 
 class ApiCorrectionEdit(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "correction" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing correction data."})
@@ -493,7 +994,7 @@ class ApiCorrectionEdit(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -501,7 +1002,7 @@ class ApiCorrectionEdit(_BaseJsonPostHandler):
             return
 
         try:
-            db.edit_correction(correction_edit).get()
+            await resolve(db.edit_correction(correction_edit))
         except DbClientError as exc:
             self.set_status(400)
             self.write({"success": False, "message": str(exc)})
@@ -516,7 +1017,7 @@ class ApiCorrectionEdit(_BaseJsonPostHandler):
 
 
 class ApiCorrectionDelete(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "trackUri" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing track URI."})
@@ -530,7 +1031,7 @@ class ApiCorrectionDelete(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -538,7 +1039,7 @@ class ApiCorrectionDelete(_BaseJsonPostHandler):
             return
 
         try:
-            success = db.delete_correction(track_uri).get()
+            success = await resolve(db.delete_correction(track_uri))
         except DbClientError as exc:
             self.set_status(400)
             self.write({"success": False, "message": str(exc)})
@@ -553,7 +1054,7 @@ class ApiCorrectionDelete(_BaseJsonPostHandler):
 
 
 class ApiApproveAutoCorrection(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "playId" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play ID."})
@@ -567,7 +1068,7 @@ class ApiApproveAutoCorrection(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -575,7 +1076,7 @@ class ApiApproveAutoCorrection(_BaseJsonPostHandler):
             return
 
         try:
-            db.approve_auto_correction(play_id).get()
+            await resolve(db.approve_auto_correction(play_id))
         except DbClientError as exc:
             self.set_status(400)
             self.write({"success": False, "message": str(exc)})
@@ -589,8 +1090,8 @@ class ApiApproveAutoCorrection(_BaseJsonPostHandler):
         self.write({"success": True})
 
 
-class ApiPlayScrobbleMany(_BaseJsonPostHandler):
-    def _post(self, data):
+class ApiApproveAutoCorrectionMany(_BaseJsonPostHandler):
+    async def _post(self, data):
         if "playIds" not in data:
             self.set_status(400)
             self.write({"success": False, "message": "Missing play IDs."})
@@ -606,7 +1107,7 @@ class ApiPlayScrobbleMany(_BaseJsonPostHandler):
             return
 
         try:
-            db = db_service.retrieve_service().get()
+            db = await resolve(db_service.retrieve_service())
         except ActorRetrievalFailure as exc:
             logger.exception(f"Error while retrieving database service: {exc}")
             self.set_status(500)
@@ -614,78 +1115,50 @@ class ApiPlayScrobbleMany(_BaseJsonPostHandler):
             return
 
         try:
-            network = network_service.retrieve_service().get()
+            await resolve(db.approve_auto_corrections(play_ids))
+        except DbClientError as exc:
+            self.set_status(400)
+            self.write({"success": False, "message": str(exc)})
+            return
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving network service: {exc}")
+            logger.exception(f"Error while approving auto-corrections: {exc}")
             self.set_status(500)
-            self.write({"success": False, "message": "Last.fm connection issue."})
+            self.write({"success": False, "message": "Database connection issue."})
             return
 
-        found_plays: List[int] = []
-        scrobbled_plays: List[int] = []
-        marked_plays: List[int] = []
-        err_msg: Optional[str] = None
-        for batch_start_id in range(0, 250, 50):
-            play_ids_batch = play_ids[batch_start_id : batch_start_id + 50]
-
-            try:
-                unsubmitted_plays = db.find_plays(play_ids_batch, only_unsubmitted=True).get()
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while retrieving unsubmitted plays: {exc}")
-                err_msg = "Error while retrieving unsubmitted plays."
-                break
-
-            if not unsubmitted_plays:
-                break
+        self.write({"success": True})
 
-            unsubmitted_play_ids = tuple(map(lambda play: play.play_id, unsubmitted_plays))
-            found_plays.extend(unsubmitted_play_ids)
 
-            try:
-                network.submit_scrobbles(unsubmitted_plays).get()
-            except NetworkException as exc:
-                logger.exception(f"Network error while scrobbling plays: {exc}")
-                err_msg = "Network error while scrobbling plays."
-                break
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while scrobbling plays: {exc}")
-                err_msg = "Error while scrobbling plays."
-                break
-
-            scrobbled_plays.extend(unsubmitted_play_ids)
+class ApiPlayScrobbleMany(_BaseJsonPostHandler):
+    async def _post(self, data):
+        if "playIds" not in data:
+            self.set_status(400)
+            self.write({"success": False, "message": "Missing play IDs."})
+            return
 
-            try:
-                db.mark_plays_submitted(unsubmitted_play_ids).get()
-            except DbClientError as exc:
-                logger.exception(f"Error after successful scrobble: {exc}")
-                err_msg = "Error after successful scrobble."
-                break
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while marking plays as submitted: {exc}")
-                err_msg = "Error while marking plays as submitted."
-                break
-            except Exception as exc:
-                logger.exception(f"Error while marking plays as submitted: {exc}")
-                err_msg = "Error while marking plays as submitted."
-                break
+        try:
+            if not isinstance(data["playIds"], list):
+                raise ValueError()
+            play_ids = tuple(map(int, data["playIds"]))
+        except Exception:
+            self.set_status(400)
+            self.write({"success": False, "message": "Invalid play IDs."})
+            return
 
-            marked_plays.extend(unsubmitted_play_ids)
-            # Vague rate-limiting of requests to the Network API
-            sleep(1)
+        try:
+            jobs = await resolve(jobs_service.retrieve_service())
+            job_id = await resolve(jobs.enqueue_plays(play_ids))
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while queueing scrobble job: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Scrobble job service issue."})
+            return
 
-        self.write(
-            {
-                "success": True,
-                "foundPlays": found_plays,
-                "scrobbledPlays": scrobbled_plays,
-                "markedPlays": marked_plays,
-                "message": err_msg,
-            }
-        )
+        self.write({"success": True, "jobId": job_id})
 
 
 class ApiScrobble(_BaseJsonPostHandler):
-    def _post(self, data):
+    async def _post(self, data):
         if "checkpoint" in data:
             try:
                 checkpoint = int(data["checkpoint"])
@@ -697,77 +1170,105 @@ class ApiScrobble(_BaseJsonPostHandler):
             checkpoint = None
 
         try:
-            db = db_service.retrieve_service().get()
+            jobs = await resolve(jobs_service.retrieve_service())
+            job_id = await resolve(jobs.enqueue_unsubmitted(checkpoint=checkpoint))
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving database service: {exc}")
+            logger.exception(f"Error while queueing scrobble job: {exc}")
             self.set_status(500)
-            self.write({"success": False, "message": "Database connection issue."})
+            self.write({"success": False, "message": "Scrobble job service issue."})
             return
 
+        self.write({"success": True, "jobId": job_id})
+
+
+class ApiJobLoad(_BaseJsonHandler):
+    async def get(self, job_id: str):
+        self.set_extra_headers()
+
         try:
-            network = network_service.retrieve_service().get()
+            jobs = await resolve(jobs_service.retrieve_service())
+            job: Optional[ScrobbleJob] = await resolve(jobs.get_job(job_id))
         except ActorRetrievalFailure as exc:
-            logger.exception(f"Error while retrieving network service: {exc}")
+            logger.exception(f"Error while retrieving scrobble job: {exc}")
             self.set_status(500)
-            self.write({"success": False, "message": "Last.fm connection issue."})
+            self.write({"success": False, "message": "Scrobble job service issue."})
             return
 
-        found_plays: List[int] = []
-        scrobbled_plays: List[int] = []
-        marked_plays: List[int] = []
-        err_msg: Optional[str] = None
-        for _ in range(0, 5):
-            try:
-                unsubmitted_plays = db.load_unsubmitted_plays_batch(checkpoint=checkpoint).get()
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while retrieving unsubmitted plays: {exc}")
-                err_msg = "Error while retrieving unsubmitted plays."
-                break
+        if job is None:
+            self.set_status(404)
+            self.write({"success": False, "message": "No such job."})
+            return
 
-            if not unsubmitted_plays:
-                break
+        self.write(
+            {
+                "success": True,
+                "job": {
+                    "jobId": job.job_id,
+                    "status": job.status.value,
+                    "foundPlays": job.found_plays,
+                    "scrobbledPlays": job.scrobbled_plays,
+                    "ignoredPlays": job.ignored_plays,
+                    "markedPlays": job.marked_plays,
+                    "message": job.message,
+                },
+            }
+        )
 
-            unsubmitted_play_ids = tuple(map(lambda play: play.play_id, unsubmitted_plays))
-            found_plays.extend(unsubmitted_play_ids)
 
-            try:
-                network.submit_scrobbles(unsubmitted_plays).get()
-            except NetworkException as exc:
-                logger.exception(f"Network error while scrobbling plays: {exc}")
-                err_msg = "Network error while scrobbling plays."
-                break
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while scrobbling plays: {exc}")
-                err_msg = "Error while scrobbling plays."
-                break
-
-            scrobbled_plays.extend(unsubmitted_play_ids)
+class ApiJobCancel(_BaseJsonPostHandler):
+    async def _post(self, data):
+        if "jobId" not in data:
+            self.set_status(400)
+            self.write({"success": False, "message": "Missing job ID."})
+            return
+
+        try:
+            jobs = await resolve(jobs_service.retrieve_service())
+            success = await resolve(jobs.cancel_job(str(data["jobId"])))
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while cancelling scrobble job: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Scrobble job service issue."})
+            return
+
+        self.write({"success": success})
 
-            try:
-                db.mark_plays_submitted(unsubmitted_play_ids).get()
-            except DbClientError as exc:
-                logger.exception(f"Error after successful scrobble: {exc}")
-                err_msg = "Error after successful scrobble."
-                break
-            except ActorRetrievalFailure as exc:
-                logger.exception(f"Error while marking plays as submitted: {exc}")
-                err_msg = "Error while marking plays as submitted."
-                break
-            except Exception as exc:
-                logger.exception(f"Error while marking plays as submitted: {exc}")
-                err_msg = "Error while marking plays as submitted."
-                break
 
-            marked_plays.extend(unsubmitted_play_ids)
-            # Vague rate-limiting of requests to the Network API
-            sleep(1)
+class ApiDebugDbStats(_BaseJsonHandler):
+    async def get(self):
+        self.set_extra_headers()
+
+        try:
+            db = await resolve(db_service.retrieve_service())
+        except ActorRetrievalFailure as exc:
+            logger.exception(f"Error while retrieving database service: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
 
+        try:
+            stats = await resolve(db.get_query_stats())
+        except Exception as exc:
+            logger.exception(f"Error while retrieving database query stats: {exc}")
+            self.set_status(500)
+            self.write({"success": False, "message": "Database connection issue."})
+            return
+
+        queries = {
+            name: {camelcase(key): value for key, value in query.items()}
+            for name, query in stats["queries"].items()
+        }
         self.write(
             {
                 "success": True,
-                "foundPlays": found_plays,
-                "scrobbledPlays": scrobbled_plays,
-                "markedPlays": marked_plays,
-                "message": err_msg,
+                "queries": queries,
+                "correctionCache": stats["correction_cache"],
             }
         )
+
+
+class ApiMetrics(_BaseHandler):
+    def get(self):
+        self.set_extra_headers()
+        self.set_header("Content-Type", METRICS_CONTENT_TYPE)
+        self.write(metrics.render())
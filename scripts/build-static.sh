@@ -13,3 +13,17 @@ popd
 
 rm -rf mopidy_advanced_scrobbler/static
 cp -r frontend/dist mopidy_advanced_scrobbler/static
+
+# Precompress text assets, so the web server can send them without compressing on each request.
+if ! command -v brotli > /dev/null; then
+  echo "brotli not found, only gzip variants will be generated" >&2
+fi
+find mopidy_advanced_scrobbler/static -type f \
+  \( -name '*.js' -o -name '*.css' -o -name '*.html' -o -name '*.svg' -o -name '*.json' \
+     -o -name '*.ttf' -o -name '*.eot' \) -print0 |
+  while IFS= read -r -d '' file; do
+    gzip -9 --keep --no-name --force "$file"
+    if command -v brotli > /dev/null; then
+      brotli --best --keep --force "$file"
+    fi
+  done
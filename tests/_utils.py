@@ -1,6 +1,27 @@
 from pathlib import Path
 
+from mopidy_advanced_scrobbler.models import Corrected, Play
+
 
 def path_to_data_dir(name):
     path = Path(__file__).parent / "data" / name
     return path.resolve()
+
+
+def make_play(track_uri="local:track:a.mp3", played_at=1600000000, **kwargs) -> Play:
+    data = {
+        "track_uri": track_uri,
+        "title": "Title",
+        "artist": "Artist",
+        "album": "Album",
+        "orig_title": "Title",
+        "orig_artist": "Artist",
+        "orig_album": "Album",
+        "corrected": Corrected.NOT_CORRECTED,
+        "musicbrainz_id": None,
+        "duration": 180,
+        "played_at": played_at,
+        "submitted_at": None,
+    }
+    data.update(kwargs)
+    return Play(**data)
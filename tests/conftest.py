@@ -0,0 +1,45 @@
+import contextlib
+
+import pytest
+import tornado.httpclient
+import tornado.httpserver
+import tornado.testing
+
+
+@pytest.fixture
+def config(tmp_path):
+    return {
+        "core": {"data_dir": tmp_path},
+        "advanced_scrobbler": {
+            "db_timeout": 10,
+            "correction_cache_size": 16,
+            "write_behind_size": 0,
+            "write_behind_delay": 5,
+            "slow_query_threshold": 500,
+            "archive_after": None,
+            "fast_json": False,
+        },
+    }
+
+
+@pytest.fixture
+def serve_app():
+    """Serve a Tornado application on a free local port while a test's event loop runs.
+
+    Used as ``async with serve_app(app) as (base_url, client)``, with an HTTP client that is
+    closed along with the server.
+    """
+
+    @contextlib.asynccontextmanager
+    async def serve(app):
+        sock, port = tornado.testing.bind_unused_port()
+        server = tornado.httpserver.HTTPServer(app)
+        server.add_sockets([sock])
+        client = tornado.httpclient.AsyncHTTPClient()
+        try:
+            yield f"http://127.0.0.1:{port}", client
+        finally:
+            client.close()
+            server.stop()
+
+    return serve
@@ -0,0 +1,637 @@
+import dataclasses
+import time
+from unittest import mock
+
+import pytest
+
+from mopidy_advanced_scrobbler import db as db_lib
+from mopidy_advanced_scrobbler.models import Corrected, CorrectionEdit, PlayEdit
+from mopidy_advanced_scrobbler.serial import correction_schema, recorded_play_schema
+
+from ._utils import make_play
+
+
+@pytest.fixture
+def db(config):
+    actor = db_lib.AdvancedScrobblerDb(config)
+    actor.on_start()
+    yield actor
+    actor.on_stop()
+
+
+def explain(db, query: str, args=()) -> str:
+    rows = db._connect().execute(f"EXPLAIN QUERY PLAN {query}", args).fetchall()
+    return " | ".join(row["detail"] for row in rows)
+
+
+def test_prepare_db_creates_latest_schema(db):
+    conn = db._connect()
+    user_version = conn.execute("PRAGMA user_version").fetchone()["user_version"]
+    assert user_version == db_lib.SCHEMA_VERSION
+
+
+def test_unsubmitted_queries_use_partial_index(db):
+    plan = explain(db, "SELECT * FROM plays WHERE submitted_at IS NULL ORDER BY play_id LIMIT 50")
+    assert "plays_unsubmitted_idx" in plan
+
+    plan = explain(db, "SELECT COUNT(*) FROM plays WHERE submitted_at IS NULL")
+    assert "plays_unsubmitted_idx" in plan
+
+
+def test_track_uri_queries_use_index(db):
+    plan = explain(
+        db,
+        "SELECT * FROM plays WHERE track_uri = ? AND submitted_at IS NULL",
+        ("local:track:a.mp3",),
+    )
+    assert "plays_track_uri_submitted_at_idx" in plan
+
+
+def test_record_and_count_plays(db):
+    db.record_play(make_play())
+    db.record_play(make_play(played_at=1600000300))
+
+    assert db.get_plays_count() == 2
+    assert db.get_plays_count(only_unsubmitted=True) == 2
+
+    plays = db.load_plays()
+    db.mark_plays_submitted([plays[0].play_id])
+
+    assert db.get_plays_count() == 2
+    assert db.get_plays_count(only_unsubmitted=True) == 1
+
+
+def test_load_plays_keyset_pages_match_offset_pages(db):
+    for idx in range(7):
+        db.record_play(make_play(played_at=1600000000 + idx))
+
+    for sort_direction in db_lib.SortDirectionEnum:
+        first = db.load_plays(sort_direction=sort_direction, page_size=3)
+        second = db.load_plays(sort_direction=sort_direction, page_num=2, page_size=3)
+
+        after = db.load_plays(sort_direction=sort_direction, page_size=3, after=first[-1].play_id)
+        assert after == second
+        before = db.load_plays(sort_direction=sort_direction, page_size=3, before=second[0].play_id)
+        assert before == first
+
+
+def test_load_corrections_keyset_pages_are_ordered(db):
+    conn = db._connect()
+    for name in ("d", "b", "a", "c", "e"):
+        conn.execute(
+            "INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)",
+            (f"local:track:{name}.mp3", "Artist", "Title", "Album"),
+        )
+
+    first = db.load_corrections(page_size=2)
+    assert [c.track_uri for c in first] == ["local:track:a.mp3", "local:track:b.mp3"]
+
+    second = db.load_corrections(page_size=2, after=first[-1].track_uri)
+    assert second == db.load_corrections(page_num=2, page_size=2)
+    assert db.load_corrections(page_size=2, before=second[0].track_uri) == first
+
+
+def test_pages_match_separate_queries(db):
+    for idx in range(5):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    db.mark_plays_submitted([db.load_plays()[0].play_id])
+    db._connect().execute(
+        "INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)",
+        ("local:track:a.mp3", "Artist", "Title", "Album"),
+    )
+
+    page = db.load_plays_page(page_size=3, page_num=2)
+    assert page.plays == db.load_plays(page_size=3, page_num=2)
+    assert page.overall_count == 5
+    assert page.unsubmitted_count == 4
+
+    corrections_page = db.load_corrections_page()
+    assert corrections_page.corrections == db.load_corrections()
+    assert corrections_page.overall_count == 1
+    assert not db._connect().in_transaction
+
+
+def test_export_chunks_cover_filtered_history(db):
+    for idx in range(7):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    play_ids = [
+        play.play_id for play in db.load_plays(sort_direction=db_lib.SortDirectionEnum.SORT_ASC)
+    ]
+    db.mark_plays_submitted(play_ids[:3])
+
+    exported = []
+    after = None
+    while True:
+        chunk = db.export_plays_chunk(after=after, limit=2)
+        exported.extend(play.play_id for play in chunk)
+        if len(chunk) < 2:
+            break
+        after = chunk[-1].play_id
+    assert exported == play_ids
+
+    submitted = db.export_plays_chunk(submitted=True)
+    assert [play.play_id for play in submitted] == play_ids[:3]
+    unsubmitted = db.export_plays_chunk(submitted=False, played_from=1600000004)
+    assert [play.play_id for play in unsubmitted] == play_ids[4:]
+    ranged = db.export_plays_chunk(played_from=1600000001, played_to=1600000003)
+    assert [play.play_id for play in ranged] == play_ids[1:3]
+
+
+def test_counters_follow_plays_and_corrections(db):
+    for idx in range(3):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    plays = db.load_plays()
+    db.mark_plays_submitted([plays[0].play_id])
+    db.delete_play(plays[1].play_id)
+
+    assert db.get_plays_count() == 2
+    assert db.get_plays_count(only_unsubmitted=True) == 1
+
+    db.edit_play(
+        PlayEdit(
+            play_id=plays[2].play_id,
+            track_uri=plays[2].track_uri,
+            title="New Title",
+            artist="New Artist",
+            album="New Album",
+            save_correction=True,
+            update_all_unsubmitted=False,
+        )
+    )
+    assert db.get_corrections_count() == 1
+    db.delete_correction(plays[2].track_uri)
+    assert db.get_corrections_count() == 0
+
+
+def test_check_counters_repairs_drift(db):
+    from mopidy_advanced_scrobbler._commands.db.check_counters import check_counters
+
+    db.record_play(make_play())
+    conn = db._connect()
+    conn.execute("UPDATE counters SET value = 42 WHERE name = 'plays'")
+
+    assert check_counters(conn) == 1
+    assert db.get_plays_count() == 1
+    assert check_counters(conn) == 0
+
+
+def test_find_correction_is_cached(db):
+    assert db.find_correction("local:track:a.mp3") is None
+    assert db.find_correction("local:track:a.mp3") is None
+    assert db.get_correction_cache_stats() == {"size": 1, "maxsize": 16, "hits": 1, "misses": 1}
+
+
+def test_correction_writes_invalidate_cache(db):
+    db.record_play(make_play(corrected=Corrected.AUTO_CORRECTED))
+    play = db.load_plays()[0]
+    assert db.find_correction(play.track_uri) is None
+
+    db.approve_auto_correction(play.play_id)
+    assert db.find_correction(play.track_uri).title == "Title"
+
+    db.edit_correction(
+        CorrectionEdit(
+            track_uri=play.track_uri,
+            title="Edited",
+            artist="Artist",
+            album="Album",
+            update_all_unsubmitted=False,
+        )
+    )
+    assert db.find_correction(play.track_uri).title == "Edited"
+
+    db.delete_correction(play.track_uri)
+    assert db.find_correction(play.track_uri) is None
+
+
+def test_external_writes_clear_correction_cache(db, config, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(db_lib, "monotonic", lambda: now)
+
+    track_uri = "local:track:a.mp3"
+    assert db.find_correction(track_uri) is None
+
+    with db_lib.sqlite3.connect(db_lib.get_db_path(config)) as other:
+        other.execute(
+            "INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)",
+            (track_uri, "Artist", "External", "Album"),
+        )
+
+    # The data version was checked too recently to be checked again yet.
+    assert db.find_correction(track_uri) is None
+
+    now += db_lib.DATA_VERSION_CHECK_INTERVAL
+    assert db.find_correction(track_uri).title == "External"
+
+
+@pytest.fixture
+def services(config):
+    db_lib.db_service.start_service(config)
+    db_lib.db_reader_service.start_service(2, config)
+    yield db_lib.db_service.retrieve_service().get(), db_lib.db_reader_service.retrieve_service().get()
+    db_lib.db_reader_service.stop_service()
+    db_lib.db_service.stop_service()
+
+
+def test_reader_pool_sees_writes(services):
+    db, db_reader = services
+
+    db.record_play(make_play()).get()
+
+    assert db_reader.get_plays_count().get() == 1
+    plays = db_reader.load_plays().get()
+    assert db_reader.find_play(plays[0].play_id).get() == plays[0]
+    assert db_reader.load_plays_page().get().plays == plays
+
+
+def test_reader_connections_are_read_only(db, config):
+    reader = db_lib.AdvancedScrobblerDbReader(config)
+    conn = reader._connect()
+    try:
+        with pytest.raises(db_lib.sqlite3.OperationalError):
+            conn.execute("DELETE FROM plays")
+    finally:
+        reader.on_stop()
+
+
+def count_plays_externally(config) -> int:
+    with db_lib.sqlite3.connect(db_lib.get_db_path(config)) as other:
+        return other.execute("SELECT COUNT(*) FROM plays").fetchone()[0]
+
+
+def test_write_behind_flushes_when_full(db, config):
+    db._write_behind_size = 3
+
+    db.record_play(make_play(played_at=1600000000))
+    db.record_play(make_play(played_at=1600000001))
+    assert count_plays_externally(config) == 0
+
+    db.record_play(make_play(played_at=1600000002))
+    assert count_plays_externally(config) == 3
+    assert not db_lib.pending_plays.is_set()
+
+
+def test_write_behind_flushes_before_reads(db, config):
+    db._write_behind_size = 10
+
+    db.record_play(make_play())
+    assert db_lib.pending_plays.is_set()
+    assert count_plays_externally(config) == 0
+
+    assert db.get_plays_count() == 1
+    assert not db_lib.pending_plays.is_set()
+
+
+def test_write_behind_flushes_after_delay_and_for_readers(config):
+    config["advanced_scrobbler"]["write_behind_size"] = 10
+    config["advanced_scrobbler"]["write_behind_delay"] = 0.1
+    db_lib.db_service.start_service(config)
+    db_lib.db_reader_service.start_service(1, config)
+    try:
+        db = db_lib.db_service.retrieve_service().get()
+        db_reader = db_lib.db_reader_service.retrieve_service().get()
+
+        db.record_play(make_play()).get()
+        assert db_reader.get_plays_count().get() == 1
+
+        db.record_play(make_play()).get()
+        time.sleep(0.5)
+        assert count_plays_externally(config) == 2
+    finally:
+        db_lib.db_reader_service.stop_service()
+        db_lib.db_service.stop_service()
+
+
+def test_trusted_hydration_matches_validating_schemas(db):
+    db.record_play(make_play(corrected=Corrected.AUTO_CORRECTED, musicbrainz_id="mbid"))
+    db.record_play(make_play(submitted_at=None, album=""))
+    conn = db._connect()
+
+    query = f"SELECT {db_lib.play_columns} FROM plays ORDER BY play_id DESC"
+    rows = conn.execute(query).fetchall()
+    assert db.load_plays() == tuple(recorded_play_schema.load(rows, many=True))
+
+    conn.execute(
+        "INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)",
+        ("local:track:a.mp3", "Artist", "Title", ""),
+    )
+    row = conn.execute("SELECT * FROM corrections").fetchone()
+    assert db.find_correction("local:track:a.mp3") == correction_schema.load(row)
+
+
+def test_queries_are_instrumented(db):
+    before = db_lib.query_stats.snapshot()
+
+    for idx in range(3):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    plays = db.load_plays()
+    db.mark_plays_submitted([play.play_id for play in plays])
+
+    queries = db.get_query_stats()["queries"]
+
+    def delta(name, key):
+        return queries[name][key] - before.get(name, {}).get(key, 0)
+
+    assert delta("record_play", "count") == 3
+    assert delta("record_play", "rows_affected") == 3
+    assert delta("load_plays", "rows_returned") == 3
+    assert delta("mark_plays_submitted", "rows_affected") == 3
+    assert queries["load_plays"]["p50_ms"] <= queries["load_plays"]["max_ms"]
+
+
+def test_slow_queries_are_logged(db, caplog):
+    db._slow_query_threshold = 0.000001
+
+    db.get_plays_count()
+
+    assert "Slow Advanced-Scrobbler DB query get_plays_count" in caplog.text
+
+
+def test_bulk_operations_exceed_variable_limit(db):
+    # Comfortably past SQLITE_MAX_VARIABLE_NUMBER (999 before SQLite 3.32).
+    db._write_behind_size = 5000
+    for idx in range(1500):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    play_ids = [play.play_id for play in db.load_plays(page_size=1500)]
+
+    assert len(db.find_plays(play_ids)) == 1500
+
+    db.mark_plays_submitted(play_ids[:1200])
+    assert db.get_plays_count(only_unsubmitted=True) == 300
+    assert len(db.find_plays(play_ids, only_unsubmitted=True)) == 300
+
+    db.delete_plays(play_ids)
+    assert db.get_plays_count() == 1200
+
+
+def test_edit_plays_is_all_or_nothing(db):
+    for idx in range(3):
+        db.record_play(make_play(track_uri=f"local:track:{idx}.mp3", played_at=1600000000 + idx))
+    plays = db.load_plays()
+
+    def play_edit(play, title):
+        return PlayEdit(
+            play_id=play.play_id,
+            track_uri=play.track_uri,
+            title=title,
+            artist="Artist",
+            album="Album",
+            save_correction=False,
+            update_all_unsubmitted=False,
+        )
+
+    bad_edit = dataclasses.replace(play_edit(plays[2], "Nope"), track_uri="local:track:x.mp3")
+    with pytest.raises(db_lib.DbClientError):
+        db.edit_plays([play_edit(plays[0], "Edited"), bad_edit])
+    assert db.find_play(plays[0].play_id).title == "Title"
+
+    db.edit_plays([play_edit(play, "Edited") for play in plays])
+    assert {play.title for play in db.load_plays()} == {"Edited"}
+    assert {play.corrected for play in db.load_plays()} == {Corrected.MANUALLY_CORRECTED}
+
+
+def test_approve_auto_corrections(db):
+    for idx in range(3):
+        db.record_play(make_play(played_at=1600000000 + idx, corrected=Corrected.AUTO_CORRECTED))
+    db.record_play(make_play(track_uri="local:track:b.mp3", corrected=Corrected.AUTO_CORRECTED))
+    play_ids = [play.play_id for play in db.load_plays()]
+
+    db.approve_auto_corrections(play_ids)
+
+    assert db.get_corrections_count() == 2
+    assert {play.corrected for play in db.load_plays()} == {Corrected.MANUALLY_CORRECTED}
+    with pytest.raises(db_lib.DbClientError):
+        db.approve_auto_corrections(play_ids[:1])
+
+
+def test_archived_plays_stay_visible(db):
+    from mopidy_advanced_scrobbler._commands.db.archive import archive_plays
+    from mopidy_advanced_scrobbler._commands.db.check_counters import check_counters
+
+    for idx in range(7):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    db.record_play(make_play(played_at=1700000000))
+    expected = db.load_plays()
+    db.mark_plays_submitted([play.play_id for play in expected[1:]])
+    expected = db.load_plays()
+
+    conn = db._connect()
+    assert archive_plays(conn, 1650000000, batch_size=3) == 7
+    assert conn.execute("SELECT COUNT(*) AS count FROM plays").fetchone()["count"] == 1
+
+    assert db.load_plays() == expected
+    assert db.load_plays(page_size=3, after=expected[2].play_id) == expected[3:6]
+    assert db.find_play(expected[-1].play_id) == expected[-1]
+    assert db.find_plays([play.play_id for play in expected]) == expected[::-1]
+    assert db.get_plays_count() == 8
+    assert check_counters(conn) == 0
+
+    assert "plays_archive" in explain(db, f"SELECT * FROM {db_lib.all_plays} WHERE play_id < 5")
+
+
+def test_writes_change_the_change_token(db, config):
+    db.record_play(make_play())
+    token = db_lib.db_changes.token()
+
+    db.load_plays()
+    db.get_plays_count()
+    assert db_lib.db_changes.token() == token
+
+    value = db_lib.db_changes.value
+    db.mark_plays_submitted([db.load_plays()[0].play_id])
+    assert db_lib.db_changes.value == value + 1
+    assert db_lib.db_changes.token() != token
+
+    token = db_lib.db_changes.token()
+    with db_lib.sqlite3.connect(db_lib.get_db_path(config)) as other:
+        other.execute(
+            "INSERT INTO corrections (track_uri, artist, title, album) VALUES (?, ?, ?, ?)",
+            ("local:track:b.mp3", "Artist", "External", "Album"),
+        )
+    assert db_lib.db_changes.token() != token
+
+
+def test_search_plays(db):
+    from mopidy_advanced_scrobbler._commands.db.archive import archive_plays
+
+    for idx in range(4):
+        db.record_play(
+            make_play(artist="Daft Punk", title=f"Track {idx}", played_at=1600000000 + idx)
+        )
+    db.record_play(make_play(track_uri="local:track:b.mp3", artist="Björk", played_at=1600000010))
+    plays = db.load_plays(sort_direction=db_lib.SortDirectionEnum.SORT_ASC)
+    db.mark_plays_submitted([play.play_id for play in plays[:2]])
+    archive_plays(db._connect(), 1600000001, batch_size=10)
+
+    page = db.load_plays_page(search="daft")
+    assert {play.play_id for play in page.plays} == {play.play_id for play in plays[:4]}
+    assert page.matched_count == 4
+    assert page.overall_count == 5
+    assert len(page.ranks) == 4
+
+    assert [play.artist for play in db.load_plays_page(search="bjork").plays] == ["Björk"]
+    assert db.load_plays_page(search="punk track 3").plays == (plays[3],)
+    assert db.load_plays_page(search='AC/DC "live" OR').plays == ()
+
+    unsubmitted = db.load_plays_page(search="daft", submitted=False)
+    assert {play.play_id for play in unsubmitted.plays} == {plays[2].play_id, plays[3].play_id}
+    assert db.load_plays_page(search="daft", corrected=Corrected.MANUALLY_CORRECTED).plays == ()
+
+    first = db.load_plays_page(search="daft", page_size=3)
+    after = (first.ranks[-1], first.plays[-1].play_id)
+    second = db.load_plays_page(search="daft", page_size=3, after=after)
+    assert first.plays + second.plays == page.plays
+    before = (second.ranks[0], second.plays[0].play_id)
+    assert db.load_plays_page(search="daft", page_size=3, before=before).plays == first.plays
+
+    db.edit_play(
+        PlayEdit(
+            play_id=plays[2].play_id,
+            track_uri=plays[2].track_uri,
+            title="Renamed",
+            artist="Someone Else",
+            album="Album",
+            save_correction=False,
+            update_all_unsubmitted=False,
+        )
+    )
+    db.delete_play(plays[3].play_id)
+    assert {play.play_id for play in db.load_plays_page(search="daft").plays} == {
+        plays[0].play_id,
+        plays[1].play_id,
+    }
+    assert db.load_plays_page(search="someone").plays[0].play_id == plays[2].play_id
+
+
+def test_search_corrections(db):
+    for track_uri, artist in (("local:track:a.mp3", "Daft Punk"), ("local:track:b.mp3", "Björk")):
+        db.record_play(
+            make_play(track_uri=track_uri, artist=artist, corrected=Corrected.AUTO_CORRECTED)
+        )
+    for play in db.load_plays():
+        db.approve_auto_correction(play.play_id)
+
+    page = db.load_corrections_page(search="bjork")
+    assert [correction.artist for correction in page.corrections] == ["Björk"]
+    assert page.matched_count == 1
+    assert page.overall_count == 2
+
+    db.edit_correction(
+        CorrectionEdit(
+            track_uri="local:track:b.mp3",
+            title="Title",
+            artist="Sigur Rós",
+            album="Album",
+            update_all_unsubmitted=False,
+        )
+    )
+    assert db.load_corrections_page(search="bjork").corrections == ()
+    db.delete_correction("local:track:a.mp3")
+    assert db.load_corrections_page(search="daft").corrections == ()
+    assert db.load_corrections_page(search="local").matched_count == 1
+
+
+def test_failed_submissions_back_off_until_edited(db):
+    for idx in range(3):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    first, second, third = sorted(play.play_id for play in db.load_plays())
+
+    db.record_submission_failure([first], "Service Offline")
+    db.record_submission_failure([second], "Invalid parameters", rejected=True)
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [third]
+
+    failures = db._connect().execute(
+        "SELECT attempts, last_error, next_attempt_at IS NULL AS given_up FROM plays"
+        " WHERE play_id IN (?, ?) ORDER BY play_id",
+        (first, second),
+    )
+    assert [tuple(row.values()) for row in failures] == [
+        (1, "Service Offline", 0),
+        (1, "Invalid parameters", 1),
+    ]
+
+    db.edit_play(
+        PlayEdit(
+            play_id=second,
+            track_uri="local:track:a.mp3",
+            title="Fixed",
+            artist="Artist",
+            album="Album",
+            save_correction=False,
+            update_all_unsubmitted=False,
+        )
+    )
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [second, third]
+
+
+def test_failed_submissions_are_retried_until_reset(db, monkeypatch):
+    monkeypatch.setattr(db_lib, "RETRY_BASE_DELAY", 0)
+    db.record_play(make_play())
+    db.record_play(make_play())
+    offline, rejected = sorted(play.play_id for play in db.load_plays())
+
+    # Connection problems never use up a play's chances, however long they last.
+    for _ in range(100):
+        db.record_submission_failure([offline], "Connection refused")
+    db.record_submission_failure([rejected], "Invalid parameters", rejected=True)
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [offline]
+
+    failures = {failure.play_id: failure for failure in db.load_plays_page().failures}
+    assert failures[offline].attempts == 100
+    assert failures[offline].next_attempt_at is not None
+    assert failures[rejected].last_error == "Invalid parameters"
+    assert failures[rejected].next_attempt_at is None
+
+    db.reset_submission_failures([rejected])
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [offline, rejected]
+    assert [failure.play_id for failure in db.load_plays_page().failures] == [offline]
+
+    # Plays held in flight are reported and reset too, even before any attempt has failed.
+    db.begin_submission([offline, rejected])
+    failures = db.load_plays_page().failures
+    assert [(failure.play_id, failure.in_flight) for failure in failures] == [
+        (offline, True),
+        (rejected, True),
+    ]
+    assert failures[0].next_attempt_at is None
+    assert db.load_unsubmitted_plays_batch() == ()
+
+    db.reset_submission_failures([offline, rejected])
+    assert db.find_in_flight_play_ids() == ()
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [offline, rejected]
+
+
+def test_interrupted_plays_are_listed_until_released(db):
+    db.record_play(make_play())
+    db.record_play(make_play())
+    held, other = sorted(play.play_id for play in db.load_plays())
+
+    db.begin_submission([held])
+    assert db.load_plays_page().in_flight == (held,)
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [other]
+
+    db.abandon_submission([held])
+    assert db.load_plays_page().in_flight == ()
+    assert [play.play_id for play in db.load_unsubmitted_plays_batch()] == [held, other]
+
+
+def test_old_plays_are_archived_in_batches(db, monkeypatch):
+    monkeypatch.setattr(db_lib, "ARCHIVE_BATCH_SIZE", 2)
+    monkeypatch.setattr(db, "_proxy", mock.Mock())
+    monkeypatch.setattr(db, "_schedule_archive", mock.Mock())
+    db._archive_after = 30
+    for idx in range(3):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    db.record_play(make_play(played_at=int(time.time())))
+    db.mark_plays_submitted([play.play_id for play in db.load_plays()])
+
+    # A full batch queues the next one straight away, rather than waiting for the timer.
+    assert db.archive_old_plays() == 2
+    db._proxy.archive_old_plays.assert_called_once_with()
+    db._schedule_archive.assert_not_called()
+
+    assert db.archive_old_plays() == 1
+    db._schedule_archive.assert_called_once_with(db_lib.ARCHIVE_INTERVAL)
+    count = db._connect().execute("SELECT COUNT(*) AS count FROM plays").fetchone()["count"]
+    assert count == 1
+    assert db.get_plays_count() == 4
@@ -1,9 +1,12 @@
 from unittest import mock
 
 import pytest
+from mopidy.models import Album, Artist, TlTrack, Track
 
 from mopidy_advanced_scrobbler import frontend as frontend_lib
 from mopidy_advanced_scrobbler._service import Service
+from mopidy_advanced_scrobbler.models import Correction
+from mopidy_advanced_scrobbler.push import PlaybackBroadcaster
 
 from ._utils import path_to_data_dir
 
@@ -14,12 +17,30 @@ def db_mock():
         yield m
 
 
+@pytest.fixture
+def db_reader_mock():
+    with mock.patch("mopidy_advanced_scrobbler.frontend.db_reader_service", spec=Service) as m:
+        yield m
+
+
 @pytest.fixture
 def network_mock():
     with mock.patch("mopidy_advanced_scrobbler.frontend.network_service", spec=Service) as m:
         yield m
 
 
+@pytest.fixture
+def jobs_mock():
+    with mock.patch("mopidy_advanced_scrobbler.frontend.jobs_service", spec=Service) as m:
+        yield m
+
+
+@pytest.fixture
+def submitter_mock():
+    with mock.patch("mopidy_advanced_scrobbler.frontend.submitter_service", spec=Service) as m:
+        yield m
+
+
 @pytest.fixture
 def frontend():
     core_config = {"data_dir": path_to_data_dir("")}
@@ -28,6 +49,8 @@ def frontend():
         "api_secret": "api_secret",
         "username": "djmattyg007",
         "password": "secret_password",
+        "db_reader_pool_size": 2,
+        "auto_scrobble": False,
     }
 
     config = {"core": core_config, "advanced_scrobbler": ext_config}
@@ -35,8 +58,68 @@ def frontend():
     return frontend_lib.AdvancedScrobblerFrontend(config, core)
 
 
-def test_on_start_starts_services(frontend, db_mock, network_mock):
+def test_on_start_starts_services(
+    frontend, db_mock, db_reader_mock, network_mock, jobs_mock, submitter_mock
+):
     frontend.on_start()
 
     db_mock.start_service.assert_called_once()
+    db_reader_mock.start_service.assert_called_once()
     network_mock.start_service.assert_called_once()
+    jobs_mock.start_service.assert_called_once()
+    submitter_mock.start_service.assert_not_called()
+
+
+def test_on_start_starts_submitter_when_enabled(
+    frontend, db_mock, db_reader_mock, network_mock, jobs_mock, submitter_mock
+):
+    frontend.config["auto_scrobble"] = True
+    frontend.on_start()
+
+    submitter_mock.start_service.assert_called_once_with(frontend.config)
+
+
+def make_tl_track(uri: str) -> TlTrack:
+    track = Track(
+        uri=uri,
+        name="Title",
+        artists=[Artist(name="Artist")],
+        album=Album(name="Album"),
+        length=200000,
+    )
+    return TlTrack(tlid=1, track=track)
+
+
+def test_track_start_is_published_without_waiting_for_database(
+    frontend, db_mock, network_mock, monkeypatch
+):
+    broadcaster = PlaybackBroadcaster()
+    monkeypatch.setattr(frontend_lib, "playback_broadcaster", broadcaster)
+    frontend.config["ignored_uri_schemes"] = ["stream"]
+    db = db_mock.retrieve_service.return_value.get.return_value
+    db.find_correction.return_value.get.return_value = Correction(
+        track_uri="local:track:a.mp3", title="Fixed", artist="Artist", album="Album"
+    )
+
+    frontend.track_playback_started(make_tl_track("stream:radio"))
+    assert broadcaster._playing["trackUri"] == "stream:radio"
+    db_mock.retrieve_service.assert_not_called()
+
+    with mock.patch.object(frontend_lib.DebounceActor, "start") as debounce:
+        frontend.track_playback_started(make_tl_track("local:track:a.mp3"))
+    assert broadcaster._playing["title"] == "Title"
+    db_mock.retrieve_service.assert_not_called()
+
+    # The correction is published along with the now playing notification.
+    frontend.debounced_now_playing_notify(debounce.call_args.args[3])
+    assert broadcaster._playing["title"] == "Fixed"
+
+    # Unless another track started playing in the meantime.
+    frontend.track_playback_started(make_tl_track("stream:radio"))
+    frontend.debounced_now_playing_notify(debounce.call_args.args[3])
+    assert broadcaster._playing["title"] == "Title"
+
+    # Once playback stops, clients are told nothing is playing.
+    frontend.playback_state_changed("playing", "stopped")
+    assert broadcaster._state == "stopped"
+    assert broadcaster._playing["trackUri"] == ""
@@ -0,0 +1,250 @@
+import sqlite3
+import time
+from unittest import mock
+
+import pykka
+import pytest
+
+from mopidy_advanced_scrobbler import db as db_lib
+from mopidy_advanced_scrobbler import jobs as jobs_lib
+from mopidy_advanced_scrobbler import submitter as submitter_lib
+from mopidy_advanced_scrobbler._service import Service
+from mopidy_advanced_scrobbler.models import Corrected
+from mopidy_advanced_scrobbler.network import (
+    IgnoredScrobble,
+    NetworkException,
+    ScrobbleOutcomeUnknown,
+    ScrobbleRejected,
+    ScrobbleResults,
+)
+
+from ._utils import make_play
+
+
+def resolved(value) -> pykka.ThreadingFuture:
+    future = pykka.ThreadingFuture()
+    future.set(value)
+    return future
+
+
+def accept_all(plays) -> pykka.ThreadingFuture:
+    return resolved(ScrobbleResults(accepted=tuple(play.play_id for play in plays)))
+
+
+@pytest.fixture
+def network():
+    network = mock.Mock()
+    network.submit_scrobbles.side_effect = accept_all
+
+    with mock.patch("mopidy_advanced_scrobbler.jobs.network_service", spec=Service) as m:
+        m.retrieve_service.return_value = resolved(network)
+        yield network
+
+
+@pytest.fixture
+def jobs(config, network, monkeypatch):
+    monkeypatch.setattr(jobs_lib, "BATCH_DELAY", 0.01)
+
+    db_lib.db_service.start_service(config)
+    db_lib.db_reader_service.start_service(1, config)
+    jobs_lib.jobs_service.start_service(config)
+    yield jobs_lib.jobs_service.retrieve_service().get()
+    jobs_lib.jobs_service.stop_service()
+    db_lib.db_reader_service.stop_service()
+    db_lib.db_service.stop_service()
+
+
+def record_plays(count: int):
+    db = db_lib.db_service.retrieve_service().get()
+    for idx in range(count):
+        db.record_play(make_play(played_at=1600000000 + idx))
+    return [play.play_id for play in db.load_plays(page_size=count).get()]
+
+
+def wait_for_job(jobs, job_id: str) -> jobs_lib.ScrobbleJob:
+    for _ in range(100):
+        job = jobs.get_job(job_id).get()
+        if not job.active:
+            return job
+        time.sleep(0.05)
+    raise AssertionError("Job did not finish")
+
+
+def test_unsubmitted_job_drains_backlog_in_batches(jobs, network):
+    record_plays(120)
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+
+    assert job.status == jobs_lib.JobStatusEnum.FINISHED
+    assert (job.found_plays, job.scrobbled_plays, job.marked_plays) == (120, 120, 120)
+    assert [len(call.args[0]) for call in network.submit_scrobbles.call_args_list] == [50, 50, 20]
+
+
+def test_plays_job_skips_submitted_plays(jobs, network):
+    play_ids = record_plays(60)
+    db_lib.db_service.retrieve_service().get().mark_plays_submitted(play_ids[:10]).get()
+
+    job = wait_for_job(jobs, jobs.enqueue_plays(play_ids).get())
+
+    assert job.status == jobs_lib.JobStatusEnum.FINISHED
+    assert job.scrobbled_plays == 50
+
+
+def test_failed_batch_stops_job(jobs, network):
+    record_plays(10)
+    failure = pykka.ThreadingFuture()
+    failure.set_exception(exc_info=(NetworkException, NetworkException("boom"), None))
+    network.submit_scrobbles.side_effect = lambda plays: failure
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+
+    assert job.status == jobs_lib.JobStatusEnum.FAILED
+    assert job.message == "Network error while scrobbling plays."
+    assert job.found_plays == 10
+    assert job.marked_plays == 0
+
+
+def test_cancelled_job_stops_between_batches(jobs, network, monkeypatch):
+    monkeypatch.setattr(jobs_lib, "BATCH_DELAY", 10)
+    record_plays(120)
+
+    job_id = jobs.enqueue_unsubmitted().get()
+    assert jobs.cancel_job(job_id).get() is True
+
+    job = wait_for_job(jobs, job_id)
+    assert job.status == jobs_lib.JobStatusEnum.CANCELLED
+    assert job.scrobbled_plays < 120
+    assert jobs.cancel_job(job_id).get() is False
+
+
+def test_uncertain_batch_is_never_swept_again(jobs, network):
+    play_ids = record_plays(10)
+    failure = pykka.ThreadingFuture()
+    failure.set_exception(exc_info=(ScrobbleOutcomeUnknown, ScrobbleOutcomeUnknown("boom"), None))
+    network.submit_scrobbles.side_effect = lambda plays: failure
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.status == jobs_lib.JobStatusEnum.FAILED
+
+    db = db_lib.db_service.retrieve_service().get()
+    assert db.find_in_flight_play_ids().get() == tuple(sorted(play_ids))
+
+    network.submit_scrobbles.side_effect = accept_all
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.status == jobs_lib.JobStatusEnum.FINISHED
+    assert job.found_plays == 0
+
+    # Choosing the plays explicitly still scrobbles them, which clears the checkpoint.
+    job = wait_for_job(jobs, jobs.enqueue_plays(play_ids).get())
+    assert job.marked_plays == 10
+    assert db.find_in_flight_play_ids().get() == ()
+
+
+def test_failed_batch_backs_off_before_retrying(jobs, network, config, monkeypatch):
+    play_ids = record_plays(10)
+    failure = pykka.ThreadingFuture()
+    failure.set_exception(exc_info=(NetworkException, NetworkException("boom"), None))
+    network.submit_scrobbles.side_effect = lambda plays: failure
+    wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+
+    db = db_lib.db_service.retrieve_service().get()
+    assert db.find_in_flight_play_ids().get() == ()
+    with sqlite3.connect(db_lib.get_db_path(config)) as conn:
+        attempts, last_error, next_attempt_at = conn.execute(
+            "SELECT attempts, last_error, next_attempt_at FROM plays WHERE play_id = ?",
+            (play_ids[0],),
+        ).fetchone()
+    assert (attempts, last_error) == (1, "boom")
+    assert next_attempt_at >= db_lib.time() + db_lib.RETRY_BASE_DELAY - 1
+
+    network.submit_scrobbles.side_effect = accept_all
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.found_plays == 0
+
+    monkeypatch.setattr(db_lib, "RETRY_BASE_DELAY", 0)
+    network.submit_scrobbles.side_effect = lambda plays: failure
+    wait_for_job(jobs, jobs.enqueue_plays(play_ids).get())
+    network.submit_scrobbles.side_effect = accept_all
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.marked_plays == 10
+
+
+def test_rejected_plays_are_not_retried(jobs, network, monkeypatch):
+    monkeypatch.setattr(db_lib, "RETRY_BASE_DELAY", 0)
+    record_plays(10)
+    failure = pykka.ThreadingFuture()
+    failure.set_exception(exc_info=(ScrobbleRejected, ScrobbleRejected("invalid"), None))
+    network.submit_scrobbles.side_effect = lambda plays: failure
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.message == "Last.fm rejected these plays. They will not be retried."
+
+    network.submit_scrobbles.side_effect = accept_all
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert job.found_plays == 0
+
+
+def test_auto_corrected_plays_can_be_held(jobs, network):
+    db = db_lib.db_service.retrieve_service().get()
+    db.record_play(make_play(corrected=Corrected.AUTO_CORRECTED))
+    record_plays(3)
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted(hold_auto_corrected=True).get())
+    assert job.marked_plays == 3
+    assert db.get_plays_count(only_unsubmitted=True).get() == 1
+
+
+def test_submitter_queues_unsubmitted_job(jobs, network, config, monkeypatch):
+    monkeypatch.setattr(submitter_lib, "WAKE_DELAY", 0.01)
+    config["advanced_scrobbler"]["auto_scrobble_interval"] = 60
+    config["advanced_scrobbler"]["auto_scrobble_hold_auto_corrected"] = False
+    record_plays(5)
+
+    submitter_lib.submitter_service.start_service(config["advanced_scrobbler"])
+    try:
+        db = db_lib.db_service.retrieve_service().get()
+        for _ in range(100):
+            if not db.get_plays_count(only_unsubmitted=True).get():
+                break
+            time.sleep(0.05)
+        else:
+            raise AssertionError("Plays were not scrobbled automatically")
+    finally:
+        submitter_lib.submitter_service.stop_service()
+
+
+def test_only_accepted_plays_are_marked(jobs, network, config):
+    play_ids = sorted(record_plays(4))
+    filtered = IgnoredScrobble(play_id=play_ids[0], code=1, message="Artist was ignored")
+    over_limit = IgnoredScrobble(play_id=play_ids[1], code=5, message="Daily limit exceeded")
+    network.submit_scrobbles.side_effect = lambda plays: resolved(
+        ScrobbleResults(accepted=tuple(play_ids[2:]), ignored=(filtered, over_limit))
+    )
+
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert (job.scrobbled_plays, job.ignored_plays, job.marked_plays) == (2, 2, 2)
+
+    # Once its backoff has passed, only the play ignored for the daily limit is tried again.
+    with sqlite3.connect(db_lib.get_db_path(config)) as conn:
+        conn.execute("UPDATE plays SET next_attempt_at = 0 WHERE next_attempt_at IS NOT NULL")
+    network.submit_scrobbles.side_effect = accept_all
+    job = wait_for_job(jobs, jobs.enqueue_unsubmitted().get())
+    assert [play.play_id for play in network.submit_scrobbles.call_args.args[0]] == [play_ids[1]]
+    assert job.marked_plays == 1
+
+
+def test_single_play_is_scrobbled_like_a_batch(jobs, network):
+    play_ids = sorted(record_plays(2))
+    db = db_lib.db_service.retrieve_service().get()
+
+    job = jobs.scrobble_play(play_ids[0]).get()
+    assert (job.status, job.marked_plays) == (jobs_lib.JobStatusEnum.FINISHED, 1)
+    assert jobs.scrobble_play(play_ids[0]).get().found_plays == 0
+
+    failure = pykka.ThreadingFuture()
+    failure.set_exception(exc_info=(ScrobbleOutcomeUnknown, ScrobbleOutcomeUnknown("boom"), None))
+    network.submit_scrobbles.side_effect = lambda plays: failure
+    job = jobs.scrobble_play(play_ids[1]).get()
+    assert job.status == jobs_lib.JobStatusEnum.FAILED
+    assert job.message == "Last.fm may have received these plays. Check before resubmitting."
+    assert db.find_in_flight_play_ids().get() == (play_ids[1],)
@@ -0,0 +1,51 @@
+from mopidy_advanced_scrobbler._metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    plays = registry.counter("plays_total", "Plays.")
+    skipped = registry.counter("skipped_total", "Skipped plays.", ("reason",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("handler",), buckets=(0.1, 1.0))
+
+    plays.inc()
+    plays.inc(2)
+    skipped.labels('too "short"').inc()
+    latency.labels("Api").observe(0.05)
+    latency.labels("Api").observe(0.5)
+    latency.labels("Api").observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP mopidy_advanced_scrobbler_plays_total Plays.",
+        "# TYPE mopidy_advanced_scrobbler_plays_total counter",
+        "mopidy_advanced_scrobbler_plays_total 3",
+        "# HELP mopidy_advanced_scrobbler_skipped_total Skipped plays.",
+        "# TYPE mopidy_advanced_scrobbler_skipped_total counter",
+        'mopidy_advanced_scrobbler_skipped_total{reason="too \\"short\\""} 1',
+        "# HELP mopidy_advanced_scrobbler_latency_seconds Latency.",
+        "# TYPE mopidy_advanced_scrobbler_latency_seconds histogram",
+        'mopidy_advanced_scrobbler_latency_seconds_bucket{handler="Api",le="0.1"} 1',
+        'mopidy_advanced_scrobbler_latency_seconds_bucket{handler="Api",le="1.0"} 2',
+        'mopidy_advanced_scrobbler_latency_seconds_bucket{handler="Api",le="+Inf"} 3',
+        'mopidy_advanced_scrobbler_latency_seconds_sum{handler="Api"} 5.55',
+        'mopidy_advanced_scrobbler_latency_seconds_count{handler="Api"} 3',
+    ]
+
+
+def test_labels_must_match():
+    registry = MetricsRegistry()
+    counter = registry.counter("things_total", "Things.", ("kind",))
+    try:
+        counter.labels()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected a ValueError")
+
+
+def test_gauge_is_read_when_rendered():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("tokens", "Tokens.")
+    assert registry.render() == "\n"
+
+    gauge.set_function(lambda: 2.5)
+    assert registry.render().splitlines()[-1] == "mopidy_advanced_scrobbler_tokens 2.5"
@@ -0,0 +1,141 @@
+import dataclasses
+
+import pylast
+import pytest
+
+from mopidy_advanced_scrobbler import network as network_lib
+from mopidy_advanced_scrobbler._transport import ConnectError, Transport
+from mopidy_advanced_scrobbler.models import RecordedPlay
+
+from ._utils import make_play
+
+
+OK_RESPONSE = '<?xml version="1.0" encoding="utf-8"?>\n<lfm status="ok"></lfm>\n'
+
+
+class FakeTransport(Transport):
+    """Answers requests from a list of responses, which may be exceptions to raise."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+
+    def post(self, path, params):
+        self.requests.append(params)
+        response = self.responses.pop(0) if self.responses else OK_RESPONSE
+        if isinstance(response, Exception):
+            raise response
+        elif isinstance(response, tuple):
+            return response
+        return 200, response.encode("utf-8")
+
+
+def error_response(code: str, message: str) -> str:
+    return f'<lfm status="failed"><error code="{code}">{message}</error></lfm>'
+
+
+@pytest.fixture
+def transport():
+    return FakeTransport()
+
+
+@pytest.fixture
+def network(transport):
+    config = {"api_rate_limit": 0.1, "api_rate_burst": 1}
+    actor = network_lib.AdvancedScrobblerNetwork(config, transport=transport)
+    actor._network = pylast.LastFMNetwork(api_key="key", api_secret="secret", session_key="sk")
+    return actor
+
+
+def test_now_playing_is_dropped_when_rate_limited(network, transport):
+    network.send_now_playing_notification(make_play())
+    network.send_now_playing_notification(make_play())
+
+    assert len(transport.requests) == 1
+    assert transport.requests[0]["method"] == "track.updateNowPlaying"
+    assert "api_sig" in transport.requests[0]
+
+
+def test_may_have_been_accepted():
+    api_error = pylast.WSError(None, "11", "Service Offline")
+    server_error = pylast.WSError(None, 502, "Bad gateway")
+    refused = pylast.NetworkError(None, ConnectionRefusedError())
+    timed_out = pylast.NetworkError(None, TimeoutError())
+
+    assert network_lib.may_have_been_accepted(api_error) is False
+    assert network_lib.may_have_been_accepted(refused) is False
+    assert network_lib.may_have_been_accepted(server_error) is True
+    assert network_lib.may_have_been_accepted(timed_out) is True
+
+
+def make_recorded_play(play_id: int, **kwargs) -> RecordedPlay:
+    return RecordedPlay(**dataclasses.asdict(make_play(**kwargs)), play_id=play_id)
+
+
+SCROBBLE_RESPONSE = """<?xml version="1.0" encoding="utf-8"?>
+<lfm status="ok">
+  <scrobbles accepted="1" ignored="1">
+    <scrobble>
+      <track corrected="0">Title</track>
+      <artist corrected="0">Artist</artist>
+      <timestamp>1600000000</timestamp>
+      <ignoredMessage code="0"></ignoredMessage>
+    </scrobble>
+    <scrobble>
+      <track corrected="0">Title</track>
+      <artist corrected="0">Artist</artist>
+      <timestamp>1000000000</timestamp>
+      <ignoredMessage code="3">Timestamp was too old</ignoredMessage>
+    </scrobble>
+  </scrobbles>
+</lfm>
+"""
+
+
+def test_scrobble_results_are_parsed_per_play(network, transport):
+    transport.responses.append(SCROBBLE_RESPONSE)
+
+    results = network.submit_scrobbles(
+        [make_recorded_play(7), make_recorded_play(8, played_at=1000000000, album="")]
+    )
+
+    assert results.accepted == (7,)
+    assert results.ignored == (
+        network_lib.IgnoredScrobble(play_id=8, code=3, message="Timestamp was too old"),
+    )
+    assert results.ignored[0].retryable is False
+
+    params = transport.requests[0]
+    assert params["method"] == "track.scrobble"
+    assert params["timestamp[1]"] == "1000000000"
+    assert "album[1]" not in params
+
+
+def test_transient_errors_are_retried(network, transport, monkeypatch):
+    monkeypatch.setattr(network_lib, "RETRY_BASE_DELAY", 0)
+    network._limiter = network_lib.TokenBucket(100, 10)
+    transport.responses = [
+        error_response("29", "Rate Limit Exceeded"),
+        ConnectError("Connection refused"),
+        SCROBBLE_RESPONSE,
+    ]
+    network.submit_scrobbles([])
+    assert len(transport.requests) == 3
+
+    transport.requests.clear()
+    transport.responses = [TimeoutError()]
+    with pytest.raises(network_lib.ScrobbleOutcomeUnknown):
+        network.submit_scrobbles([])
+    assert len(transport.requests) == 1
+
+    transport.requests.clear()
+    transport.responses = [(502, b"Bad gateway")]
+    with pytest.raises(network_lib.ScrobbleOutcomeUnknown):
+        network.submit_scrobbles([])
+    assert len(transport.requests) == 1
+
+    transport.requests.clear()
+    transport.responses = [error_response("6", "Invalid parameters")]
+    with pytest.raises(network_lib.ScrobbleRejected):
+        network.submit_scrobbles([])
+    assert len(transport.requests) == 1
@@ -0,0 +1,36 @@
+from mopidy_advanced_scrobbler._ratelimit import TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def test_bucket_allows_bursts_then_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(2, 3, clock=clock, sleep=clock.sleep)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+    clock.now += 0.5
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+
+    clock.now += 60
+    assert bucket.available() == 3
+
+
+def test_acquire_waits_for_a_token():
+    clock = FakeClock()
+    bucket = TokenBucket(4, 1, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.25
+    assert clock.now == 100.25
+    assert bucket.try_acquire() is False
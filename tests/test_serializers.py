@@ -0,0 +1,67 @@
+import dataclasses
+
+import pytest
+import tornado.escape
+from marshmallow import fields
+
+from mopidy_advanced_scrobbler import _serializers
+from mopidy_advanced_scrobbler.models import Corrected, Correction, RecordedPlay
+from mopidy_advanced_scrobbler.serial import CorrectionSchema, RecordedPlaySchema
+
+from ._utils import make_play
+
+
+class RenamedCorrectionSchema(CorrectionSchema):
+    track_uri = fields.Str(data_key="trackUri")
+    note = fields.Function(lambda obj: obj.title.upper())
+
+
+def make_recorded_play(**kwargs) -> RecordedPlay:
+    return RecordedPlay(**dataclasses.asdict(make_play(**kwargs)), play_id=7)
+
+
+def test_compiled_dumper_matches_schema_byte_for_byte():
+    plays = [
+        make_recorded_play(),
+        make_recorded_play(
+            title="Über </script>", corrected=Corrected.AUTO_CORRECTED, submitted_at=1600000100
+        ),
+        make_recorded_play(musicbrainz_id="0a1b2c", corrected=Corrected.MANUALLY_CORRECTED),
+    ]
+    schema = RecordedPlaySchema()
+    dump = _serializers.compile_dumper(schema)
+    for play in plays:
+        assert list(dump(play).items()) == list(schema.dump(play).items())
+        assert tornado.escape.json_encode(dump(play)) == tornado.escape.json_encode(
+            schema.dump(play)
+        )
+
+    correction = Correction(track_uri="local:track:a.mp3", title="Title", artist="A", album="")
+    schema = RenamedCorrectionSchema()
+    dump = _serializers.compile_dumper(schema)
+    assert list(dump(correction).items()) == list(schema.dump(correction).items())
+    assert dump(correction)["note"] == "TITLE"
+
+
+def test_json_encode_is_byte_identical_by_default():
+    value = {"title": "</script>", "artist": "Björk"}
+    assert _serializers.json_encode(value) == tornado.escape.json_encode(value)
+
+
+def test_json_encode_without_orjson(monkeypatch):
+    monkeypatch.setattr(_serializers, "orjson", None)
+    assert _serializers.enable_orjson(True) is False
+
+    value = {"title": "</script>", "artist": "Björk"}
+    assert _serializers.json_encode(value) == tornado.escape.json_encode(value)
+
+
+@pytest.mark.skipif(_serializers.orjson is None, reason="orjson is not installed")
+def test_json_encode_with_orjson(monkeypatch):
+    monkeypatch.setattr(_serializers, "_use_orjson", False)
+    assert _serializers.enable_orjson(True) is True
+
+    value = {"title": "</script>", "artist": "Björk"}
+    encoded = _serializers.json_encode(value)
+    assert b"</" not in encoded
+    assert tornado.escape.json_decode(encoded) == value
@@ -0,0 +1,106 @@
+import http.client
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from mopidy_advanced_scrobbler import _transport as transport_lib
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers["Content-Length"])
+        params = parse_qs(self.rfile.read(length).decode("ascii"))
+        self.server.requests.append((self.client_address, params))
+        if self.server.drop_before_response:
+            self.close_connection = True
+            return
+
+        body = b"<lfm status='ok'></lfm>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Drop the connection without warning, like a server timing out an idle client.
+        self.close_connection = self.server.drop_connections
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.requests = []
+        self.drop_connections = False
+        self.drop_before_response = False
+        self.closed_connections = threading.Semaphore(0)
+
+    def shutdown_request(self, request):
+        super().shutdown_request(request)
+        self.closed_connections.release()
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def transport(server):
+    host, port = server.server_address
+    transport = transport_lib.KeepAliveTransport(
+        host,
+        port=port,
+        connect_timeout=1,
+        read_timeout=1,
+        connection_class=http.client.HTTPConnection,
+    )
+    yield transport
+    transport.close()
+
+
+def test_connection_is_reused(server, transport):
+    for idx in range(3):
+        assert transport.post("/2.0/", {"n": str(idx)}) == (200, b"<lfm status='ok'></lfm>")
+
+    assert [params["n"] for _, params in server.requests] == [["0"], ["1"], ["2"]]
+    assert len({client for client, _ in server.requests}) == 1
+
+
+def test_closed_connection_is_reopened(server, transport):
+    server.drop_connections = True
+
+    for idx in range(3):
+        assert transport.post("/2.0/", {"n": str(idx)})[0] == 200
+        assert server.closed_connections.acquire(timeout=1)
+
+    assert len(server.requests) == 3
+    assert len({client for client, _ in server.requests}) == 3
+
+
+def test_request_is_not_resent_once_written(server, transport):
+    transport.post("/2.0/", {"n": "0"})
+    server.drop_before_response = True
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        transport.post("/2.0/", {"n": "1"})
+    assert len(server.requests) == 2
+
+
+def test_connect_failure(server, transport):
+    server.shutdown()
+    server.server_close()
+
+    with pytest.raises(transport_lib.ConnectError):
+        transport.post("/2.0/", {})
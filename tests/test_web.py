@@ -0,0 +1,370 @@
+import asyncio
+import csv
+import dataclasses
+import gzip
+import io
+import json
+import threading
+from unittest import mock
+
+import pykka
+import pytest
+import tornado.web
+import tornado.websocket
+
+from mopidy_advanced_scrobbler import push as push_lib
+from mopidy_advanced_scrobbler import web as web_lib
+from mopidy_advanced_scrobbler._changes import ChangeSequence
+from mopidy_advanced_scrobbler._futures import resolve
+from mopidy_advanced_scrobbler._service import Service
+from mopidy_advanced_scrobbler.jobs import JobStatusEnum, ScrobbleJob
+from mopidy_advanced_scrobbler.models import CorrectionsPage, PlaysPage, RecordedPlay
+
+from ._utils import make_play
+
+
+def resolved(value) -> pykka.ThreadingFuture:
+    future = pykka.ThreadingFuture()
+    future.set(value)
+    return future
+
+
+@pytest.fixture
+def db_reader():
+    reader = mock.Mock()
+    reader.load_corrections_page.return_value = resolved(CorrectionsPage((), 0))
+
+    with mock.patch("mopidy_advanced_scrobbler.web.db_reader_service", spec=Service) as m:
+        m.retrieve_service.return_value = resolved(reader)
+        yield reader
+
+
+def make_app() -> tornado.web.Application:
+    api_args = {"allowed_origins": set(), "csrf_protection": False}
+    return tornado.web.Application(
+        [
+            (r"/api/plays/load", web_lib.ApiPlayLoad, api_args),
+            (r"/api/corrections/load", web_lib.ApiCorrectionLoad, api_args),
+            (r"/api/metrics", web_lib.ApiMetrics, api_args),
+        ]
+    )
+
+
+def test_requests_are_served_while_another_is_in_flight(db_reader, serve_app):
+    in_flight = pykka.ThreadingFuture()
+    db_reader.load_plays_page.return_value = in_flight
+
+    async def run():
+        async with serve_app(make_app()) as (base_url, client):
+            slow = asyncio.ensure_future(client.fetch(f"{base_url}/api/plays/load"))
+            await asyncio.sleep(0.1)
+
+            fast = await asyncio.wait_for(
+                client.fetch(f"{base_url}/api/corrections/load"), timeout=5
+            )
+            assert json.loads(fast.body)["success"] is True
+            assert not slow.done()
+
+            in_flight.set(PlaysPage((), 0, 0))
+            response = await asyncio.wait_for(slow, timeout=5)
+            assert json.loads(response.body)["plays"] == []
+
+    asyncio.run(run())
+
+
+def test_unanswered_actor_calls_time_out():
+    with pytest.raises(pykka.Timeout):
+        asyncio.run(resolve(pykka.ThreadingFuture(), timeout=0.1))
+
+
+def test_service_can_be_waited_for_without_timeout():
+    service = Service(pykka.ThreadingActor)
+    timer = threading.Timer(0.1, service.start_service)
+    timer.start()
+    try:
+        assert service.retrieve_service().get(timeout=None).actor_ref.is_alive()
+    finally:
+        timer.join()
+        service.stop_service()
+
+
+def test_listings_answer_conditional_requests_without_querying(db_reader, monkeypatch, serve_app):
+    changes = ChangeSequence()
+    monkeypatch.setattr(web_lib, "db_changes", changes)
+    db_reader.load_plays_page.return_value = resolved(PlaysPage((), 0, 0))
+
+    async def run():
+        async with serve_app(make_app()) as (base_url, client):
+            url = f"{base_url}/api/plays/load?page_size=20"
+            first = await client.fetch(url)
+            etag = first.headers["Etag"]
+            assert db_reader.load_plays_page.call_count == 1
+
+            cached = await client.fetch(url, headers={"If-None-Match": etag}, raise_error=False)
+            assert cached.code == 304
+            assert cached.headers["Etag"] == etag
+            assert db_reader.load_plays_page.call_count == 1
+
+            other_page = await client.fetch(
+                url + "&page=2", headers={"If-None-Match": etag}, raise_error=False
+            )
+            assert other_page.code == 200
+            assert other_page.headers["Etag"] != etag
+
+            changes.bump()
+            changed = await client.fetch(url, headers={"If-None-Match": etag}, raise_error=False)
+            assert changed.code == 200
+            assert changed.headers["Etag"] != etag
+            assert db_reader.load_plays_page.call_count == 3
+
+    asyncio.run(run())
+
+
+def test_listings_reject_malformed_cursors(db_reader, serve_app):
+    cursors = [
+        ("plays", web_lib.encode_cursor({"after": True})),
+        ("plays", web_lib.encode_cursor({"after": 2**64})),
+        ("plays", "not-a-cursor"),
+        ("corrections", web_lib.encode_cursor({"after": 42})),
+    ]
+
+    async def run():
+        async with serve_app(make_app()) as (base_url, client):
+            for listing, cursor in cursors:
+                response = await client.fetch(
+                    f"{base_url}/api/{listing}/load?cursor={cursor}", raise_error=False
+                )
+                assert response.code == 400
+                assert json.loads(response.body) == {
+                    "success": False,
+                    "message": "Invalid cursor.",
+                }
+
+    asyncio.run(run())
+    db_reader.load_plays_page.assert_not_called()
+    db_reader.load_corrections_page.assert_not_called()
+
+
+def test_metrics_include_request_latency(db_reader, serve_app):
+    async def run():
+        async with serve_app(make_app()) as (base_url, client):
+            await client.fetch(f"{base_url}/api/corrections/load")
+            response = await client.fetch(f"{base_url}/api/metrics")
+
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = response.body.decode()
+        assert "# TYPE mopidy_advanced_scrobbler_plays_recorded_total counter" in body
+        assert (
+            "mopidy_advanced_scrobbler_http_request_duration_seconds_count"
+            '{handler="ApiCorrectionLoad",method="GET",status="200"}'
+        ) in body
+
+    asyncio.run(run())
+
+
+def test_single_play_submit_reports_job_outcome(db_reader, monkeypatch, serve_app):
+    monkeypatch.setattr(web_lib, "SUBMIT_TIMEOUT", 0.1)
+    play = RecordedPlay(**dataclasses.asdict(make_play()), play_id=5)
+    db_reader.find_play.return_value = resolved(play)
+    jobs = mock.Mock()
+    app = tornado.web.Application(
+        [
+            (
+                r"/api/plays/submit",
+                web_lib.ApiPlaySubmit,
+                {"allowed_origins": set(), "csrf_protection": False},
+            )
+        ]
+    )
+
+    async def submit(client, url, job):
+        jobs.scrobble_play.return_value = resolved(job)
+        response = await client.fetch(
+            url, method="POST", body=json.dumps({"playId": 5}), raise_error=False
+        )
+        return response.code, json.loads(response.body)
+
+    async def run():
+        async with serve_app(app) as (base_url, client):
+            url = f"{base_url}/api/plays/submit"
+            finished = ScrobbleJob(job_id="a", status=JobStatusEnum.FINISHED, found_plays=1)
+            assert await submit(client, url, dataclasses.replace(finished, marked_plays=1)) == (
+                200,
+                {"success": True},
+            )
+            ignored = dataclasses.replace(finished, ignored_plays=1, ignored_message="Too old")
+            assert await submit(client, url, ignored) == (
+                200,
+                {"success": False, "message": "Last.fm ignored this play: Too old"},
+            )
+            failed = ScrobbleJob(job_id="b", status=JobStatusEnum.FAILED, message="Rejected.")
+            assert await submit(client, url, failed) == (
+                500,
+                {"success": False, "message": "Rejected."},
+            )
+
+            jobs.scrobble_play.return_value = pykka.ThreadingFuture()
+            response = await client.fetch(
+                url, method="POST", body=json.dumps({"playId": 5}), raise_error=False
+            )
+            assert response.code == 500
+            assert json.loads(response.body)["success"] is False
+
+    with mock.patch("mopidy_advanced_scrobbler.web.jobs_service", spec=Service) as m:
+        m.retrieve_service.return_value = resolved(jobs)
+        asyncio.run(run())
+    jobs.scrobble_play.assert_called_with(5)
+
+
+def test_play_export_streams_chunks(db_reader, monkeypatch, serve_app):
+    monkeypatch.setattr(web_lib, "EXPORT_CHUNK_SIZE", 2)
+    plays = [
+        RecordedPlay(**dataclasses.asdict(make_play(played_at=1600000000 + idx)), play_id=idx + 1)
+        for idx in range(3)
+    ]
+
+    def export_plays_chunk(*, after=None, **kwargs):
+        start = after or 0
+        return resolved(tuple(plays[start : start + 2]))
+
+    db_reader.export_plays_chunk.side_effect = export_plays_chunk
+    app = tornado.web.Application(
+        [
+            (
+                r"/api/plays/export",
+                web_lib.ApiPlayExport,
+                {"allowed_origins": set(), "csrf_protection": False},
+            )
+        ]
+    )
+
+    async def run():
+        async with serve_app(app) as (base_url, client):
+            url = f"{base_url}/api/plays/export"
+            ndjson = await client.fetch(f"{url}?status=unsubmitted&from=1600000000")
+            assert ndjson.headers["Content-Type"].startswith("application/x-ndjson")
+            rows = [json.loads(line) for line in ndjson.body.decode().splitlines()]
+            assert [row["playId"] for row in rows] == [1, 2, 3]
+            assert db_reader.export_plays_chunk.call_args_list[0].kwargs == {
+                "after": None,
+                "submitted": False,
+                "played_from": 1600000000,
+            }
+
+            response = await client.fetch(f"{url}?format=csv")
+            assert response.headers["Content-Type"].startswith("text/csv")
+            rows = list(csv.DictReader(io.StringIO(response.body.decode())))
+            assert [row["playId"] for row in rows] == ["1", "2", "3"]
+            assert rows[0]["trackUri"] == plays[0].track_uri
+
+            invalid = await client.fetch(f"{url}?format=xml", raise_error=False)
+            assert invalid.code == 400
+
+    asyncio.run(run())
+
+
+def test_playback_socket_pushes_updates_and_ticks(monkeypatch, serve_app):
+    broadcaster = push_lib.PlaybackBroadcaster()
+    monkeypatch.setattr(web_lib, "playback_broadcaster", broadcaster)
+    monkeypatch.setattr(push_lib, "TICK_INTERVAL_MSEC", 50)
+
+    api_args = {"allowed_origins": set(), "csrf_protection": True}
+    app = tornado.web.Application([(r"/socket", web_lib.ApiPlaybackSocket, api_args)])
+
+    async def run():
+        async with serve_app(app) as (base_url, _):
+            socket_url = base_url.replace("http:", "ws:", 1) + "/socket"
+            conn = await tornado.websocket.websocket_connect(socket_url)
+            try:
+                initial = json.loads(await conn.read_message())
+                assert initial["type"] == "playback"
+                assert initial["playback"] == {"state": "stopped", "position": 0}
+
+                # Updates come from the frontend actor's thread, not the IOLoop.
+                playing = {**push_lib.empty_playing(), "trackUri": "local:track:a.mp3"}
+                thread = threading.Thread(
+                    target=broadcaster.update,
+                    kwargs={"state": "playing", "position": 30, "playing": playing},
+                )
+                thread.start()
+                thread.join()
+
+                update = json.loads(await asyncio.wait_for(conn.read_message(), timeout=5))
+                assert update["playback"] == {"state": "playing", "position": 30}
+                assert update["playing"]["trackUri"] == "local:track:a.mp3"
+
+                tick = json.loads(await asyncio.wait_for(conn.read_message(), timeout=5))
+                assert tick == {"type": "tick", "position": 30}
+            finally:
+                conn.close()
+
+    asyncio.run(run())
+
+
+def test_static_files_are_served_precompressed(tmp_path, serve_app):
+    script = b"console.log('hello');" * 20
+    (tmp_path / "app.1a2b3c4d.js").write_bytes(script)
+    (tmp_path / "app.1a2b3c4d.js.gz").write_bytes(gzip.compress(script))
+    (tmp_path / "index.html").write_bytes(b"<html></html>")
+
+    app = tornado.web.Application(
+        [
+            (r"/js/(.*)", web_lib.PrecompressedStaticFileHandler, {"path": str(tmp_path)}),
+            (
+                r"/",
+                web_lib.OverrideStaticFileHandler,
+                {"static_file_path": tmp_path / "index.html"},
+            ),
+        ]
+    )
+
+    async def run():
+        async with serve_app(app) as (base_url, client):
+            url = base_url
+            compressed = await client.fetch(
+                f"{url}/js/app.1a2b3c4d.js",
+                headers={"Accept-Encoding": "br;q=0, gzip"},
+                decompress_response=False,
+            )
+            assert compressed.headers["Content-Encoding"] == "gzip"
+            assert compressed.headers["Content-Type"] == "text/javascript"
+            assert "immutable" in compressed.headers["Cache-Control"]
+            assert gzip.decompress(compressed.body) == script
+
+            plain = await client.fetch(
+                f"{url}/js/app.1a2b3c4d.js",
+                headers={"Accept-Encoding": "identity"},
+                decompress_response=False,
+            )
+            assert "Content-Encoding" not in plain.headers
+            assert plain.body == script
+            assert plain.headers["Etag"] != compressed.headers["Etag"]
+
+            index = await client.fetch(f"{url}/")
+            assert index.headers["Cache-Control"] == "no-cache"
+
+    asyncio.run(run())
+
+
+def test_accepted_encodings():
+    assert web_lib.accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert web_lib.accepted_encodings("br;q=0, GZIP;q=0.5") == {"gzip"}
+    assert web_lib.accepted_encodings("") == set()
+
+
+def test_ranked_cursors_round_trip():
+    cursor = web_lib.encode_cursor({"after": [-1.25, 42]})
+    assert web_lib.decode_cursor(cursor, int, ranked=True) == {"after": (-1.25, 42)}
+
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(cursor, int)
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(web_lib.encode_cursor({"after": 42}), int, ranked=True)
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(web_lib.encode_cursor({"after": [True, 42]}), int, ranked=True)
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(web_lib.encode_cursor({"after": [10**400, 42]}), int, ranked=True)
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(web_lib.encode_cursor({"after": [-1.25, True]}), int, ranked=True)
+    with pytest.raises(ValueError):
+        web_lib.decode_cursor(web_lib.encode_cursor({"before": False}), int)